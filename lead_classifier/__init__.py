@@ -0,0 +1,24 @@
+"""
+ABS lead classifier - shared Hot/Cold/Dead classification core.
+
+The Streamlit page (streamlit_app.py), the batch CLI and any other entry
+point import the prompt, model settings and label normalisation from here
+so every path classifies a transcript the same way.
+"""
+
+from .core import (
+    LABELS,
+    MAX_TOKENS,
+    MODEL_NAME,
+    PROMPT_VERSION,
+    SYSTEM_PROMPT,
+    TEMPERATURE,
+    ClassificationError,
+    build_messages,
+    classify_lead_groq,
+    classify_lead_groq_async,
+    normalize_label,
+    normalize_transcript,
+    prompt_fingerprint,
+    resolve_label_prefix,
+)
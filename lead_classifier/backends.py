@@ -0,0 +1,253 @@
+"""
+Pluggable classifier backends.
+
+Every backend turns a transcript into Hot/Cold/Dead and reports which engine
+served it. Pick one with a spec string (also read from the
+LEAD_CLASSIFIER_BACKEND environment variable):
+
+    "groq"        - Groq chat completions (default)
+    "local"       - offline TF-IDF model trained on leads/
+    "groq,local"  - Groq first, local model when Groq fails
+    "local,groq"  - local model first, Groq when it fails
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
+
+from .cache import ClassificationCache, cache_key
+from .compaction import TranscriptCompactor, merge_chunk_labels
+from .core import MODEL_NAME, classify_lead_groq, classify_lead_groq_async
+from .hedging import HedgePolicy
+from .metrics import METRICS
+from .singleflight import SingleFlight
+
+if TYPE_CHECKING:
+    # neardup needs numpy; only pages that enable it pay for the import
+    from .neardup import NearDuplicateIndex
+
+DEFAULT_BACKEND = os.getenv("LEAD_CLASSIFIER_BACKEND", "groq")
+# Stream completions and stop reading once the label is known (see core.resolve_label_prefix)
+DEFAULT_STREAM = os.getenv("LEAD_STREAM", "0").lower() in ("1", "true", "yes", "on")
+
+
+class ClassifierBackend:
+    """Base class - subclasses implement classify_with_source"""
+
+    name = "base"
+
+    def classify_with_source(self, conversation: str) -> Tuple[str, str]:
+        """Return (label, source) where source names the engine that answered"""
+        raise NotImplementedError
+
+    async def classify_with_source_async(self, conversation: str) -> Tuple[str, str]:
+        return self.classify_with_source(conversation)
+
+    def classify(self, conversation: str) -> str:
+        return self.classify_with_source(conversation)[0]
+
+    async def classify_async(self, conversation: str) -> str:
+        return (await self.classify_with_source_async(conversation))[0]
+
+    def classify_many(self, conversations: Sequence[str]) -> List[str]:
+        return [self.classify(conversation) for conversation in conversations]
+
+
+class GroqBackend(ClassifierBackend):
+    """Groq chat completions, optionally behind the cache and the compactor.
+
+    Concurrent requests for the same transcript share one in-flight call
+    (source "coalesced" for the followers). With a HedgePolicy, slow or
+    failed calls are hedged to a second request (see hedging.py). With
+    stream=True each completion is closed as soon as the label is known.
+    With a NearDuplicateIndex, a transcript close enough to one already
+    classified reuses its label (source "near-duplicate", see neardup.py).
+    """
+
+    name = "groq"
+
+    def __init__(self, client=None, async_client=None, cache: Optional[ClassificationCache] = None,
+                 model: str = MODEL_NAME, compactor: Optional[TranscriptCompactor] = None,
+                 hedge: Optional[HedgePolicy] = None, stream: bool = DEFAULT_STREAM,
+                 near_dup: Optional["NearDuplicateIndex"] = None):
+        self.client = client
+        self.async_client = async_client
+        self.cache = cache
+        self.model = model
+        self.compactor = compactor
+        self.hedge = hedge
+        self.stream = stream
+        self.near_dup = near_dup
+        self.flight = SingleFlight()
+
+    def _call(self, transcript: str) -> Tuple[str, str]:
+        """One Groq classification, hedged when a policy is set; returns (label, model that answered)"""
+        if self.hedge is None:
+            return classify_lead_groq(transcript, self.client, self.model, stream=self.stream), self.model
+        return self.hedge.run(
+            self.model, lambda model: classify_lead_groq(transcript, self.client, model, stream=self.stream))
+
+    async def _call_async(self, transcript: str) -> Tuple[str, str]:
+        if self.hedge is None:
+            label = await classify_lead_groq_async(transcript, self.async_client, self.model, stream=self.stream)
+            return label, self.model
+        return await self.hedge.run_async(
+            self.model,
+            lambda model: classify_lead_groq_async(transcript, self.async_client, model, stream=self.stream))
+
+    def _merge(self, answers: Sequence[Tuple[str, str]]) -> Tuple[str, str]:
+        """Chunk answers -> (label, model); another model if any chunk was answered by one"""
+        models = [model for _, model in answers if model != self.model]
+        return merge_chunk_labels([label for label, _ in answers]), models[0] if models else self.model
+
+    def _classify(self, conversation: str) -> Tuple[str, str]:
+        """Compact, then classify - chunks of very long transcripts run in parallel"""
+        if self.compactor is None:
+            return self._call(conversation)
+
+        parts = self.compactor.plan(conversation)
+        if len(parts) == 1:
+            return self._call(parts[0])
+        with ThreadPoolExecutor(max_workers=len(parts)) as pool:
+            return self._merge(list(pool.map(self._call, parts)))
+
+    async def _classify_async(self, conversation: str) -> Tuple[str, str]:
+        if self.compactor is None:
+            return await self._call_async(conversation)
+
+        parts = self.compactor.plan(conversation)
+        return self._merge(await asyncio.gather(*(self._call_async(part) for part in parts)))
+
+    def _reuse(self, key: str, conversation: str):
+        """((label, source), signature) from the cache or a near-duplicate; (None, signature) on a miss"""
+        if self.cache:
+            label = self.cache.get(key)
+            if label is not None:
+                return (label, "cache"), None
+        if self.near_dup is None:
+            return None, None
+        signature = self.near_dup.signature(conversation)
+        match = self.near_dup.lookup(conversation, signature)
+        if match is None:
+            return None, signature
+        METRICS.record_near_duplicate()
+        return (match[0], "near-duplicate"), signature
+
+    def _remember(self, key: str, conversation: str, label: str, model: str, signature=None):
+        if model != self.model:
+            # A fallback model's answer is returned, but not stored as the primary model's answer
+            return
+        if self.cache:
+            self.cache.set(key, label)
+        if self.near_dup is not None:
+            self.near_dup.add(conversation, label, signature)
+
+    def classify_with_source(self, conversation: str) -> Tuple[str, str]:
+        if self.client is None:
+            raise RuntimeError("GroqBackend needs a groq.Groq client for synchronous calls")
+
+        key = cache_key(conversation, model=self.model)
+        reused, signature = self._reuse(key, conversation)
+        if reused is not None:
+            return reused
+
+        def call() -> str:
+            label, model = self._classify(conversation)
+            self._remember(key, conversation, label, model, signature)
+            return label
+
+        label, shared = self.flight.do(key, call)
+        return label, "coalesced" if shared else self.name
+
+    async def classify_with_source_async(self, conversation: str) -> Tuple[str, str]:
+        if self.async_client is None:
+            raise RuntimeError("GroqBackend needs a groq.AsyncGroq client for async calls")
+
+        key = cache_key(conversation, model=self.model)
+        reused, signature = self._reuse(key, conversation)
+        if reused is not None:
+            return reused
+
+        async def call() -> str:
+            label, model = await self._classify_async(conversation)
+            self._remember(key, conversation, label, model, signature)
+            return label
+
+        label, shared = await self.flight.do_async(key, call)
+        return label, "coalesced" if shared else self.name
+
+
+class LocalBackend(ClassifierBackend):
+    """Offline TF-IDF + softmax model (see local_model.py)"""
+
+    name = "local"
+
+    def __init__(self, model=None, model_path: Optional[str] = None):
+        self._model = model
+        self._model_path = model_path
+
+    @property
+    def model(self):
+        # NumPy and the trained weights are only loaded when first needed
+        if self._model is None:
+            from .local_model import DEFAULT_MODEL_PATH, load_or_train
+            self._model = load_or_train(self._model_path or DEFAULT_MODEL_PATH)
+        return self._model
+
+    def classify_with_source(self, conversation: str) -> Tuple[str, str]:
+        return self.model.predict([conversation])[0], self.name
+
+    def classify_many(self, conversations: Sequence[str]) -> List[str]:
+        """Vectorised batch inference - one sparse matrix for the whole batch"""
+        return self.model.predict(conversations)
+
+
+class FallbackBackend(ClassifierBackend):
+    """Try the primary backend, answer from the fallback when it raises"""
+
+    def __init__(self, primary: ClassifierBackend, fallback: ClassifierBackend):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name},{fallback.name}"
+        self.fallbacks = 0
+
+    def classify_with_source(self, conversation: str) -> Tuple[str, str]:
+        try:
+            return self.primary.classify_with_source(conversation)
+        except Exception:
+            self.fallbacks += 1
+            label, source = self.fallback.classify_with_source(conversation)
+            return label, f"{source} (fallback)"
+
+    async def classify_with_source_async(self, conversation: str) -> Tuple[str, str]:
+        try:
+            return await self.primary.classify_with_source_async(conversation)
+        except Exception:
+            self.fallbacks += 1
+            label, source = await self.fallback.classify_with_source_async(conversation)
+            return label, f"{source} (fallback)"
+
+
+def create_backend(spec: str = DEFAULT_BACKEND, client=None, async_client=None,
+                   cache: Optional[ClassificationCache] = None,
+                   compactor: Optional[TranscriptCompactor] = None,
+                   hedge: Optional[HedgePolicy] = None, stream: bool = DEFAULT_STREAM,
+                   near_dup: Optional["NearDuplicateIndex"] = None) -> ClassifierBackend:
+    """Build a backend from a spec like "groq", "local" or "groq,local"."""
+    def build(name: str) -> ClassifierBackend:
+        if name == "groq":
+            return GroqBackend(client=client, async_client=async_client, cache=cache, compactor=compactor,
+                               hedge=hedge, stream=stream, near_dup=near_dup)
+        if name == "local":
+            return LocalBackend()
+        raise ValueError(f"Unknown classifier backend: '{name}' (expected 'groq' or 'local')")
+
+    names = [part.strip().lower() for part in spec.split(",") if part.strip()]
+    if not names or len(names) > 2:
+        raise ValueError(f"Backend spec must name one or two backends, got '{spec}'")
+
+    backend = build(names[0])
+    if len(names) == 2:
+        backend = FallbackBackend(backend, build(names[1]))
+    return backend
@@ -0,0 +1,387 @@
+"""
+Bulk lead classification - classify a day's worth of transcripts concurrently.
+
+Reads JSONL or CSV transcripts, classifies them on asyncio with a bounded
+number of in-flight Groq requests and streams results to disk as they finish.
+
+Usage:
+    python -m lead_classifier.batch transcripts.jsonl -o labels.jsonl --concurrency 16
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from typing import IO, TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .backends import DEFAULT_BACKEND, DEFAULT_STREAM, ClassifierBackend, create_backend
+from .cache import DEFAULT_CACHE_PATH, ClassificationCache
+from .compaction import DEFAULT_TOKEN_BUDGET, TranscriptCompactor
+from .hedging import DEFAULT_MAX_HEDGE_RATE, DEFAULT_PERCENTILE, HedgePolicy
+from .keypool import create_async_groq_pool
+from .metrics import METRICS
+from .rules import DEFAULT_THRESHOLD, RulePreClassifier
+from .scheduler import RateLimitScheduler
+
+if TYPE_CHECKING:
+    from .neardup import NearDuplicateIndex
+
+# Columns / keys we look for when the caller does not name the text field
+TEXT_FIELDS = ("conversation", "transcript", "text", "message")
+ID_FIELDS = ("id", "lead_id", "conversation_id")
+
+RESULT_FIELDS = ["id", "label", "error", "latency_ms"]
+
+Classifier = Callable[[str], Awaitable[str]]
+
+
+# --- 1. INPUT ---
+
+def _pick_field(record: Dict[str, Any], preferred: Optional[str], candidates) -> Optional[str]:
+    """Return the first field name present in the record"""
+    if preferred:
+        return preferred if preferred in record else None
+    for name in candidates:
+        if name in record:
+            return name
+    return None
+
+
+def read_transcripts(f: IO[str], is_csv: bool, text_field: Optional[str] = None,
+                     id_field: Optional[str] = None, keep_row: bool = False) -> Iterator[Dict[str, Any]]:
+    """Yield {'id', 'conversation'} records from an open JSONL or CSV text stream.
+
+    With keep_row the original row is attached as 'row' so callers can write
+    it back out next to the label.
+    """
+    rows = csv.DictReader(f) if is_csv else (json.loads(line) for line in f if line.strip())
+
+    for row_num, row in enumerate(rows, 1):
+        text_key = _pick_field(row, text_field, TEXT_FIELDS)
+        if text_key is None:
+            print(f"Skipping row {row_num}: no transcript field found", file=sys.stderr)
+            continue
+
+        id_key = _pick_field(row, id_field, ID_FIELDS)
+        record = {
+            'id': str(row[id_key]) if id_key else str(row_num),
+            'conversation': row[text_key] or '',
+        }
+        if keep_row:
+            record['row'] = row
+        yield record
+
+
+def load_transcripts(path: str, text_field: Optional[str] = None,
+                     id_field: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Yield {'id', 'conversation'} records from a JSONL or CSV file"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        yield from read_transcripts(f, path.lower().endswith('.csv'), text_field, id_field)
+
+
+class ResultWriter:
+    """Append classification results to a JSONL or CSV file as they arrive"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.is_csv = path.lower().endswith('.csv')
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._csv = None
+        if self.is_csv:
+            self._csv = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS)
+            self._csv.writeheader()
+
+    def write(self, result: Dict[str, Any]):
+        if self._csv:
+            self._csv.writerow({k: result.get(k) for k in RESULT_FIELDS})
+        else:
+            self._file.write(json.dumps(result, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- 2. BATCH ENGINE ---
+
+class BatchStats:
+    """Counters and throughput for one batch run"""
+
+    def __init__(self):
+        self.total = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.labels = {'Hot': 0, 'Cold': 0, 'Dead': 0}
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    @property
+    def rate(self) -> float:
+        """Transcripts per second"""
+        return self.total / self.elapsed if self.elapsed > 0 else 0.0
+
+    def record(self, result: Dict[str, Any]):
+        self.total += 1
+        if result['error']:
+            self.failed += 1
+        else:
+            self.succeeded += 1
+            self.labels[result['label']] = self.labels.get(result['label'], 0) + 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'total': self.total,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'labels': dict(self.labels),
+            'elapsed_seconds': round(self.elapsed, 3),
+            'transcripts_per_second': round(self.rate, 2),
+        }
+
+
+async def classify_batch(records: Iterable[Dict[str, Any]], classify: Classifier,
+                         concurrency: int = 16,
+                         on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+                         stats: Optional[BatchStats] = None) -> BatchStats:
+    """Classify records with at most `concurrency` requests in flight.
+
+    Records are pulled lazily from the iterable, so memory stays flat no
+    matter how large the input is. `on_result` is called once per record
+    in completion order, after `stats` has been updated.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    stats = stats or BatchStats()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def producer():
+        for record in records:
+            await queue.put(record)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def worker():
+        while True:
+            record = await queue.get()
+            if record is None:
+                return
+
+            started = time.perf_counter()
+            result = {'id': record['id'], 'label': None, 'error': None}
+            try:
+                result['label'] = await classify(record['conversation'])
+            except Exception as e:
+                result['error'] = str(e)
+            result['latency_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+            stats.record(result)
+            if on_result:
+                on_result(result)
+
+    await asyncio.gather(producer(), *(worker() for _ in range(concurrency)))
+    stats.finished_at = time.perf_counter()
+    return stats
+
+
+def backend_classifier(backend: ClassifierBackend,
+                       pre_classifier: Optional[RulePreClassifier] = None) -> Classifier:
+    """Rules first, then the backend; every transcript's outcome is recorded in METRICS"""
+    async def classify(conversation: str) -> str:
+        with METRICS.classification() as outcome:
+            if pre_classifier is not None:
+                result = pre_classifier.try_classify(conversation)
+                if result is not None:
+                    outcome.source, outcome.label = "rules", result.label
+                    return result.label
+            outcome.source = backend.name
+            outcome.label, outcome.source = await backend.classify_with_source_async(conversation)
+            return outcome.label
+    return classify
+
+
+def run_batch(input_path: str, output_path: str, concurrency: int = 16,
+              api_key: Optional[str] = None, text_field: Optional[str] = None,
+              id_field: Optional[str] = None, progress_every: int = 100,
+              cache: Optional[ClassificationCache] = None,
+              pre_classifier: Optional[RulePreClassifier] = None,
+              backend_spec: str = DEFAULT_BACKEND,
+              compactor: Optional[TranscriptCompactor] = None,
+              hedge: Optional[HedgePolicy] = None, stream: bool = DEFAULT_STREAM,
+              scheduler_factory: Optional[Callable[[], RateLimitScheduler]] = None,
+              near_dup: Optional["NearDuplicateIndex"] = None) -> BatchStats:
+    """Classify every transcript in input_path and stream labels to output_path.
+
+    Without an api_key, every key in GROQ_API_KEYS is used (see keypool.py);
+    scheduler_factory builds one rate-limit scheduler per key.
+    """
+    records = load_transcripts(input_path, text_field=text_field, id_field=id_field)
+    stats = BatchStats()
+
+    async def run(writer: ResultWriter):
+        # The async connection pool is bound to this event loop
+        async_client = (create_async_groq_pool([api_key] if api_key else None, scheduler_factory=scheduler_factory)
+                        if "groq" in backend_spec else None)
+        backend = create_backend(backend_spec, async_client=async_client, cache=cache, compactor=compactor,
+                                 hedge=hedge, stream=stream, near_dup=near_dup)
+        classify = backend_classifier(backend, pre_classifier)
+
+        def on_result(result):
+            writer.write(result)
+            if progress_every and stats.total % progress_every == 0:
+                print(f"  {stats.total} classified ({stats.rate:.1f} transcripts/sec)")
+
+        await classify_batch(records, classify, concurrency, on_result=on_result, stats=stats)
+
+    with ResultWriter(output_path) as writer:
+        asyncio.run(run(writer))
+
+    return stats
+
+
+# --- 3. CLI ---
+
+def scheduler_from_args(args) -> RateLimitScheduler:
+    """A scheduler capped at --concurrency, seeded from --rpm/--tpm or GROQ_RPM/GROQ_TPM"""
+    rpm = args.rpm or float(os.getenv("GROQ_RPM") or 0) or None
+    tpm = args.tpm or float(os.getenv("GROQ_TPM") or 0) or None
+    return RateLimitScheduler(rpm=rpm, tpm=tpm, initial_concurrency=min(4, args.concurrency),
+                              max_concurrency=args.concurrency)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify a file of lead transcripts as Hot, Cold or Dead")
+    parser.add_argument("input", help="JSONL or CSV file of transcripts")
+    parser.add_argument("-o", "--output", help="Where to write labels (.jsonl or .csv)")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="Max in-flight requests")
+    parser.add_argument("--text-field", help="Field holding the transcript")
+    parser.add_argument("--id-field", help="Field holding the lead id")
+    parser.add_argument("--backend", default=DEFAULT_BACKEND,
+                        help="groq, local, or primary,fallback such as groq,local")
+    parser.add_argument("--token-budget", type=int, default=DEFAULT_TOKEN_BUDGET,
+                        help="Compact transcripts to this many prompt tokens (0 disables)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="SQLite classification cache file")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the model")
+    parser.add_argument("--rules-threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Rule-engine confidence needed to skip the model")
+    parser.add_argument("--no-rules", action="store_true", help="Send every transcript to the model")
+    parser.add_argument("--progress-every", type=int, default=100, help="Print progress every N transcripts")
+    parser.add_argument("--stream", action="store_true", default=DEFAULT_STREAM,
+                        help="Stream completions and stop reading once the label is known")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Send a second request when the first is slower than its latency percentile")
+    parser.add_argument("--hedge-model", help="Model for hedged/fallback requests (default: same model)")
+    parser.add_argument("--hedge-percentile", type=float, default=DEFAULT_PERCENTILE)
+    parser.add_argument("--hedge-max-rate", type=float, default=DEFAULT_MAX_HEDGE_RATE,
+                        help="Most requests that may be hedged, as a fraction")
+    parser.add_argument("--rpm", type=float, default=None,
+                        help="Groq requests-per-minute limit (default: GROQ_RPM)")
+    parser.add_argument("--tpm", type=float, default=None,
+                        help="Groq tokens-per-minute limit (default: GROQ_TPM, else learnt from response headers)")
+    parser.add_argument("--no-scheduler", action="store_true",
+                        help="Send at a fixed --concurrency without rate-limit pacing")
+    parser.add_argument("--near-dup", type=float, default=float(os.getenv("LEAD_NEAR_DUP_THRESHOLD") or 0),
+                        help="Reuse the label of an earlier transcript at least this similar (0 disables)")
+    parser.add_argument("--metrics-log", help="Append per-call latency/token events to this JSONL file")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    if "groq" in args.backend and not (os.getenv("GROQ_API_KEY") or os.getenv("GROQ_API_KEYS")):
+        print("Error: GROQ_API_KEY is missing. Please set it in your .env file.", file=sys.stderr)
+        return 1
+
+    output = args.output or os.path.splitext(args.input)[0] + '.labels.jsonl'
+    if args.metrics_log:
+        METRICS.log_path = args.metrics_log
+
+    print("=" * 60)
+    print(f"Classifying: {args.input}")
+    print(f"Backend: {args.backend}  Concurrency: {args.concurrency}")
+    print("=" * 60)
+
+    cache = None if args.no_cache else ClassificationCache(args.cache)
+    pre_classifier = None if args.no_rules else RulePreClassifier(threshold=args.rules_threshold)
+    compactor = TranscriptCompactor(token_budget=args.token_budget) if args.token_budget > 0 else None
+    hedge = HedgePolicy(hedge_model=args.hedge_model, percentile=args.hedge_percentile,
+                        max_hedge_rate=args.hedge_max_rate) if args.hedge else None
+    near_dup = None
+    if args.near_dup > 0:
+        from .neardup import NearDuplicateIndex
+        near_dup = NearDuplicateIndex(threshold=args.near_dup)
+    schedulers: List[RateLimitScheduler] = []
+
+    def make_scheduler() -> RateLimitScheduler:
+        schedulers.append(scheduler_from_args(args))
+        return schedulers[-1]
+
+    stats = run_batch(args.input, output, concurrency=args.concurrency,
+                      text_field=args.text_field, id_field=args.id_field,
+                      progress_every=args.progress_every, cache=cache,
+                      pre_classifier=pre_classifier, backend_spec=args.backend,
+                      compactor=compactor, hedge=hedge, stream=args.stream, near_dup=near_dup,
+                      scheduler_factory=None if args.no_scheduler else make_scheduler)
+
+    summary = stats.as_dict()
+    print(f"\n✓ Classified {summary['succeeded']}/{summary['total']} transcripts "
+          f"in {summary['elapsed_seconds']}s ({summary['transcripts_per_second']} transcripts/sec)")
+    print(f"  Hot: {summary['labels']['Hot']}  Cold: {summary['labels']['Cold']}  Dead: {summary['labels']['Dead']}")
+    if summary['failed']:
+        print(f"✗ {summary['failed']} transcripts failed - see the error column in {output}")
+    if pre_classifier is not None:
+        print(f"  Rule engine absorbed: {pre_classifier.absorbed}/{pre_classifier.total} "
+              f"({pre_classifier.absorbed_fraction:.0%})")
+    if compactor is not None and compactor.compacted:
+        compaction = compactor.stats()
+        print(f"  Compaction: {compaction['tokens_in']:,} -> {compaction['tokens_out']:,} prompt tokens "
+              f"({compaction['saved_fraction']:.0%} saved, {compaction['chunked']} chunked)")
+    if cache is not None:
+        cache_stats = cache.stats()
+        print(f"  Cache hits: {cache_stats['memory_hits'] + cache_stats['disk_hits']}  "
+              f"misses: {cache_stats['misses']}  (hit rate {cache_stats['hit_rate']:.0%})")
+        cache.close()
+    if hedge is not None:
+        hedging = hedge.stats()
+        print(f"  Hedged: {hedging['hedges']}/{hedging['requests']} ({hedging['hedge_rate']:.1%}), "
+              f"won by the hedge: {hedging['hedge_wins']}, fallbacks: {hedging['fallbacks']}")
+    if near_dup is not None:
+        dedup = near_dup.stats()
+        print(f"  Near-duplicates reused: {dedup['hits']}/{dedup['lookups']} ({dedup['dedup_rate']:.1%}), "
+              f"{dedup['entries']} indexed, {dedup['evictions']} evicted")
+    for scheduler in schedulers:
+        pacing = scheduler.stats()
+        if not pacing['admitted']:
+            continue
+        print(f"  Scheduler: concurrency {pacing['concurrency_limit']} (peak {pacing['peak_concurrency']}), "
+              f"429s: {pacing['rate_limited']}, waited {pacing['concurrency_wait_seconds']}s for a slot, "
+              f"{pacing['quota_wait_seconds']}s for RPM/TPM quota")
+    metrics = METRICS.snapshot()
+    latency = metrics['histograms']['classification_seconds']
+    if latency['count']:
+        print(f"  Latency p50/p95/p99: {latency['p50'] * 1000:.0f} / {latency['p95'] * 1000:.0f} / "
+              f"{latency['p99'] * 1000:.0f} ms")
+    if metrics['groq_calls']:
+        print(f"  Groq calls: {metrics['groq_calls']} ({metrics['groq_errors']} failed, "
+              f"{metrics['groq_cancelled']} cancelled)  tokens: "
+              f"{metrics['prompt_tokens']:,} prompt / {metrics['completion_tokens']:,} completion")
+    print(f"✓ Results written to: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
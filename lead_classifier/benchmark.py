@@ -0,0 +1,323 @@
+"""
+Classifier benchmark and evaluation harness.
+
+Replays the labelled transcripts from `leads/` (or `leads.zip`) through the
+same path as the batch engine - rules, cache, compaction, backend - at a
+configurable concurrency and reports accuracy, a confusion matrix,
+throughput, latency percentiles and tokens per lead. Each run is saved as
+JSON so prompt or model changes can be compared over time.
+
+By default it runs offline against the local stub server (stub_server.py),
+so it works in CI without a Groq key:
+
+    python -m lead_classifier.benchmark run --concurrency 32 --limit 500
+    python -m lead_classifier.benchmark run --live          # real Groq / GROQ_BASE_URL
+    python -m lead_classifier.benchmark compare old.json new.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .backends import create_backend
+from .batch import backend_classifier, classify_batch, scheduler_from_args
+from .cache import ClassificationCache
+from .compaction import DEFAULT_TOKEN_BUDGET, TranscriptCompactor
+from .core import LABELS, MODEL_NAME, PROMPT_VERSION
+from .corpus import REPO_ROOT, load_leads_corpus
+from .hedging import DEFAULT_MAX_HEDGE_RATE, HedgePolicy
+from .keypool import create_async_groq_pool
+from .metrics import METRICS, percentile
+from .neardup import NearDuplicateIndex
+from .rules import DEFAULT_THRESHOLD, RulePreClassifier
+from .scheduler import RateLimitScheduler
+from .stub_server import add_stub_arguments, stub_from_args
+
+BENCHMARK_VERSION = 1
+DEFAULT_RESULTS_DIR = os.path.join(REPO_ROOT, ".cache", "benchmarks")
+
+
+# --- 1. RUN ---
+
+def sample_corpus(limit: Optional[int] = None, seed: int = 13) -> List[Dict[str, str]]:
+    """The labelled corpus in a seeded order, optionally cut to `limit` examples"""
+    examples = load_leads_corpus()
+    random.Random(seed).shuffle(examples)
+    return examples[:limit] if limit else examples
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(examples: List[Dict[str, str]], backend_spec: str = "groq", concurrency: int = 16,
+                  api_keys: Optional[List[str]] = None, base_url: Optional[str] = None,
+                  pre_classifier: Optional[RulePreClassifier] = None,
+                  compactor: Optional[TranscriptCompactor] = None,
+                  cache: Optional[ClassificationCache] = None,
+                  hedge: Optional[HedgePolicy] = None, stream: bool = False,
+                  scheduler_factory: Optional[Callable[[], RateLimitScheduler]] = None,
+                  near_dup: Optional[NearDuplicateIndex] = None) -> Dict[str, Any]:
+    """Classify every example and score the predictions against its label"""
+    records = [{'id': str(i), 'conversation': e['text']} for i, e in enumerate(examples)]
+    results: Dict[str, Dict[str, Any]] = {}
+    METRICS.reset()
+
+    async def run():
+        async_client = (create_async_groq_pool(api_keys, [base_url] if base_url else None,
+                                               scheduler_factory=scheduler_factory)
+                        if "groq" in backend_spec else None)
+        backend = create_backend(backend_spec, async_client=async_client, cache=cache, compactor=compactor,
+                                 hedge=hedge, stream=stream, near_dup=near_dup)
+        stats = await classify_batch(records, backend_classifier(backend, pre_classifier), concurrency,
+                                     on_result=lambda result: results.__setitem__(result['id'], result))
+        return stats, (async_client.stats() if async_client is not None else None)
+
+    stats, client_stats = asyncio.run(run())
+    report = score(examples, results, stats.elapsed, client_stats)
+    report['hedging'] = hedge.stats() if hedge is not None else None
+    report['near_duplicates'] = near_dup.stats() if near_dup is not None else None
+    return report
+
+
+def score(examples: List[Dict[str, str]], results: Dict[str, Dict[str, Any]], elapsed: float,
+          client_stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Accuracy, confusion matrix, latency and token figures for one run"""
+    confusion = {actual: {predicted: 0 for predicted in LABELS} for actual in LABELS}
+    per_language: Dict[str, List[int]] = {}
+    correct = errors = 0
+    latencies = []
+
+    for i, example in enumerate(examples):
+        result = results[str(i)]
+        latencies.append(result['latency_ms'])
+        if result['error']:
+            errors += 1
+            continue
+        confusion[example['label']][result['label']] += 1
+        hit = int(result['label'] == example['label'])
+        correct += hit
+        per_language.setdefault(example['language'], []).append(hit)
+
+    total = len(examples)
+    snapshot = METRICS.snapshot()
+    tokens = snapshot['prompt_tokens'] + snapshot['completion_tokens']
+
+    return {
+        'examples': total,
+        'accuracy': round(correct / total, 4) if total else 0.0,
+        'errors': errors,
+        'per_language_accuracy': {language: round(sum(hits) / len(hits), 4)
+                                  for language, hits in sorted(per_language.items())},
+        'confusion_matrix': confusion,
+        'elapsed_seconds': round(elapsed, 3),
+        'leads_per_second': round(total / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'mean': round(sum(latencies) / total, 1) if total else None,
+        },
+        'tokens_per_lead': round(tokens / total, 1) if total else 0.0,
+        'prompt_tokens': snapshot['prompt_tokens'],
+        'completion_tokens': snapshot['completion_tokens'],
+        'groq_calls': snapshot['groq_calls'],
+        'groq_cancelled': snapshot['groq_cancelled'],
+        'stream_early_exits': snapshot['stream_early_exits'],
+        'sources': snapshot['outcomes'],
+        'client': client_stats,
+    }
+
+
+# --- 2. REPORTING ---
+
+def print_report(report: Dict[str, Any]):
+    config, results = report['config'], report['results']
+    print("=" * 60)
+    print(f"Model: {config['model']}  Prompt: {config['prompt_version']}  Backend: {config['backend']}")
+    print(f"Target: {config['target']}  Concurrency: {config['concurrency']}  Examples: {results['examples']}")
+    print("=" * 60)
+
+    print(f"Accuracy: {results['accuracy']:.1%}  "
+          + "  ".join(f"{lang}: {acc:.1%}" for lang, acc in results['per_language_accuracy'].items()))
+    if results['errors']:
+        print(f"✗ Errors: {results['errors']}")
+
+    print("\n" + "actual / predicted".ljust(20) + "".join(f"{label:>8}" for label in LABELS))
+    for actual, row in results['confusion_matrix'].items():
+        print(f"{actual:<20}" + "".join(f"{row[label]:>8}" for label in LABELS))
+
+    latency = results['latency_ms']
+    print(f"\nThroughput: {results['leads_per_second']} leads/sec ({results['elapsed_seconds']}s)")
+    print(f"Latency p50/p95/p99: {latency['p50']} / {latency['p95']} / {latency['p99']} ms")
+    cancelled = f", {results['groq_cancelled']} cancelled" if results.get('groq_cancelled') else ""
+    print(f"Tokens per lead: {results['tokens_per_lead']}  ({results['groq_calls']} Groq calls{cancelled})")
+    if config.get('stream'):
+        print(f"Streamed: {results['stream_early_exits']}/{results['groq_calls']} calls closed on the label token")
+    for source, outcomes in results['sources'].items():
+        print(f"  {source:<16} {sum(outcomes.values())}")
+    if results.get('hedging'):
+        hedging = results['hedging']
+        print(f"Hedged: {hedging['hedges']}/{hedging['requests']} ({hedging['hedge_rate']:.1%}), "
+              f"won by the hedge: {hedging['hedge_wins']}")
+    if results.get('near_duplicates'):
+        dedup = results['near_duplicates']
+        print(f"Near-duplicates reused: {dedup['hits']}/{dedup['lookups']} ({dedup['dedup_rate']:.1%})")
+    client = results.get('client') or {}
+    for endpoint in client.get('endpoints') or [{'key': None, 'client': client}]:
+        pacing = endpoint['client'].get('scheduler')
+        if not pacing:
+            continue
+        prefix = f"[{endpoint['key']}] " if endpoint['key'] else ""
+        print(f"{prefix}Scheduler: concurrency {pacing['concurrency_limit']} (peak {pacing['peak_concurrency']}), "
+              f"429s: {pacing['rate_limited']}, waited {pacing['concurrency_wait_seconds']}s for a slot, "
+              f"{pacing['quota_wait_seconds']}s for RPM/TPM quota")
+
+
+def compare_reports(old: Dict[str, Any], new: Dict[str, Any]):
+    """Print the headline figures of two saved runs side by side"""
+    rows = [
+        ("accuracy", lambda r: r['accuracy'], "{:.1%}"),
+        ("errors", lambda r: r['errors'], "{}"),
+        ("leads/sec", lambda r: r['leads_per_second'], "{:.1f}"),
+        ("latency p50 ms", lambda r: r['latency_ms']['p50'], "{:.1f}"),
+        ("latency p95 ms", lambda r: r['latency_ms']['p95'], "{:.1f}"),
+        ("latency p99 ms", lambda r: r['latency_ms']['p99'], "{:.1f}"),
+        ("tokens/lead", lambda r: r['tokens_per_lead'], "{:.1f}"),
+    ]
+    print("=" * 60)
+    for report, tag in ((old, "old"), (new, "new")):
+        config = report['config']
+        print(f"{tag}: {config['timestamp']}  {config['model']}  prompt {config['prompt_version']}  "
+              f"commit {config.get('git_commit')}")
+    print("=" * 60)
+    print(f"{'metric':<18}{'old':>12}{'new':>12}{'delta':>12}")
+    for name, get, fmt in rows:
+        before, after = get(old['results']), get(new['results'])
+        delta = "" if before is None or after is None else f"{after - before:+.4g}"
+        print(f"{name:<18}{fmt.format(before) if before is not None else '-':>12}"
+              f"{fmt.format(after) if after is not None else '-':>12}{delta:>12}")
+
+
+# --- 3. CLI ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the lead classifier on the labelled leads/ corpus")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = sub.add_parser("run", help="Replay the corpus and save a JSON report")
+    run_cmd.add_argument("-c", "--concurrency", type=int, default=16)
+    run_cmd.add_argument("--limit", type=int, help="Only use the first N examples (seeded order)")
+    run_cmd.add_argument("--seed", type=int, default=13)
+    run_cmd.add_argument("--backend", default="groq", help="groq, local, or primary,fallback")
+    run_cmd.add_argument("--live", action="store_true",
+                         help="Call Groq (or GROQ_BASE_URL) instead of the local stub server")
+    run_cmd.add_argument("--rules-threshold", type=float, default=DEFAULT_THRESHOLD)
+    run_cmd.add_argument("--no-rules", action="store_true", help="Send every transcript to the backend")
+    run_cmd.add_argument("--token-budget", type=int, default=DEFAULT_TOKEN_BUDGET, help="0 disables compaction")
+    run_cmd.add_argument("--cache", help="SQLite cache file (off by default so every lead is classified)")
+    run_cmd.add_argument("--stream", action="store_true", help="Stream completions and exit on the first label token")
+    run_cmd.add_argument("--hedge", action="store_true", help="Hedge slow requests (see hedging.py)")
+    run_cmd.add_argument("--hedge-model", help="Model for hedged/fallback requests")
+    run_cmd.add_argument("--hedge-max-rate", type=float, default=DEFAULT_MAX_HEDGE_RATE)
+    run_cmd.add_argument("--near-dup", type=float, default=0,
+                         help="Reuse labels of transcripts at least this similar (0 disables)")
+    run_cmd.add_argument("--rpm", type=float, help="Requests-per-minute limit for the scheduler")
+    run_cmd.add_argument("--tpm", type=float, help="Tokens-per-minute limit for the scheduler")
+    run_cmd.add_argument("--keys", type=int, default=1,
+                         help="Spread offline runs over this many stub API keys (live runs use GROQ_API_KEYS)")
+    run_cmd.add_argument("--no-scheduler", action="store_true", help="Fixed concurrency, no rate-limit pacing")
+    run_cmd.add_argument("-o", "--output", help="Report path (default .cache/benchmarks/<timestamp>.json)")
+    add_stub_arguments(run_cmd.add_argument_group("stub server (offline runs)"), prefix="stub-")
+
+    compare_cmd = sub.add_parser("compare", help="Compare two saved reports")
+    compare_cmd.add_argument("old")
+    compare_cmd.add_argument("new")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.old, encoding='utf-8') as f_old, open(args.new, encoding='utf-8') as f_new:
+            compare_reports(json.load(f_old), json.load(f_new))
+        return 0
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    uses_groq = "groq" in args.backend
+    if args.live and uses_groq and not (os.getenv("GROQ_API_KEY") or os.getenv("GROQ_API_KEYS")):
+        print("Error: GROQ_API_KEY is missing. Please set it in your .env file.", file=sys.stderr)
+        return 1
+
+    examples = sample_corpus(args.limit, args.seed)
+    pre_classifier = None if args.no_rules else RulePreClassifier(threshold=args.rules_threshold)
+    compactor = TranscriptCompactor(token_budget=args.token_budget) if args.token_budget > 0 else None
+    cache = ClassificationCache(args.cache) if args.cache else None
+    hedge = HedgePolicy(hedge_model=args.hedge_model, max_hedge_rate=args.hedge_max_rate) if args.hedge else None
+    scheduler_factory = None if args.no_scheduler else (lambda: scheduler_from_args(args))
+    near_dup = NearDuplicateIndex(threshold=args.near_dup) if args.near_dup > 0 else None
+
+    stub = None
+    api_keys, base_url = None, None
+    if uses_groq and not args.live:
+        stub = stub_from_args(args, prefix="stub-").start()
+        api_keys = ["stub"] if args.keys == 1 else [f"stub-{i}" for i in range(1, args.keys + 1)]
+        base_url = stub.base_url
+
+    try:
+        results = run_benchmark(examples, args.backend, args.concurrency, api_keys=api_keys, base_url=base_url,
+                                pre_classifier=pre_classifier, compactor=compactor, cache=cache, hedge=hedge,
+                                stream=args.stream, scheduler_factory=scheduler_factory, near_dup=near_dup)
+    finally:
+        if stub is not None:
+            stub.stop()
+        if cache is not None:
+            cache.close()
+
+    report = {
+        'benchmark_version': BENCHMARK_VERSION,
+        'config': {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'git_commit': _git_commit(),
+            'model': MODEL_NAME,
+            'prompt_version': PROMPT_VERSION,
+            'backend': args.backend,
+            'target': (f"stub ({args.stub_labeller}, latency {args.stub_latency})" if stub is not None
+                       else (os.getenv("GROQ_BASE_URL") or "groq") if uses_groq else "offline model"),
+            'concurrency': args.concurrency,
+            'keys': len(api_keys) if api_keys else None,
+            'seed': args.seed,
+            'limit': args.limit,
+            'rules_threshold': None if args.no_rules else args.rules_threshold,
+            'token_budget': args.token_budget,
+            'cache': bool(args.cache),
+            'stream': args.stream,
+            'near_dup': args.near_dup or None,
+            'hedge': {'model': args.hedge_model, 'max_rate': args.hedge_max_rate} if args.hedge else None,
+            'scheduler': None if args.no_scheduler else {'rpm': args.rpm, 'tpm': args.tpm},
+            'stub': stub.stats() if stub is not None else None,
+        },
+        'results': results,
+    }
+    print_report(report)
+
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Report saved to: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
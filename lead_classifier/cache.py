@@ -0,0 +1,164 @@
+"""
+Content-addressed classification cache.
+
+Labels are keyed on a hash of the normalised transcript, the model name, the
+temperature and the system-prompt version, so editing the prompt or swapping
+the model invalidates old entries automatically.
+
+Two tiers:
+  1. In-process LRU (size + TTL eviction) - shared across Streamlit reruns
+  2. SQLite on disk - survives process restarts
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .core import MODEL_NAME, SYSTEM_PROMPT, TEMPERATURE, normalize_transcript, prompt_fingerprint
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "LEAD_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "lead_classifier.sqlite3"),
+)
+DEFAULT_MAX_SIZE = 2048
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600  # One week
+
+
+def cache_key(conversation: str, model: str = MODEL_NAME, temperature: float = TEMPERATURE,
+              system_prompt: str = SYSTEM_PROMPT) -> str:
+    """Hash of everything that can change the label for a transcript"""
+    prompt_version = prompt_fingerprint(system_prompt)
+
+    digest = hashlib.sha256()
+    for part in (normalize_transcript(conversation), model, repr(float(temperature)), prompt_version):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class ClassificationCache:
+    """Two-tier (memory LRU + SQLite) cache of transcript labels"""
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, max_size: int = DEFAULT_MAX_SIZE,
+                 ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            # Streamlit serves each session from its own thread
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS classifications ("
+                " key TEXT PRIMARY KEY,"
+                " label TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    # --- lookups ---
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached label for a key, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                label, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return label
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT label, created_at FROM classifications WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    label, created_at = row
+                    if not self._expired(created_at, now):
+                        self._remember(key, label, created_at)
+                        self.disk_hits += 1
+                        return label
+                    self._db.execute("DELETE FROM classifications WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, label: str):
+        """Store a label in both tiers"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, label, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO classifications (key, label, created_at) VALUES (?, ?, ?)",
+                    (key, label, now),
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, label: str, created_at: float):
+        """Insert into the LRU tier, evicting the least recently used entries"""
+        self._memory[key] = (label, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    # --- housekeeping ---
+
+    def purge_expired(self) -> int:
+        """Drop expired rows from the SQLite tier; returns rows removed"""
+        if self._db is None or self.ttl_seconds is None:
+            return 0
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM classifications WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        """Empty both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM classifications")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'memory_entries': len(self._memory),
+            'evictions': self.evictions,
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,418 @@
+"""
+Pooled, warm Groq clients with retries, backoff and a circuit breaker.
+
+- One Groq client per (api_key, base_url) per process, on an httpx connection
+  pool with keep-alive, so Streamlit reruns reuse warm connections
+- Jittered exponential backoff on 429/5xx/connection errors, honouring the
+  `retry-after` header the API sends back
+- A circuit breaker that fails fast while the upstream is unhealthy
+- An optional RateLimitScheduler (scheduler.py) shared per API key that
+  paces requests to the RPM/TPM limits and adapts concurrency
+
+ResilientGroq / AsyncResilientGroq expose the same `.chat.completions.create`
+surface as the SDK clients, so classify_lead_groq works with either.
+"""
+
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .scheduler import Permit, RateLimitScheduler, estimate_request_tokens
+
+# Connection pool sizing - one keep-alive connection per concurrent caller
+POOL_MAX_CONNECTIONS = int(os.getenv("GROQ_POOL_MAX_CONNECTIONS", "32"))
+POOL_MAX_KEEPALIVE = int(os.getenv("GROQ_POOL_MAX_KEEPALIVE", "16"))
+POOL_KEEPALIVE_EXPIRY = 60.0
+REQUEST_TIMEOUT = float(os.getenv("GROQ_REQUEST_TIMEOUT", "30"))
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+# --- 1. ERRORS ---
+
+class GroqCallError(Exception):
+    """A Groq request that failed after retries (status_code is None for network errors)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(GroqCallError):
+    """Raised without calling Groq while the circuit breaker is open"""
+
+
+def _parse_retry_after(headers) -> Optional[float]:
+    """Seconds to wait from retry-after-ms / retry-after (delta-seconds or HTTP date)"""
+    if headers is None:
+        return None
+
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(parsed.timestamp() - time.time(), 0.0) if parsed else None
+
+
+def describe_failure(error: Exception) -> Tuple[bool, bool, Optional[int], Optional[float]]:
+    """Return (retryable, unhealthy, status_code, retry_after) for an SDK exception.
+
+    `unhealthy` marks failures that count against the circuit breaker:
+    5xx responses and network errors. 429s are retried but do not trip it.
+    """
+    status = getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    retry_after = _parse_retry_after(getattr(response, "headers", None))
+
+    if status is None:
+        # APIConnectionError / APITimeoutError (and raw httpx transport errors)
+        network = type(error).__name__ in {"APIConnectionError", "APITimeoutError"} or \
+            type(error).__module__.startswith("httpx")
+        return network, network, None, retry_after
+
+    return status in RETRYABLE_STATUS, status >= 500, status, retry_after
+
+
+# --- 2. RETRY POLICY & CIRCUIT BREAKER ---
+
+class RetryPolicy:
+    """Full-jitter exponential backoff, capped, with retry-after taking precedence"""
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 8.0,
+                 max_retry_after: float = 30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to sleep before retry number `attempt` (1-based)"""
+        if retry_after is not None:
+            # Small jitter so many waiting callers do not retry in lockstep
+            return min(retry_after, self.max_retry_after) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive unhealthy failures -> half-open probe after a cool-down"""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError unless a call may go through; True when the call is the half-open probe"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+                    raise CircuitOpenError(f"Groq circuit open - failing fast for another {remaining:.0f}s",
+                                           retry_after=remaining)
+                self.state = self.HALF_OPEN
+
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self.rejected += 1
+                    raise CircuitOpenError("Groq circuit half-open - waiting on the probe request")
+                self._probe_in_flight = True
+                return True
+        return False
+
+    def abandon_probe(self):
+        """The probe ended without an answer (cancelled, interrupted): re-open, and let the next call probe"""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._probe_in_flight:
+                self._probe_in_flight = False
+                self.state = self.OPEN
+                self.opened_at = time.monotonic() - self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, unhealthy: bool):
+        with self._lock:
+            self._probe_in_flight = False
+            if not unhealthy:
+                return
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'rejected': self.rejected,
+        }
+
+
+# --- 3. RESILIENT CLIENT WRAPPERS ---
+
+class _Completions:
+    def __init__(self, create):
+        self.create = create
+
+
+class _Chat:
+    def __init__(self, create):
+        self.completions = _Completions(create)
+
+
+class _ResilientBase:
+    def __init__(self, client=None, retry: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None,
+                 scheduler: Optional[RateLimitScheduler] = None, factory: Optional[Callable[[], Any]] = None):
+        if client is None and factory is None:
+            raise ValueError("Pass the SDK client or a factory that builds it")
+        self._client = client
+        # Building the SDK client imports groq (~0.2s); with a factory that waits for the first request
+        self._factory = factory
+        self._client_lock = threading.Lock()
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.scheduler = scheduler
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.chat = _Chat(self._create)
+
+    @property
+    def client(self):
+        """The wrapped groq.Groq / groq.AsyncGroq, built on first use when a factory was given"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def _handle_failure(self, error: Exception, attempt: int) -> float:
+        """Record the failure; return the delay before retrying or raise GroqCallError"""
+        retryable, unhealthy, status, retry_after = describe_failure(error)
+        self.breaker.record_failure(unhealthy)
+
+        if not retryable or attempt >= self.retry.max_attempts or self.breaker.state == CircuitBreaker.OPEN:
+            self.failures += 1
+            label = f"HTTP {status}" if status else type(error).__name__
+            raise GroqCallError(f"{label} after {attempt} attempt(s): {error}",
+                                status_code=status, retry_after=retry_after) from error
+
+        self.retries += 1
+        return self.retry.delay(attempt, retry_after)
+
+    def _raw_create(self):
+        """The SDK's with_raw_response.create (headers feed the scheduler), or None"""
+        if self.scheduler is None:
+            return None
+        return getattr(self.client.chat.completions, "with_raw_response", None)
+
+    def _release(self, permit: Optional[Permit], response=None, headers=None, error: Optional[Exception] = None):
+        if permit is None:
+            return
+        if error is None:
+            usage = getattr(response, "usage", None)
+            self.scheduler.release(permit, headers, actual_tokens=getattr(usage, "total_tokens", None))
+            return
+        _, _, status, retry_after = describe_failure(error)
+        # A failed request is assumed not to have consumed its token reservation
+        self.scheduler.release(permit, getattr(getattr(error, "response", None), "headers", None),
+                               actual_tokens=0, ok=False, rate_limited=status == 429, retry_after=retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            'calls': self.calls,
+            'retries': self.retries,
+            'failures': self.failures,
+            'breaker': self.breaker.snapshot(),
+        }
+        if self.scheduler is not None:
+            stats['scheduler'] = self.scheduler.stats()
+        return stats
+
+
+class ResilientGroq(_ResilientBase):
+    """groq.Groq with retries, backoff, a circuit breaker and optional rate-limit scheduling"""
+
+    def _send(self, kwargs) -> Tuple[Any, Any]:
+        raw_create = self._raw_create()
+        if raw_create is None:
+            return self.client.chat.completions.create(**kwargs), None
+        raw = raw_create.create(**kwargs)
+        return raw.parse(), raw.headers
+
+    def _create(self, **kwargs):
+        self.calls += 1
+        tokens = estimate_request_tokens(kwargs) if self.scheduler is not None else 0
+        attempt = 0
+        while True:
+            attempt += 1
+            probe = self.breaker.before_call()
+            try:
+                permit = self.scheduler.acquire_sync(tokens) if self.scheduler is not None else None
+                try:
+                    response, headers = self._send(kwargs)
+                except Exception as error:
+                    self._release(permit, error=error)
+                    probe = False  # _handle_failure settles the breaker
+                    delay = self._handle_failure(error, attempt)
+                else:
+                    self._release(permit, response, headers)
+                    probe = False
+                    self.breaker.record_success()
+                    return response
+            finally:
+                if probe:
+                    # Interrupted before the probe got an answer - don't leave the breaker waiting on it
+                    self.breaker.abandon_probe()
+            time.sleep(delay)
+
+
+class AsyncResilientGroq(_ResilientBase):
+    """groq.AsyncGroq with retries, backoff, a circuit breaker and optional rate-limit scheduling"""
+
+    async def _send(self, kwargs) -> Tuple[Any, Any]:
+        raw_create = self._raw_create()
+        if raw_create is None:
+            return await self.client.chat.completions.create(**kwargs), None
+        raw = await raw_create.create(**kwargs)
+        return await raw.parse(), raw.headers
+
+    async def _create(self, **kwargs):
+        self.calls += 1
+        tokens = estimate_request_tokens(kwargs) if self.scheduler is not None else 0
+        attempt = 0
+        while True:
+            attempt += 1
+            probe = self.breaker.before_call()
+            try:
+                permit = await self.scheduler.acquire(tokens) if self.scheduler is not None else None
+                try:
+                    response, headers = await self._send(kwargs)
+                except asyncio.CancelledError:
+                    # A hedge loser or abandoned caller - free the slot and stop
+                    if permit is not None:
+                        self.scheduler.cancel(permit)
+                    raise
+                except Exception as error:
+                    self._release(permit, error=error)
+                    probe = False  # _handle_failure settles the breaker
+                    delay = self._handle_failure(error, attempt)
+                else:
+                    self._release(permit, response, headers)
+                    probe = False
+                    self.breaker.record_success()
+                    return response
+            finally:
+                if probe:
+                    # Cancelled before the probe got an answer - don't leave the breaker waiting on it
+                    self.breaker.abandon_probe()
+            await asyncio.sleep(delay)
+
+
+# --- 4. PROCESS-WIDE FACTORIES ---
+
+_clients: Dict[Tuple[str, str], ResilientGroq] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_schedulers: Dict[str, Optional[RateLimitScheduler]] = {}
+_registry_lock = threading.Lock()
+
+
+def _breaker_for(base_url: str) -> CircuitBreaker:
+    """Sync and async clients talking to the same upstream share one breaker"""
+    with _registry_lock:
+        if base_url not in _breakers:
+            _breakers[base_url] = CircuitBreaker()
+        return _breakers[base_url]
+
+
+def _scheduler_for(api_key: str) -> Optional[RateLimitScheduler]:
+    """Rate limits are per API key, so every client using one key shares its scheduler (GROQ_RPM/GROQ_TPM)"""
+    with _registry_lock:
+        if api_key not in _schedulers:
+            _schedulers[api_key] = RateLimitScheduler.from_env(max_concurrency=POOL_MAX_CONNECTIONS)
+        return _schedulers[api_key]
+
+
+def _limits():
+    import httpx
+    return httpx.Limits(max_connections=POOL_MAX_CONNECTIONS,
+                        max_keepalive_connections=POOL_MAX_KEEPALIVE,
+                        keepalive_expiry=POOL_KEEPALIVE_EXPIRY)
+
+
+def get_groq_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> ResilientGroq:
+    """Process-wide pooled Groq client (built once, reused across reruns)"""
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    base_url = base_url or os.getenv("GROQ_BASE_URL") or ""
+    key = (api_key or "", base_url)
+
+    with _registry_lock:
+        client = _clients.get(key)
+    if client is not None:
+        return client
+
+    def build():
+        import httpx
+        from groq import Groq
+
+        return Groq(
+            api_key=api_key,
+            base_url=base_url or None,
+            max_retries=0,  # ResilientGroq owns retries
+            timeout=REQUEST_TIMEOUT,
+            http_client=httpx.Client(limits=_limits(), timeout=REQUEST_TIMEOUT),
+        )
+
+    # groq is imported when the first request goes out, not when the page starts
+    client = ResilientGroq(factory=build, breaker=_breaker_for(base_url), scheduler=_scheduler_for(api_key or ""))
+
+    with _registry_lock:
+        return _clients.setdefault(key, client)
+
+
+def create_async_groq_client(api_key: Optional[str] = None, base_url: Optional[str] = None,
+                             scheduler: Optional[RateLimitScheduler] = None) -> AsyncResilientGroq:
+    """Pooled AsyncGroq client for one event loop (httpx async pools are loop-bound).
+
+    `scheduler` overrides the key's shared one from GROQ_RPM/GROQ_TPM.
+    """
+    import httpx
+    from groq import AsyncGroq
+
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    base_url = base_url or os.getenv("GROQ_BASE_URL") or ""
+    raw = AsyncGroq(
+        api_key=api_key,
+        base_url=base_url or None,
+        max_retries=0,
+        timeout=REQUEST_TIMEOUT,
+        http_client=httpx.AsyncClient(limits=_limits(), timeout=REQUEST_TIMEOUT),
+    )
+    return AsyncResilientGroq(raw, breaker=_breaker_for(base_url),
+                              scheduler=scheduler or _scheduler_for(api_key or ""))
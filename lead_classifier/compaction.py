@@ -0,0 +1,184 @@
+"""
+Token-budgeted transcript compaction.
+
+Multi-day transcripts arrive padded with greetings, signatures and repeated
+brochure text. Before a transcript is sent to Groq it is compacted:
+
+  1. Boilerplate lines (greetings, thanks, signatures, bot intros) are dropped
+  2. Repeated lines are kept only once
+  3. The final customer turns are always kept in full
+  4. If it is still over budget, the oldest lines are dropped
+  5. Transcripts far beyond the budget are split into chunks that are
+     classified in parallel and merged (later chunks weigh more)
+"""
+
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Sequence
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("LEAD_TOKEN_BUDGET", "1500"))
+DEFAULT_KEEP_FINAL_TURNS = 4
+# Beyond budget * SPLIT_FACTOR the transcript is chunked instead of truncated
+DEFAULT_SPLIT_FACTOR = 3.0
+DEFAULT_MAX_CHUNKS = 8
+
+_SPEAKER_RE = re.compile(r'^\s*(customer|client|user|lead|agent|assistant|bot|sales|rep)\s*[:\-]\s*', re.IGNORECASE)
+_CUSTOMER_SPEAKERS = {"customer", "client", "user", "lead"}
+
+_BOILERPLATE_RE = re.compile(
+    r'^(?:'
+    r'(?:hi|hello|hey|hy|salam|aoa|assalam[ -]?[ou]?[ -]?alaikum|good (?:morning|afternoon|evening))'
+    r'|(?:thanks?|thank you|thx|shukriya|jazakallah(?: khair)?|welcome|ok(?:ay)?|ji|hmm+|sure)'
+    r'|(?:regards|best regards|kind regards|sent from my [\w ]+|--+)'
+    r'|(?:hello! )?i\'?m your ai assistant\..*'
+    r'|i am here to assist you with all queries related to abs developers\.?'
+    r')[\s!.,?]*$',
+    re.IGNORECASE,
+)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for Latin-script text)"""
+    return math.ceil(len(text) / 4)
+
+
+def _line_key(line: str) -> str:
+    """Speaker-less, case- and whitespace-folded form used for dedup/boilerplate checks"""
+    return _WHITESPACE_RE.sub(' ', _SPEAKER_RE.sub('', line)).strip().lower()
+
+
+def _is_customer(line: str) -> bool:
+    match = _SPEAKER_RE.match(line)
+    return bool(match) and match.group(1).lower() in _CUSTOMER_SPEAKERS
+
+
+class TranscriptCompactor:
+    """Shrink transcripts to a token budget while keeping the final customer turns"""
+
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET,
+                 keep_final_turns: int = DEFAULT_KEEP_FINAL_TURNS,
+                 split_factor: float = DEFAULT_SPLIT_FACTOR,
+                 max_chunks: int = DEFAULT_MAX_CHUNKS):
+        self.token_budget = token_budget
+        self.keep_final_turns = keep_final_turns
+        self.split_factor = split_factor
+        self.max_chunks = max_chunks
+
+        self._lock = threading.Lock()
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.compacted = 0
+        self.chunked = 0
+
+    def _tail_start(self, lines: List[str]) -> int:
+        """Index of the first line that must be kept verbatim"""
+        customer_positions = [i for i, line in enumerate(lines) if _is_customer(line)]
+        if customer_positions:
+            return customer_positions[-self.keep_final_turns:][0]
+        # No speaker labels - keep the last few lines instead
+        return max(len(lines) - self.keep_final_turns, 0)
+
+    def clean(self, conversation: str) -> List[str]:
+        """Drop blank, boilerplate and repeated lines; the tail is left untouched"""
+        lines = [line.strip() for line in conversation.strip().splitlines() if line.strip()]
+        tail_start = self._tail_start(lines)
+
+        kept, seen = [], set()
+        for line in lines[:tail_start]:
+            key = _line_key(line)
+            if not key or key in seen or _BOILERPLATE_RE.match(key):
+                continue
+            seen.add(key)
+            kept.append(line)
+        return kept + lines[tail_start:]
+
+    def _fit(self, lines: List[str], budget: int) -> List[str]:
+        """Drop the oldest head lines until the transcript fits the budget"""
+        tail_start = self._tail_start(lines)
+        head, tail = lines[:tail_start], lines[tail_start:]
+        used = sum(estimate_tokens(line) + 1 for line in tail)
+
+        kept: List[str] = []
+        for line in reversed(head):
+            cost = estimate_tokens(line) + 1
+            if used + cost > budget:
+                break
+            kept.append(line)
+            used += cost
+        kept.reverse()
+
+        omitted = len(head) - len(kept)
+        marker = [f"[... {omitted} earlier lines omitted ...]"] if omitted else []
+        return marker + kept + tail
+
+    def _chunks(self, lines: List[str]) -> List[List[str]]:
+        """Split into consecutive chunks under budget, built from the end backwards"""
+        chunks: List[List[str]] = []
+        current: List[str] = []
+        used = 0
+        for line in reversed(lines):
+            cost = estimate_tokens(line) + 1
+            if current and used + cost > self.token_budget:
+                chunks.append(current[::-1])
+                current, used = [], 0
+            current.append(line)
+            used += cost
+        if current:
+            chunks.append(current[::-1])
+        # Most recent chunks matter most - drop the oldest beyond max_chunks
+        return chunks[:self.max_chunks][::-1]
+
+    def plan(self, conversation: str) -> List[str]:
+        """One compacted transcript, or several chunks for very long ones"""
+        lines = self.clean(conversation)
+        total = sum(estimate_tokens(line) + 1 for line in lines)
+
+        if total <= self.token_budget:
+            parts = ["\n".join(lines)]
+        elif total <= self.token_budget * self.split_factor:
+            parts = ["\n".join(self._fit(lines, self.token_budget))]
+        else:
+            parts = ["\n".join(chunk) for chunk in self._chunks(lines)]
+
+        with self._lock:
+            self.tokens_in += estimate_tokens(conversation)
+            self.tokens_out += sum(estimate_tokens(part) for part in parts)
+            self.compacted += 1
+            if len(parts) > 1:
+                self.chunked += 1
+        return parts
+
+    def compact(self, conversation: str) -> str:
+        """Single transcript under budget (never chunked)"""
+        return "\n".join(self._fit(self.clean(conversation), self.token_budget))
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'transcripts': self.compacted,
+            'chunked': self.chunked,
+            'tokens_in': self.tokens_in,
+            'tokens_out': self.tokens_out,
+            'saved_fraction': round(1 - self.tokens_out / self.tokens_in, 4) if self.tokens_in else 0.0,
+        }
+
+
+def merge_chunk_labels(labels: Sequence[str]) -> str:
+    """Combine per-chunk labels; later chunks weigh more (final sentiment matters most)"""
+    if not labels:
+        raise ValueError("No chunk labels to merge")
+
+    votes: Counter = Counter()
+    for position, label in enumerate(labels, 1):
+        votes[label] += position
+
+    best = max(votes.values())
+    winners = {label for label, weight in votes.items() if weight == best}
+    # Ties go to the most recent chunk's label
+    for label in reversed(labels):
+        if label in winners:
+            return label
+    return labels[-1]
@@ -0,0 +1,295 @@
+"""
+Lead classifier core - shared by the Streamlit page, the batch engine and
+any other entry point that needs to classify a transcript.
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+# --- MODEL SETUP ---
+
+MODEL_NAME = "llama-3.1-8b-instant"
+TEMPERATURE = 0.2
+MAX_TOKENS = 5  # Limit output for single-word response
+
+LABELS = ("Hot", "Cold", "Dead")
+
+
+class ClassificationError(Exception):
+    """Raised when a transcript could not be classified (the cause is chained)"""
+
+
+# --- CLASSIFICATION PROMPT (System Instruction) ---
+
+SYSTEM_PROMPT = """
+You are an expert lead-classification system for ABS Developers, Pakistan's first Shariah-compliant real estate developer specializing in premium residential and commercial properties in Bahria Town, Lahore.
+
+## YOUR TASK
+Analyze the complete customer-agent conversation and classify it into EXACTLY ONE category. Output ONLY the category name as a single word with no punctuation, explanation, or additional text.
+
+## CLASSIFICATION CATEGORIES (Hot, Cold, Dead definitions are the same)
+
+### Hot
+A lead demonstrating HIGH PURCHASE INTENT with immediate action potential. Indicators include:
+✓ Asks about SPECIFIC projects, units, size/floor/facing preferences
+✓ Discusses PAYMENT DETAILS (down payment, installments, booking fee)
+✓ Shows BUDGET CLARITY, requests CONCRETE NEXT STEPS (site visit, booking)
+✓ Mentions bringing CNIC or other commitment documents
+✓ Discusses TIMELINE urgently ("Can I visit tomorrow?", "How soon can I book?")
+✓ Uses COMMITMENT LANGUAGE ("I'll take it", "Reserve a unit", "Let's proceed")
+
+Decision Rule: If 4+ hot indicators present AND customer shows readiness for next steps → Hot
+
+---
+
+### Cold
+A lead showing MILD INTEREST but NOT ready to commit. Indicators include:
+⚠ VAGUE INQUIRIES ("What do you have?", "Just looking around")
+⚠ PRICE SENSITIVITY (complains cost is high, asks for discounts)
+⚠ NO BUDGET CLARITY or DELAY TACTICS ("I'll think about it", "Maybe next month", "Call me later")
+⚠ NON-COMMITTAL RESPONSES ("Just send me details", "I'll review the brochure")
+
+Decision Rule: If person shows interest BUT lacks commitment indicators OR expresses uncertainty → Cold
+
+---
+
+### Dead
+A lead with ZERO PROPERTY PURCHASE INTENT or completely OFF-TOPIC. Indicators include:
+✗ JOB INQUIRIES or SUPPLIER/VENDOR QUERIES
+✗ WRONG EXPECTATIONS (looking for rent when ABS only sells)
+✗ IMMEDIATE DISQUALIFICATION ("I have no money", refuses all options)
+✗ SPAM/RANDOM or CLEARLY NOT A BUYER (competitor, journalist)
+
+Decision Rule: If person shows ZERO buying intent OR topic is completely unrelated → Dead
+
+---
+
+## CRITICAL RULES
+1. Output format: Single word only (Hot, Cold, or Dead) - no punctuation, no explanation, no extra characters
+2. Consider the OVERALL conversation arc, not just individual messages
+3. Final customer sentiment weighs more than initial questions
+4. Action-oriented language (visit, book, pay, reserve) = strong Hot signal
+5. Hesitation language (think, maybe, later, expensive) = Cold signal unless overcome
+6. Irrelevant topics or job inquiries = instant Dead classification
+7. Output ONLY one word: Hot, Cold, or Dead
+"""
+
+
+def prompt_fingerprint(system_prompt: str) -> str:
+    """Short hash identifying a prompt version"""
+    return hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()[:16]
+
+
+# Changes whenever the prompt text changes - part of every cache key
+PROMPT_VERSION = prompt_fingerprint(SYSTEM_PROMPT)
+
+
+# --- CLASSIFICATION HELPERS ---
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_transcript(conversation: str) -> str:
+    """Canonical form of a transcript for hashing (case and whitespace folded)"""
+    return _WHITESPACE_RE.sub(' ', conversation).strip().lower()
+
+
+def build_messages(conversation: str) -> List[Dict[str, str]]:
+    """Build the chat-completions message list for a transcript"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content":
+            "Conversation transcript:\n\n" + conversation.strip() +
+            "\n\nReturn only one word: Hot or Cold or Dead."
+        },
+    ]
+
+
+def normalize_label(text: str) -> str:
+    """Map raw model output onto Hot, Cold or Dead"""
+    normalized = text.strip().lower()
+
+    # Check for the expected output
+    if "hot" in normalized:
+        return "Hot"
+    if "cold" in normalized:
+        return "Cold"
+    if "dead" in normalized:
+        return "Dead"
+
+    # Fallback error for unexpected output
+    raise ValueError(f"Model returned text, but it was not Hot, Cold, or Dead. Response: '{text.strip()}'")
+
+
+# Stray prefixes a model may put before the label: whitespace, quotes,
+# markdown and a "Label:"-style lead-in
+_LABEL_PREFIX_RE = re.compile(
+    r'^[\s"\'`*_#>\[(]*'
+    r'(?:(?:label|classification|category|answer|lead|result)\s*[:=-]?[\s"\'`*_\[(]*)?'
+    r'(hot|cold|dead)', re.IGNORECASE)
+
+
+def resolve_label_prefix(text: str) -> Optional[str]:
+    """The label once the streamed text so far settles it, else None (keep reading)"""
+    match = _LABEL_PREFIX_RE.match(text)
+    return match.group(1).capitalize() if match else None
+
+
+class _LabelStream:
+    """Collects streamed deltas until resolve_label_prefix settles the label"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.ttft: Optional[float] = None
+        self.text = ''
+        self.label: Optional[str] = None
+        self.usage: Any = None
+        self.chunks = 0
+
+    def feed(self, chunk) -> bool:
+        """Take one chunk; True once the label is known and the stream can be closed"""
+        # Groq sends usage on the final chunk as x_groq.usage
+        usage = getattr(getattr(chunk, 'x_groq', None), 'usage', None)
+        if usage is not None:
+            self.usage = usage
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if not delta:
+            return False
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+        self.chunks += 1
+        self.text += delta
+        self.label = resolve_label_prefix(self.text)
+        return self.label is not None
+
+    def record(self, model: str, messages: List[Dict[str, str]]):
+        from .metrics import METRICS
+        METRICS.record_groq_stream(model, time.perf_counter() - self.started, self.ttft,
+                                   early_exit=self.label is not None, usage=self.usage,
+                                   messages=messages, completion_chunks=self.chunks)
+
+    def result(self) -> str:
+        if self.label is not None:
+            return self.label
+        try:
+            # The stream ended without a clean prefix - fall back to the substring match
+            return normalize_label(self.text)
+        except ValueError as e:
+            raise ClassificationError(f"Groq API Call Failed: {e}") from e
+
+
+def _stream_failed(model: str, stream: _LabelStream, error: Exception) -> ClassificationError:
+    from .metrics import METRICS
+    METRICS.record_groq_call(model, time.perf_counter() - stream.started, error=error)
+    return ClassificationError(f"Groq API Call Failed: {error}")
+
+
+def classify_lead_groq(conversation: str, client, model: str = MODEL_NAME, stream: bool = False) -> str:
+    """Send conversation to Groq and normalize the single-word label.
+
+    With stream=True the completion is read token by token and closed as
+    soon as the label is unambiguous.
+    """
+    if stream:
+        return _classify_lead_groq_stream(conversation, client, model)
+
+    # Imported here so `python -m lead_classifier.metrics` does not import itself twice
+    from .metrics import METRICS
+
+    started = time.perf_counter()
+    try:
+        # Groq responses expose the text at choices[0].message.content
+        chat_completion = client.chat.completions.create(
+            model=model,
+            messages=build_messages(conversation),
+            temperature=TEMPERATURE,
+            max_tokens=MAX_TOKENS,
+        )
+    except Exception as e:
+        # Catch and re-raise any Groq API or network errors
+        METRICS.record_groq_call(model, time.perf_counter() - started, error=e)
+        raise ClassificationError(f"Groq API Call Failed: {e}") from e
+
+    METRICS.record_groq_call(model, time.perf_counter() - started, chat_completion)
+    try:
+        return normalize_label(chat_completion.choices[0].message.content)
+    except ValueError as e:
+        raise ClassificationError(f"Groq API Call Failed: {e}") from e
+
+
+async def classify_lead_groq_async(conversation: str, client, model: str = MODEL_NAME,
+                                   stream: bool = False) -> str:
+    """Async twin of classify_lead_groq for use with groq.AsyncGroq"""
+    if stream:
+        return await _classify_lead_groq_stream_async(conversation, client, model)
+
+    from .metrics import METRICS
+
+    messages = build_messages(conversation)
+    started = time.perf_counter()
+    try:
+        chat_completion = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=TEMPERATURE,
+            max_tokens=MAX_TOKENS,
+        )
+    except asyncio.CancelledError:
+        # A hedge loser: the request was still sent
+        METRICS.record_groq_cancelled(model, time.perf_counter() - started, messages)
+        raise
+    except Exception as e:
+        METRICS.record_groq_call(model, time.perf_counter() - started, error=e)
+        raise ClassificationError(f"Groq API Call Failed: {e}") from e
+
+    METRICS.record_groq_call(model, time.perf_counter() - started, chat_completion)
+    try:
+        return normalize_label(chat_completion.choices[0].message.content)
+    except ValueError as e:
+        raise ClassificationError(f"Groq API Call Failed: {e}") from e
+
+
+def _classify_lead_groq_stream(conversation: str, client, model: str) -> str:
+    messages = build_messages(conversation)
+    state = _LabelStream()
+    try:
+        response = client.chat.completions.create(
+            model=model, messages=messages, temperature=TEMPERATURE, max_tokens=MAX_TOKENS, stream=True)
+        try:
+            for chunk in response:
+                if state.feed(chunk):
+                    break
+        finally:
+            # Closing early drops the connection instead of waiting for the rest
+            response.close()
+    except Exception as e:
+        raise _stream_failed(model, state, e) from e
+
+    state.record(model, messages)
+    return state.result()
+
+
+async def _classify_lead_groq_stream_async(conversation: str, client, model: str) -> str:
+    messages = build_messages(conversation)
+    state = _LabelStream()
+    try:
+        response = await client.chat.completions.create(
+            model=model, messages=messages, temperature=TEMPERATURE, max_tokens=MAX_TOKENS, stream=True)
+        try:
+            async for chunk in response:
+                if state.feed(chunk):
+                    break
+        finally:
+            await response.close()
+    except asyncio.CancelledError:
+        from .metrics import METRICS
+        METRICS.record_groq_cancelled(model, time.perf_counter() - state.started, messages)
+        raise
+    except Exception as e:
+        raise _stream_failed(model, state, e) from e
+
+    state.record(model, messages)
+    return state.result()
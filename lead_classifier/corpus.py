@@ -0,0 +1,93 @@
+"""
+Labelled lead corpus loader.
+
+Reads the Hot/Cold/Dead x English/Urdu example transcripts shipped in
+`leads/` (or `leads.zip`). Each paragraph of a .docx file is one example.
+Only the standard library is used - a .docx is a zip of XML.
+"""
+
+import html
+import io
+import os
+import re
+import zipfile
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_LEADS_DIR = os.path.join(REPO_ROOT, "leads")
+DEFAULT_LEADS_ZIP = os.path.join(REPO_ROOT, "leads.zip")
+
+_PARAGRAPH_RE = re.compile(r'<w:p[ >].*?</w:p>', re.DOTALL)
+_TAG_RE = re.compile(r'<[^>]+>')
+# Word bullet glyphs from the Symbol font, plus ordinary bullets
+_BULLET_RE = re.compile('^[\uf0b7\u2022*\\s-]+')
+
+
+def _label_from_filename(filename: str) -> Optional[str]:
+    """'hot Urdu.docx' -> 'Hot'"""
+    stem = os.path.splitext(os.path.basename(filename))[0].lower()
+    for label in ("hot", "cold", "dead"):
+        if stem.startswith(label):
+            return label.capitalize()
+    return None
+
+
+def _language_from_filename(filename: str) -> str:
+    return "urdu" if "urdu" in os.path.basename(filename).lower() else "english"
+
+
+def read_docx_paragraphs(source) -> List[str]:
+    """Return the non-empty paragraphs of a .docx (path or file object)"""
+    with zipfile.ZipFile(source) as docx:
+        xml = docx.read('word/document.xml').decode('utf-8')
+
+    paragraphs = []
+    for raw in _PARAGRAPH_RE.findall(xml):
+        text = html.unescape(_TAG_RE.sub('', raw))
+        text = _BULLET_RE.sub('', text).strip()
+        if text:
+            paragraphs.append(text)
+    return paragraphs
+
+
+def load_leads_corpus(leads_dir: str = DEFAULT_LEADS_DIR,
+                      leads_zip: str = DEFAULT_LEADS_ZIP) -> List[Dict[str, str]]:
+    """Load every labelled example as {'text', 'label', 'language', 'source'}.
+
+    Reads `leads/` when it exists, otherwise falls back to `leads.zip`.
+    """
+    examples = []
+
+    if os.path.isdir(leads_dir):
+        for filename in sorted(os.listdir(leads_dir)):
+            label = _label_from_filename(filename)
+            if not label or not filename.endswith('.docx'):
+                continue
+            for text in read_docx_paragraphs(os.path.join(leads_dir, filename)):
+                examples.append({
+                    'text': text,
+                    'label': label,
+                    'language': _language_from_filename(filename),
+                    'source': filename,
+                })
+
+    elif os.path.exists(leads_zip):
+        with zipfile.ZipFile(leads_zip) as archive:
+            for name in sorted(archive.namelist()):
+                label = _label_from_filename(name)
+                if not label or not name.endswith('.docx'):
+                    continue
+                with archive.open(name) as member:
+                    paragraphs = read_docx_paragraphs(io.BytesIO(member.read()))
+                for text in paragraphs:
+                    examples.append({
+                        'text': text,
+                        'label': label,
+                        'language': _language_from_filename(name),
+                        'source': os.path.basename(name),
+                    })
+
+    else:
+        raise FileNotFoundError(f"No labelled leads found at {leads_dir} or {leads_zip}")
+
+    return examples
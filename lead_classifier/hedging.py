@@ -0,0 +1,233 @@
+"""
+Hedged requests and multi-model fallback for tail latency.
+
+One slow Groq response sets the latency an agent sees. With a HedgePolicy
+the backend sends the primary request and, if it has not answered by a
+deadline taken from the primary model's own latency percentile, sends a
+second request - to the same model or a configured fallback model - and
+uses whichever valid answer arrives first. The loser is cancelled.
+
+A primary that fails outright is retried on the hedge model straight away
+(multi-model fallback). Hedges are capped at `max_hedge_rate` of recent
+requests so the extra cost stays bounded.
+
+    LEAD_HEDGE=1                          enable in the Streamlit page
+    LEAD_HEDGE_MODEL=llama-3.3-70b-versatile
+    LEAD_HEDGE_PERCENTILE=0.95  LEAD_HEDGE_MAX_RATE=0.1
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from .metrics import RollingHistogram
+
+DEFAULT_PERCENTILE = float(os.getenv("LEAD_HEDGE_PERCENTILE", "0.95"))
+DEFAULT_MAX_HEDGE_RATE = float(os.getenv("LEAD_HEDGE_MAX_RATE", "0.1"))
+
+
+class _Request:
+    """One request's entry in the hedge-budget window"""
+    __slots__ = ('hedged',)
+
+    def __init__(self):
+        self.hedged = False
+
+
+class HedgePolicy:
+    """Per-model latency tracking, the adaptive hedge deadline and the hedge budget"""
+
+    def __init__(self, hedge_model: Optional[str] = None, percentile: float = DEFAULT_PERCENTILE,
+                 initial_delay: float = 1.0, min_delay: float = 0.05, max_delay: float = 5.0,
+                 max_hedge_rate: float = DEFAULT_MAX_HEDGE_RATE, min_samples: int = 20,
+                 window: int = 512, workers: int = 32):
+        self.hedge_model = hedge_model
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_hedge_rate = max_hedge_rate
+        self.min_samples = min_samples
+        self.window = window
+
+        self._latency: Dict[str, RollingHistogram] = {}
+        self._decisions: Deque[_Request] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._workers = workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+        self.budget_denied = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["HedgePolicy"]:
+        """The policy configured by LEAD_HEDGE* variables, or None when hedging is off"""
+        if os.getenv("LEAD_HEDGE", "0").lower() not in ("1", "true", "yes", "on"):
+            return None
+        return cls(hedge_model=os.getenv("LEAD_HEDGE_MODEL") or None)
+
+    # --- latency & budget ---
+
+    def observe(self, model: str, seconds: float):
+        with self._lock:
+            histogram = self._latency.get(model)
+            if histogram is None:
+                histogram = self._latency[model] = RollingHistogram(self.window)
+            histogram.observe(seconds)
+
+    def deadline(self, model: str) -> float:
+        """Seconds to wait for `model` before hedging: its latency percentile, clamped"""
+        with self._lock:
+            histogram = self._latency.get(model)
+            if histogram is None or len(histogram.values) < self.min_samples:
+                return self.initial_delay
+            value = histogram.quantiles((self.percentile,))[self.percentile]
+        return min(max(value, self.min_delay), self.max_delay)
+
+    def _start_request(self) -> _Request:
+        """Count a new request; the returned entry is what _acquire_hedge marks for it"""
+        request = _Request()
+        with self._lock:
+            self.requests += 1
+            self._decisions.append(request)
+        return request
+
+    def _acquire_hedge(self, request: _Request) -> bool:
+        """Spend hedge budget for `request` if the recent hedge rate allows it.
+
+        The request's own entry is marked - with concurrent callers the newest
+        entry in the window usually belongs to some other request.
+        """
+        with self._lock:
+            hedged = sum(1 for entry in self._decisions if entry.hedged)
+            if (hedged + 1) > self.max_hedge_rate * len(self._decisions):
+                self.budget_denied += 1
+                return False
+            request.hedged = True
+            self.hedges += 1
+            return True
+
+    def _record(self, won_by_hedge: bool, fallback: bool):
+        with self._lock:
+            if won_by_hedge:
+                self.hedge_wins += 1
+            if fallback:
+                self.fallbacks += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'hedges': self.hedges,
+                'hedge_rate': round(self.hedges / self.requests, 4) if self.requests else 0.0,
+                'hedge_wins': self.hedge_wins,
+                'fallbacks': self.fallbacks,
+                'budget_denied': self.budget_denied,
+                'latency': {model: h.snapshot() for model, h in self._latency.items()},
+            }
+
+    # --- hedged calls ---
+
+    def _timed(self, model: str, call: Callable[[str], Any]) -> Any:
+        started = time.perf_counter()
+        result = call(model)
+        self.observe(model, time.perf_counter() - started)
+        return result
+
+    async def _timed_async(self, model: str, call: Callable[[str], Awaitable[Any]]) -> Any:
+        started = time.perf_counter()
+        try:
+            result = await call(model)
+        except asyncio.CancelledError:
+            # A cancelled loser would have taken at least this long - leaving it out would bias the
+            # percentile (and so the hedge deadline) towards the fast requests
+            self.observe(model, time.perf_counter() - started)
+            raise
+        self.observe(model, time.perf_counter() - started)
+        return result
+
+    def _second_model(self, primary_model: str, primary_failed: bool, request: _Request) -> Optional[str]:
+        """Model for the second request, or None when no second request should be sent.
+
+        A failed primary falls back to the hedge model without spending hedge
+        budget (it replaces a call rather than duplicating one); re-sending to
+        the same model is pointless there, since the client already retried.
+        """
+        if primary_failed:
+            return self.hedge_model if self.hedge_model not in (None, primary_model) else None
+        if not self._acquire_hedge(request):
+            return None
+        return self.hedge_model or primary_model
+
+    def run(self, primary_model: str, call: Callable[[str], Any]) -> Tuple[Any, str]:
+        """Run call(model) with hedging; returns (result, model that answered).
+
+        Sync calls cannot be interrupted mid-request, so a losing thread runs
+        to completion in the background and its answer is discarded.
+        """
+        request = self._start_request()
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="hedge")
+            pool = self._pool
+
+        primary: Future = pool.submit(self._timed, primary_model, call)
+        done, _ = wait([primary], timeout=self.deadline(primary_model))
+        primary_failed = bool(done) and primary.exception() is not None
+        if done and not primary_failed:
+            return primary.result(), primary_model
+
+        second_model = self._second_model(primary_model, primary_failed, request)
+        if second_model is None:
+            return primary.result(), primary_model
+
+        secondary: Future = pool.submit(self._timed, second_model, call)
+        pending = {secondary} if primary_failed else {primary, secondary}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    self._record(future is secondary, primary_failed)
+                    return future.result(), primary_model if future is primary else second_model
+        # Both failed - surface the primary's error
+        return primary.result(), primary_model
+
+    async def run_async(self, primary_model: str, call: Callable[[str], Awaitable[Any]]) -> Tuple[Any, str]:
+        """Async twin of run(); the losing request is cancelled"""
+        request = self._start_request()
+        primary = asyncio.ensure_future(self._timed_async(primary_model, call))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.deadline(primary_model))
+            primary_failed = bool(done) and primary.exception() is not None
+            if done and not primary_failed:
+                return primary.result(), primary_model
+
+            second_model = self._second_model(primary_model, primary_failed, request)
+            if second_model is None:
+                return await primary, primary_model
+
+            secondary = asyncio.ensure_future(self._timed_async(second_model, call))
+            tasks.append(secondary)
+            pending = {secondary} if primary_failed else {primary, secondary}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._record(task is secondary, primary_failed)
+                        return task.result(), primary_model if task is primary else second_model
+            return primary.result(), primary_model
+        finally:
+            # Cancel the loser (or everything, if our caller gave up)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
@@ -0,0 +1,380 @@
+"""
+Durable classification queue on SQLite (WAL).
+
+Every uploaded row becomes a task row on disk, so a restarted process picks
+up exactly where the last one stopped instead of re-sending the backlog to
+Groq:
+
+  - idempotent job ids: re-submitting the same file returns the existing job
+    (a new one if that job was cancelled)
+  - workers lease tasks in batches; a lease that is not acknowledged within
+    the visibility timeout (the worker crashed or the process restarted)
+    makes the task visible again
+  - a failed task is retried with backoff up to `max_attempts`, then moved
+    to the dead-letter state with its last error
+  - results of a batch are acknowledged in one transaction
+
+QueueWorkerPool runs `workers` threads that lease, classify and acknowledge.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_QUEUE_PATH = os.getenv(
+    "LEAD_QUEUE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "lead_jobs.sqlite3"),
+)
+DEFAULT_VISIBILITY_SECONDS = float(os.getenv("LEAD_QUEUE_VISIBILITY_SECONDS", "120"))
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("LEAD_QUEUE_MAX_ATTEMPTS", "3"))
+DEFAULT_BATCH_SIZE = int(os.getenv("LEAD_QUEUE_BATCH_SIZE", "8"))
+RETRY_BACKOFF_SECONDS = 2.0
+
+# Task states
+QUEUED, LEASED, DONE, DEAD = "queued", "leased", "done", "dead"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    cancelled INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    job_id TEXT NOT NULL,
+    row_index INTEGER NOT NULL,
+    record_id TEXT,
+    conversation TEXT NOT NULL,
+    row_json TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    label TEXT,
+    source TEXT,
+    error TEXT,
+    latency_ms REAL,
+    updated_at REAL,
+    PRIMARY KEY (job_id, row_index)
+);
+CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (status, available_at);
+"""
+
+
+# One job with its progress, aggregated from its tasks without reading them into Python
+_JOB_COLUMNS = ('job_id', 'filename', 'total', 'created_at', 'cancelled', 'completed', 'failed', 'started',
+                'updated_at')
+_JOB_QUERY = f"""
+SELECT jobs.job_id, jobs.filename, jobs.total, jobs.created_at, jobs.cancelled,
+       COALESCE(SUM(tasks.status IN ('{DONE}', '{DEAD}')), 0),
+       COALESCE(SUM(tasks.status = '{DEAD}'), 0),
+       COALESCE(SUM(tasks.status != '{QUEUED}' OR tasks.attempts > 0), 0),
+       MAX(tasks.updated_at)
+FROM jobs LEFT JOIN tasks USING (job_id)
+"""
+
+
+def job_id_for(filename: str, records: List[Dict[str, Any]]) -> str:
+    """Content-derived job id - the same upload always maps to the same job"""
+    digest = hashlib.sha256(filename.encode('utf-8'))
+    for record in records:
+        digest.update(b'\x00' + str(record.get('id')).encode('utf-8') + b'\x00')
+        digest.update(record['conversation'].encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+class Task:
+    """One leased row"""
+
+    __slots__ = ('job_id', 'row_index', 'conversation', 'attempts')
+
+    def __init__(self, job_id: str, row_index: int, conversation: str, attempts: int):
+        self.job_id = job_id
+        self.row_index = row_index
+        self.conversation = conversation
+        self.attempts = attempts
+
+
+class JobQueue:
+    """SQLite-backed task queue; safe to share between threads (one connection per thread)"""
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, visibility_seconds: float = DEFAULT_VISIBILITY_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.visibility_seconds = visibility_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db.executescript(_SCHEMA)
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _transaction(self):
+        return _Transaction(self._db)
+
+    # --- producers ---
+
+    def submit(self, records: Iterable[Dict[str, Any]], filename: str = "upload",
+               job_id: Optional[str] = None) -> Tuple[str, bool]:
+        """Enqueue every record; returns (job_id, created).
+
+        An existing job with that id is left untouched and returned, unless it
+        was cancelled: then the records go into a new job ("<job_id>-1", ...).
+        """
+        records = list(records)
+        base_id = job_id or job_id_for(filename, records)
+        now = time.time()
+        with self._transaction() as db:
+            job_id, generation = base_id, 0
+            while True:
+                existing = db.execute("SELECT cancelled FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+                if existing is None or not existing[0]:
+                    break
+                generation += 1
+                job_id = f"{base_id}-{generation}"
+            created = existing is None
+            if created:
+                db.execute("INSERT INTO jobs (job_id, filename, total, created_at) VALUES (?, ?, ?, ?)",
+                           (job_id, filename, len(records), now))
+                db.executemany(
+                    "INSERT INTO tasks (job_id, row_index, record_id, conversation, row_json, status, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(job_id, index, str(record.get('id')), record['conversation'],
+                      json.dumps(record.get('row'), ensure_ascii=False) if record.get('row') else None,
+                      QUEUED, now) for index, record in enumerate(records)])
+        return job_id, created
+
+    def cancel(self, job_id: str):
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET cancelled = 1 WHERE job_id = ?", (job_id,))
+
+    def requeue_dead(self, job_id: str) -> int:
+        """Give dead-lettered tasks of a job a fresh set of attempts"""
+        with self._transaction() as db:
+            return db.execute(
+                "UPDATE tasks SET status = ?, attempts = 0, available_at = 0, error = NULL, updated_at = ?"
+                " WHERE job_id = ? AND status = ?", (QUEUED, time.time(), job_id, DEAD)).rowcount
+
+    # --- consumers ---
+
+    def lease(self, owner: str, limit: int = DEFAULT_BATCH_SIZE) -> List[Task]:
+        """Claim up to `limit` visible tasks (queued, or leased and past their visibility timeout)"""
+        now = time.time()
+        with self._transaction() as db:
+            # A task whose lease expired after its last allowed attempt never acked - dead-letter it
+            db.execute(
+                "UPDATE tasks SET status = ?, error = COALESCE(error, 'lease expired'), lease_owner = NULL,"
+                " updated_at = ? WHERE status = ? AND available_at <= ? AND attempts >= ?",
+                (DEAD, now, LEASED, now, self.max_attempts))
+            rows = db.execute(
+                "UPDATE tasks SET status = ?, attempts = attempts + 1, available_at = ?, lease_owner = ?,"
+                " updated_at = ? WHERE rowid IN ("
+                "  SELECT tasks.rowid FROM tasks JOIN jobs USING (job_id)"
+                "  WHERE tasks.status IN (?, ?) AND tasks.available_at <= ? AND jobs.cancelled = 0"
+                "  ORDER BY jobs.created_at, tasks.row_index LIMIT ?)"
+                " RETURNING job_id, row_index, conversation, attempts",
+                (LEASED, now + self.visibility_seconds, owner, now, QUEUED, LEASED, now, limit)).fetchall()
+        return [Task(*row) for row in rows]
+
+    def ack(self, owner: str, results: List[Tuple[Task, Optional[str], Optional[str], Optional[str], float]]):
+        """Record a batch of (task, label, source, error, latency_ms) in one transaction.
+
+        Failures go back to the queue with backoff, or to the dead letters
+        once attempts run out. Tasks whose lease was lost are ignored.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            for task, label, source, error, latency_ms in results:
+                if error is None:
+                    status, available_at = DONE, 0
+                elif task.attempts >= self.max_attempts:
+                    status, available_at = DEAD, 0
+                else:
+                    status, available_at = QUEUED, now + RETRY_BACKOFF_SECONDS * (2 ** (task.attempts - 1))
+                db.execute(
+                    "UPDATE tasks SET status = ?, available_at = ?, label = ?, source = ?, error = ?,"
+                    " latency_ms = ?, lease_owner = NULL, updated_at = ?"
+                    " WHERE job_id = ? AND row_index = ? AND status = ? AND lease_owner = ?",
+                    (status, available_at, label, source, error, latency_ms, now,
+                     task.job_id, task.row_index, LEASED, owner))
+
+    def extend(self, owner: str, tasks: List[Task]):
+        """Push the visibility timeout out for tasks still being worked on"""
+        with self._transaction() as db:
+            db.executemany(
+                "UPDATE tasks SET available_at = ? WHERE job_id = ? AND row_index = ? AND lease_owner = ?",
+                [(time.time() + self.visibility_seconds, t.job_id, t.row_index, owner) for t in tasks])
+
+    # --- reads ---
+
+    def job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The job with its progress: completed/failed/started task counts and the last task update"""
+        row = self._db.execute(f"{_JOB_QUERY} WHERE jobs.job_id = ? GROUP BY jobs.job_id", (job_id,)).fetchone()
+        return None if row is None else dict(zip(_JOB_COLUMNS, row))
+
+    def jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent first, each with its progress as in job()"""
+        rows = self._db.execute(f"{_JOB_QUERY} WHERE jobs.job_id IN ("
+                                " SELECT job_id FROM jobs ORDER BY created_at DESC LIMIT ?)"
+                                " GROUP BY jobs.job_id ORDER BY jobs.created_at DESC", (limit,)).fetchall()
+        return [dict(zip(_JOB_COLUMNS, row)) for row in rows]
+
+    def labels(self, job_id: str) -> Dict[str, int]:
+        """Classified tasks per label"""
+        return dict(self._db.execute("SELECT label, COUNT(*) FROM tasks WHERE job_id = ? AND label IS NOT NULL"
+                                     " GROUP BY label", (job_id,)).fetchall())
+
+    def tasks(self, job_id: str) -> List[Dict[str, Any]]:
+        columns = ('row_index', 'record_id', 'conversation', 'row_json', 'status', 'attempts', 'label',
+                   'source', 'error', 'latency_ms', 'updated_at')
+        rows = self._db.execute(f"SELECT {', '.join(columns)} FROM tasks WHERE job_id = ? ORDER BY row_index",
+                                (job_id,)).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def rows(self, job_id: str, start: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """One page of a job's tasks from row `start`, without the transcripts - a primary-key range scan"""
+        columns = ('row_index', 'record_id', 'status', 'attempts', 'label', 'source', 'error', 'latency_ms')
+        rows = self._db.execute(f"SELECT {', '.join(columns)} FROM tasks WHERE job_id = ? AND row_index >= ?"
+                                " ORDER BY row_index LIMIT ?", (job_id, start, limit)).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def counts(self, job_id: Optional[str] = None) -> Dict[str, int]:
+        """Tasks per state, for one job or the whole queue"""
+        where, params = ("WHERE job_id = ?", (job_id,)) if job_id else ("", ())
+        rows = self._db.execute(f"SELECT status, COUNT(*) FROM tasks {where} GROUP BY status", params).fetchall()
+        return {QUEUED: 0, LEASED: 0, DONE: 0, DEAD: 0, **dict(rows)}
+
+    def dead_letters(self, job_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Dead-lettered tasks (of one job, or the whole queue) with their last error"""
+        where, params = ("AND job_id = ?", (DEAD, job_id)) if job_id else ("", (DEAD,))
+        rows = self._db.execute("SELECT job_id, row_index, record_id, error, attempts FROM tasks"
+                                f" WHERE status = ? {where} ORDER BY job_id, row_index", params).fetchall()
+        return [dict(zip(('job_id', 'row_index', 'record_id', 'error', 'attempts'), row), status=DEAD)
+                for row in rows]
+
+    def close(self):
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK - takes the write lock up front so leases never race"""
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+class QueueWorkerPool:
+    """`workers` threads that lease batches, classify them and acknowledge the results"""
+
+    def __init__(self, queue: JobQueue, classify: Callable[[str], Tuple[str, str]], workers: int = 8,
+                 batch_size: int = DEFAULT_BATCH_SIZE, poll_interval: float = 0.5):
+        self.queue = queue
+        self.classify = classify
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        # Unique per process start, so a restarted process never acks its predecessor's leases
+        self.owner_prefix = uuid.uuid4().hex[:8]
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.processed = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> "QueueWorkerPool":
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(f"{self.owner_prefix}-{index}",),
+                                      name=f"queue-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def notify(self):
+        """Wake idle workers (new work was submitted)"""
+        self._wake.set()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Finish the current batches and stop; unleased tasks stay queued on disk"""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self, owner: str):
+        while not self._stop.is_set():
+            try:
+                tasks = self.queue.lease(owner, self.batch_size)
+                if tasks:
+                    self._process(owner, tasks)
+                    continue
+            except Exception as e:
+                # A locked or unavailable database must not kill the worker; its leases expire and are retried
+                print(f"✗ Queue worker {owner}: {type(e).__name__}: {e}", file=sys.stderr)
+                with self._lock:
+                    self.errors += 1
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _process(self, owner: str, tasks: List[Task]):
+        results = []
+        deadline = time.monotonic() + self.queue.visibility_seconds / 2
+        for index, task in enumerate(tasks):
+            if time.monotonic() > deadline:
+                # A slow batch keeps its remaining tasks leased
+                self.queue.extend(owner, tasks[index:])
+                deadline = time.monotonic() + self.queue.visibility_seconds / 2
+            started = time.perf_counter()
+            try:
+                label, source = self.classify(task.conversation)
+                error = None
+            except Exception as e:
+                label, source, error = None, None, str(e) or type(e).__name__
+            results.append((task, label, source, error, round((time.perf_counter() - started) * 1000, 1)))
+        self.queue.ack(owner, results)
+
+        with self._lock:
+            self.batches += 1
+            self.processed += len(results)
+            self.failed += sum(1 for result in results if result[3] is not None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'batch_size': self.batch_size,
+            'batches': self.batches,
+            'processed': self.processed,
+            'failed_attempts': self.failed,
+            'worker_errors': self.errors,
+            'queue': self.queue.counts(),
+        }
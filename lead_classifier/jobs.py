@@ -0,0 +1,180 @@
+"""
+Background bulk-classification jobs for the Streamlit page.
+
+An uploaded CSV/JSONL export becomes a job in the SQLite JobQueue whose rows
+are classified by a shared worker pool while the page keeps rendering. The
+DurableJobManager is process-wide (held with st.cache_resource), not tied to
+the browser session, so a refresh re-attaches to the same job through its
+id, and jobs survive a restart of the process and resume where they stopped.
+"""
+
+import csv
+import io
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .backends import ClassifierBackend
+from .jobqueue import DEAD, JobQueue, LEASED, QueueWorkerPool
+from .jobqueue import DONE as TASK_DONE
+from .metrics import METRICS
+from .rules import RulePreClassifier
+
+DEFAULT_WORKERS = int(os.getenv("LEAD_BULK_WORKERS", "8"))
+DEFAULT_MAX_JOBS = 20
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "error", "cancelled"
+
+
+def classify_with_rules(conversation: str, backend: ClassifierBackend,
+                        pre_classifier: Optional[RulePreClassifier] = None) -> Tuple[str, str]:
+    """Rules first, then the backend; returns (label, source) and records METRICS"""
+    with METRICS.classification() as outcome:
+        if pre_classifier is not None:
+            result = pre_classifier.try_classify(conversation)
+            if result is not None:
+                outcome.source, outcome.label = "rules", result.label
+                return result.label, "rules"
+        outcome.source = backend.name
+        outcome.label, outcome.source = backend.classify_with_source(conversation)
+        return outcome.label, outcome.source
+
+
+def results_csv(records: List[Dict[str, Any]], rows: List[Dict[str, Any]]) -> str:
+    """The uploaded rows with label/source/error columns appended (finished rows only)"""
+    original = [r.get('row') or {'id': r['id'], 'conversation': r['conversation']} for r in records]
+    fieldnames = list(dict.fromkeys(name for row in original for name in row))
+    fieldnames += [name for name in ('label', 'source', 'error') if name not in fieldnames]
+
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    for source_row, row in zip(original, rows):
+        if row['status'] in (DONE, FAILED):
+            writer.writerow({**source_row, 'label': row['label'], 'source': row['source'],
+                             'error': row['error']})
+    return out.getvalue()
+
+
+# Task state on disk -> row status shown on the page
+_ROW_STATUS = {LEASED: RUNNING, TASK_DONE: DONE, DEAD: FAILED}
+
+
+def _row(task: Dict[str, Any]) -> Dict[str, Any]:
+    return {'id': task['record_id'], 'status': _ROW_STATUS.get(task['status'], QUEUED), 'label': task['label'],
+            'source': task['source'], 'error': task['error'], 'latency_ms': task['latency_ms'],
+            'attempts': task['attempts']}
+
+
+class StoredJob:
+    """A queued job's progress, read from the JobQueue's per-job aggregate.
+
+    The task rows themselves (`rows`, `records`, `results_csv()`) are only
+    read from disk when asked for, e.g. when the results are downloaded;
+    `page()` reads one screenful.
+    """
+
+    def __init__(self, job: Dict[str, Any], queue: JobQueue):
+        self.queue = queue
+        self.job_id = job['job_id']
+        self.filename = job['filename']
+        self.created_at = job['created_at']
+        self.cancelled = bool(job['cancelled'])
+        self.total = job['total']
+        self.completed = job['completed']
+        self.failed = job['failed']
+        self.started = job['started']
+        self.finished_at: Optional[float] = (job['updated_at'] or self.created_at) \
+            if self.completed >= self.total else None
+
+    @property
+    def progress(self) -> float:
+        return self.completed / self.total if self.total else 1.0
+
+    @property
+    def status(self) -> str:
+        if self.cancelled:
+            return CANCELLED
+        if self.completed >= self.total:
+            return DONE
+        return RUNNING if self.started else QUEUED
+
+    def _tasks(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """(records, rows) for every task, in upload order"""
+        tasks = self.queue.tasks(self.job_id)
+        records = [{'id': t['record_id'], 'conversation': t['conversation'],
+                    'row': json.loads(t['row_json']) if t['row_json'] else None} for t in tasks]
+        return records, [_row(t) for t in tasks]
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        return self._tasks()[0]
+
+    @property
+    def rows(self) -> List[Dict[str, Any]]:
+        return self._tasks()[1]
+
+    def page(self, start: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Rows `start` .. `start + limit` with their status, for the page's table"""
+        return [_row(t) for t in self.queue.rows(self.job_id, start, limit)]
+
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        return self.queue.dead_letters(self.job_id)
+
+    def results_csv(self) -> str:
+        return results_csv(*self._tasks())
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'filename': self.filename,
+            'status': self.status,
+            'total': self.total,
+            'completed': self.completed,
+            'failed': self.failed,
+            'labels': self.queue.labels(self.job_id),
+            'elapsed_seconds': round((self.finished_at or time.time()) - self.created_at, 1),
+        }
+
+
+class DurableJobManager:
+    """Shared worker pool over the SQLite JobQueue: jobs survive restarts and resume where they stopped.
+
+    Submitting the same file twice returns the existing job instead of classifying it again
+    (unless that job was cancelled).
+    """
+
+    def __init__(self, backend: ClassifierBackend, pre_classifier: Optional[RulePreClassifier] = None,
+                 workers: int = DEFAULT_WORKERS, max_jobs: int = DEFAULT_MAX_JOBS,
+                 queue: Optional[JobQueue] = None, batch_size: Optional[int] = None):
+        self.backend = backend
+        self.pre_classifier = pre_classifier
+        self.max_jobs = max_jobs
+        self.queue = queue or JobQueue()
+        pool_options = {'batch_size': batch_size} if batch_size else {}
+        # Workers pick up whatever an earlier process left queued or leased as soon as they start
+        self.pool = QueueWorkerPool(self.queue, self._classify, workers=workers, **pool_options).start()
+
+    def _classify(self, conversation: str) -> Tuple[str, str]:
+        return classify_with_rules(conversation, self.backend, self.pre_classifier)
+
+    def submit(self, records: Iterable[Dict[str, Any]], filename: str = "upload") -> StoredJob:
+        """Persist every record; returns immediately"""
+        job_id, _ = self.queue.submit(records, filename)
+        self.pool.notify()
+        return self.get(job_id)
+
+    def get(self, job_id: Optional[str]) -> Optional[StoredJob]:
+        job = self.queue.job(job_id) if job_id else None
+        return StoredJob(job, self.queue) if job else None
+
+    def jobs(self) -> List[StoredJob]:
+        """Most recent first"""
+        return [StoredJob(job, self.queue) for job in self.queue.jobs(self.max_jobs)]
+
+    def cancel(self, job_id: str):
+        self.queue.cancel(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.pool.stats()
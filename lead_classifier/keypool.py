@@ -0,0 +1,226 @@
+"""
+A pool of Groq API keys (and optionally base URLs) behind one client.
+
+One account's RPM/TPM limits cap a single key. A KeyPool spreads requests
+over several keys, each with its own ResilientGroq client, so its own
+rate-limit scheduler and circuit breaker, and routes every request to the
+healthy key with the fewest estimated tokens outstanding:
+
+    GROQ_API_KEYS=gsk_a,gsk_b,gsk_c
+    GROQ_BASE_URLS=https://api.groq.com,https://eu.example   (one URL, or one per key)
+
+A key answering 401/403 is ejected for good; one still rate-limited after
+its client's retries (quota exhausted) is ejected until its retry-after.
+Either way the request moves on to the next key.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .client import (CircuitOpenError, GroqCallError, _Chat, create_async_groq_client,
+                     get_groq_client)
+from .scheduler import RateLimitScheduler, estimate_request_tokens
+
+AUTH_STATUS = {401, 403}
+QUOTA_STATUS = {429}
+QUOTA_COOLDOWN = float(os.getenv("GROQ_KEY_COOLDOWN", "60"))
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
+def load_pool_config(api_keys: Optional[List[str]] = None,
+                     base_urls: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+    """(api_key, base_url) pairs from arguments or GROQ_API_KEYS / GROQ_BASE_URLS (falling back to
+    GROQ_API_KEY / GROQ_BASE_URL); one base URL is shared, otherwise there must be one per key"""
+    api_keys = _split(",".join(api_keys or [])) or _split(os.getenv("GROQ_API_KEYS")) \
+        or _split(os.getenv("GROQ_API_KEY"))
+    base_urls = _split(",".join(base_urls or [])) or _split(os.getenv("GROQ_BASE_URLS")) \
+        or [os.getenv("GROQ_BASE_URL") or ""]
+    if not api_keys:
+        raise ValueError("No Groq API key configured (set GROQ_API_KEY or GROQ_API_KEYS)")
+    if len(base_urls) == 1:
+        return [(key, base_urls[0]) for key in api_keys]
+    if len(base_urls) != len(api_keys):
+        raise ValueError(f"GROQ_BASE_URLS has {len(base_urls)} entries for {len(api_keys)} keys - "
+                         "give one URL for all keys or one per key")
+    return list(zip(api_keys, base_urls))
+
+
+class Endpoint:
+    """One key/base URL with its client, in-flight load and health"""
+
+    def __init__(self, api_key: str, base_url: str, client):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.client = client
+        self.label = f"...{api_key[-4:]}" + (f"@{base_url}" if base_url else "")
+        self.outstanding_tokens = 0
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.eject_reason: Optional[str] = None
+
+    def available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def paused_for(self) -> float:
+        scheduler: Optional[RateLimitScheduler] = getattr(self.client, "scheduler", None)
+        return scheduler.blocked_for() if scheduler is not None else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            'key': self.label,
+            'healthy': self.available(now),
+            'eject_reason': None if self.available(now) else self.eject_reason,
+            'in_flight': self.in_flight,
+            'outstanding_tokens': self.outstanding_tokens,
+            'calls': self.calls,
+            'failures': self.failures,
+            'client': self.client.stats(),
+        }
+
+
+class _KeyPoolBase:
+    def __init__(self, endpoints: List[Endpoint]):
+        if not endpoints:
+            raise ValueError("A key pool needs at least one endpoint")
+        self.endpoints = endpoints
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failovers = 0
+        self.ejections = 0
+        self.chat = _Chat(self._create)
+
+    def _checkout(self, tokens: int, tried: Set[Endpoint], last_error: Optional[GroqCallError]) -> Endpoint:
+        """Reserve the least-loaded healthy endpoint not tried yet for this request"""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [e for e in self.endpoints if e.available(now) and e not in tried]
+            if not candidates:
+                if last_error is not None:
+                    raise last_error
+                retry_after = min(e.ejected_until for e in self.endpoints) - now
+                raise GroqCallError("Every Groq API key in the pool is ejected: " + ", ".join(
+                    f"{e.label} ({e.eject_reason})" for e in self.endpoints),
+                    retry_after=retry_after if retry_after != float("inf") else None)
+            # Keys paused by a 429 go last; then least outstanding tokens, then fewest requests
+            endpoint = min(candidates, key=lambda e: (e.paused_for() > 0, e.outstanding_tokens, e.in_flight))
+            endpoint.outstanding_tokens += tokens
+            endpoint.in_flight += 1
+            endpoint.calls += 1
+            return endpoint
+
+    def _checkin(self, endpoint: Endpoint, tokens: int):
+        with self._lock:
+            endpoint.outstanding_tokens -= tokens
+            endpoint.in_flight -= 1
+
+    def _on_failure(self, endpoint: Endpoint, error: GroqCallError) -> bool:
+        """Eject the key if the error is about the key itself; return whether to try another key"""
+        with self._lock:
+            endpoint.failures += 1
+            was_available = endpoint.available(time.monotonic())
+            if error.status_code in AUTH_STATUS:
+                endpoint.ejected_until, endpoint.eject_reason = float("inf"), f"HTTP {error.status_code}"
+            elif error.status_code in QUOTA_STATUS:
+                cooldown = error.retry_after if error.retry_after is not None else QUOTA_COOLDOWN
+                endpoint.ejected_until = time.monotonic() + cooldown
+                endpoint.eject_reason = "rate limited"
+            else:
+                # An open circuit is about the base URL, not the key; other keys may use another URL
+                retry = isinstance(error, CircuitOpenError)
+                if retry:
+                    self.failovers += 1
+                return retry
+            if was_available:
+                self.ejections += 1
+            self.failovers += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        endpoints = [e.snapshot() for e in self.endpoints]
+        return {
+            'calls': self.calls,
+            'failovers': self.failovers,
+            'ejections': self.ejections,
+            'healthy_keys': sum(1 for e in endpoints if e['healthy']),
+            'endpoints': endpoints,
+        }
+
+
+class KeyPool(_KeyPoolBase):
+    """Least-outstanding-tokens routing over several ResilientGroq clients"""
+
+    def _create(self, **kwargs):
+        self.calls += 1
+        tokens = estimate_request_tokens(kwargs)
+        tried: Set[Endpoint] = set()
+        last_error: Optional[GroqCallError] = None
+        while True:
+            endpoint = self._checkout(tokens, tried, last_error)
+            try:
+                return endpoint.client.chat.completions.create(**kwargs)
+            except GroqCallError as error:
+                if not self._on_failure(endpoint, error):
+                    raise
+                tried.add(endpoint)
+                last_error = error
+            finally:
+                self._checkin(endpoint, tokens)
+
+
+class AsyncKeyPool(_KeyPoolBase):
+    """Async twin of KeyPool over AsyncResilientGroq clients"""
+
+    async def _create(self, **kwargs):
+        self.calls += 1
+        tokens = estimate_request_tokens(kwargs)
+        tried: Set[Endpoint] = set()
+        last_error: Optional[GroqCallError] = None
+        while True:
+            endpoint = self._checkout(tokens, tried, last_error)
+            try:
+                return await endpoint.client.chat.completions.create(**kwargs)
+            except GroqCallError as error:
+                if not self._on_failure(endpoint, error):
+                    raise
+                tried.add(endpoint)
+                last_error = error
+            finally:
+                self._checkin(endpoint, tokens)
+
+
+# --- FACTORIES ---
+
+_pools: Dict[Tuple[Tuple[str, str], ...], KeyPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_groq_pool(api_keys: Optional[List[str]] = None, base_urls: Optional[List[str]] = None):
+    """Process-wide client for the configured keys: a plain ResilientGroq for one key, else a KeyPool"""
+    pairs = tuple(load_pool_config(api_keys, base_urls))
+    if len(pairs) == 1:
+        return get_groq_client(*pairs[0])
+    with _pools_lock:
+        pool = _pools.get(pairs)
+        if pool is None:
+            pool = _pools[pairs] = KeyPool([Endpoint(key, url, get_groq_client(key, url)) for key, url in pairs])
+        return pool
+
+
+def create_async_groq_pool(api_keys: Optional[List[str]] = None, base_urls: Optional[List[str]] = None,
+                           scheduler_factory: Optional[Callable[[], RateLimitScheduler]] = None):
+    """Async client(s) for one event loop; scheduler_factory gives each key its own scheduler"""
+    pairs = load_pool_config(api_keys, base_urls)
+    clients = [(key, url, create_async_groq_client(key, url, scheduler=scheduler_factory()
+                                                   if scheduler_factory else None))
+               for key, url in pairs]
+    if len(clients) == 1:
+        return clients[0][2]
+    return AsyncKeyPool([Endpoint(key, url, client) for key, url, client in clients])
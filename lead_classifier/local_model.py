@@ -0,0 +1,279 @@
+"""
+Offline lead classifier - TF-IDF over char n-grams + softmax regression.
+
+Trained from the labelled `leads/` corpus and run entirely in NumPy, so it
+needs no network and classifies thousands of transcripts per second on one
+CPU core. Used by LocalBackend as the primary engine or as a fallback when
+Groq is unavailable.
+
+Usage:
+    python -m lead_classifier.local_model train            # train + save
+    python -m lead_classifier.local_model predict "I want a job"
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .core import LABELS, normalize_transcript
+from .corpus import REPO_ROOT, load_leads_corpus
+
+MODEL_VERSION = 1
+DEFAULT_MODEL_PATH = os.getenv(
+    "LEAD_LOCAL_MODEL_PATH", os.path.join(REPO_ROOT, ".cache", "lead_local_model.npz")
+)
+
+CHAR_NGRAMS = (2, 3, 4, 5)
+MIN_DF = 2
+
+
+# --- 1. FEATURES ---
+
+def _terms(text: str) -> List[str]:
+    """Char n-grams of the normalised text plus word unigrams"""
+    padded = f" {normalize_transcript(text)} "
+    terms = [padded[i:i + n] for n in CHAR_NGRAMS for i in range(len(padded) - n + 1)]
+    terms.extend("w:" + word for word in padded.split())
+    return terms
+
+
+class SparseRows:
+    """Minimal CSR matrix - just enough for X @ W and X.T @ G"""
+
+    __slots__ = ('indptr', 'indices', 'data', 'n_rows', 'n_cols', '_rows')
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, n_cols: int):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.n_rows = len(indptr) - 1
+        self.n_cols = n_cols
+        self._rows = np.repeat(np.arange(self.n_rows), np.diff(indptr))
+
+    def dot(self, weights: np.ndarray) -> np.ndarray:
+        """X @ W for a dense (n_cols, k) matrix"""
+        contributions = self.data[:, None] * weights[self.indices]
+        out = np.empty((self.n_rows, weights.shape[1]))
+        for k in range(weights.shape[1]):
+            out[:, k] = np.bincount(self._rows, weights=contributions[:, k], minlength=self.n_rows)
+        return out
+
+    def tdot(self, grad: np.ndarray) -> np.ndarray:
+        """X.T @ G for a dense (n_rows, k) matrix"""
+        contributions = self.data[:, None] * grad[self._rows]
+        out = np.empty((self.n_cols, grad.shape[1]))
+        for k in range(grad.shape[1]):
+            out[:, k] = np.bincount(self.indices, weights=contributions[:, k], minlength=self.n_cols)
+        return out
+
+
+class TfidfFeaturizer:
+    """Sublinear TF-IDF with L2-normalised rows over a fixed vocabulary"""
+
+    def __init__(self, vocabulary: Optional[Dict[str, int]] = None, idf: Optional[np.ndarray] = None):
+        self.vocabulary = vocabulary or {}
+        self.idf = idf
+
+    def fit(self, texts: Sequence[str], min_df: int = MIN_DF) -> "TfidfFeaturizer":
+        doc_freq: Dict[str, int] = {}
+        for text in texts:
+            for term in set(_terms(text)):
+                doc_freq[term] = doc_freq.get(term, 0) + 1
+
+        kept = sorted(term for term, df in doc_freq.items() if df >= min_df)
+        self.vocabulary = {term: i for i, term in enumerate(kept)}
+        df = np.array([doc_freq[term] for term in kept], dtype=np.float64)
+        self.idf = np.log((1 + len(texts)) / (1 + df)) + 1.0
+        return self
+
+    def transform(self, texts: Iterable[str]) -> SparseRows:
+        """Vectorise a batch of texts into one sparse matrix"""
+        lookup = self.vocabulary.get
+        n_cols = len(self.vocabulary)
+
+        doc_ids: List[int] = []
+        term_ids: List[int] = []
+        n_docs = 0
+        for doc_id, text in enumerate(texts):
+            ids = [i for i in map(lookup, _terms(text)) if i is not None]
+            term_ids.extend(ids)
+            doc_ids.extend([doc_id] * len(ids))
+            n_docs = doc_id + 1
+
+        # Count (doc, term) pairs in one vectorised pass
+        keys = np.asarray(doc_ids, dtype=np.int64) * n_cols + np.asarray(term_ids, dtype=np.int64)
+        unique, counts = np.unique(keys, return_counts=True)
+        rows, indices = np.divmod(unique, n_cols)
+
+        data = (1.0 + np.log(counts)) * self.idf[indices]
+        norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=n_docs))
+        data /= np.where(norms > 0, norms, 1.0)[rows]
+
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n_docs))])
+        return SparseRows(indptr, indices, data, n_cols)
+
+
+# --- 2. MODEL ---
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class LocalLeadModel:
+    """Multinomial logistic regression over TfidfFeaturizer features"""
+
+    labels = LABELS
+
+    def __init__(self, featurizer: TfidfFeaturizer, weights: np.ndarray, bias: np.ndarray):
+        self.featurizer = featurizer
+        self.weights = weights
+        self.bias = bias
+
+    @classmethod
+    def train(cls, texts: Sequence[str], labels: Sequence[str], epochs: int = 60,
+              learning_rate: float = 0.2, l2: float = 1e-5) -> "LocalLeadModel":
+        """Fit with full-batch Adam; a few seconds on the bundled corpus"""
+        featurizer = TfidfFeaturizer().fit(texts)
+        X = featurizer.transform(texts)
+        y = np.array([LABELS.index(label) for label in labels])
+        targets = np.eye(len(LABELS))[y]
+
+        weights = np.zeros((X.n_cols, len(LABELS)))
+        bias = np.zeros(len(LABELS))
+        m_w, v_w = np.zeros_like(weights), np.zeros_like(weights)
+        m_b, v_b = np.zeros_like(bias), np.zeros_like(bias)
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+
+        for step in range(1, epochs + 1):
+            probs = _softmax(X.dot(weights) + bias)
+            error = (probs - targets) / X.n_rows
+            grad_w = X.tdot(error) + l2 * weights
+            grad_b = error.sum(axis=0)
+
+            m_w = beta1 * m_w + (1 - beta1) * grad_w
+            v_w = beta2 * v_w + (1 - beta2) * grad_w * grad_w
+            m_b = beta1 * m_b + (1 - beta1) * grad_b
+            v_b = beta2 * v_b + (1 - beta2) * grad_b * grad_b
+            correction = np.sqrt(1 - beta2 ** step) / (1 - beta1 ** step)
+            weights -= learning_rate * correction * m_w / (np.sqrt(v_w) + eps)
+            bias -= learning_rate * correction * m_b / (np.sqrt(v_b) + eps)
+
+        return cls(featurizer, weights, bias)
+
+    def predict_proba(self, texts: Iterable[str]) -> np.ndarray:
+        """(n, 3) class probabilities in LABELS order"""
+        X = self.featurizer.transform(texts)
+        return _softmax(X.dot(self.weights) + self.bias)
+
+    def predict(self, texts: Iterable[str]) -> List[str]:
+        """Hot/Cold/Dead label for every text"""
+        return [LABELS[i] for i in self.predict_proba(texts).argmax(axis=1)]
+
+    def save(self, path: str = DEFAULT_MODEL_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        terms = sorted(self.featurizer.vocabulary, key=self.featurizer.vocabulary.get)
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            bias=self.bias,
+            idf=self.featurizer.idf,
+            terms=np.array(terms, dtype=object),
+            meta=np.array(json.dumps({'version': MODEL_VERSION, 'labels': list(LABELS),
+                                      'char_ngrams': list(CHAR_NGRAMS)})),
+        )
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH) -> "LocalLeadModel":
+        with np.load(path, allow_pickle=True) as archive:
+            meta = json.loads(str(archive['meta']))
+            if meta.get('version') != MODEL_VERSION or meta.get('char_ngrams') != list(CHAR_NGRAMS):
+                raise ValueError(f"Model at {path} was trained by an incompatible version")
+            vocabulary = {term: i for i, term in enumerate(archive['terms'].tolist())}
+            featurizer = TfidfFeaturizer(vocabulary, archive['idf'])
+            return cls(featurizer, archive['weights'], archive['bias'])
+
+
+def train_from_corpus(holdout: float = 0.0, seed: int = 13) -> Tuple[LocalLeadModel, Optional[float]]:
+    """Train on leads/; returns (model, holdout accuracy or None)"""
+    examples = load_leads_corpus()
+    random.Random(seed).shuffle(examples)
+
+    split = int(len(examples) * (1 - holdout))
+    train, test = examples[:split], examples[split:]
+    model = LocalLeadModel.train([e['text'] for e in train], [e['label'] for e in train])
+
+    accuracy = None
+    if test:
+        predicted = model.predict(e['text'] for e in test)
+        accuracy = sum(p == e['label'] for p, e in zip(predicted, test)) / len(test)
+    return model, accuracy
+
+
+def load_or_train(path: str = DEFAULT_MODEL_PATH) -> LocalLeadModel:
+    """Load the saved model, training (and saving) it from leads/ if needed"""
+    if os.path.exists(path):
+        try:
+            return LocalLeadModel.load(path)
+        except (ValueError, KeyError, OSError) as e:
+            print(f"Retraining local model: {e}", file=sys.stderr)
+
+    model, _ = train_from_corpus()
+    model.save(path)
+    return model
+
+
+# --- 3. CLI ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train or run the offline lead classifier")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train_cmd = sub.add_parser("train", help="Train from leads/ and save the model")
+    train_cmd.add_argument("--holdout", type=float, default=0.2, help="Fraction held out for accuracy")
+    train_cmd.add_argument("-o", "--output", default=DEFAULT_MODEL_PATH)
+
+    predict_cmd = sub.add_parser("predict", help="Classify transcripts given on the command line")
+    predict_cmd.add_argument("texts", nargs="+")
+    predict_cmd.add_argument("--model", default=DEFAULT_MODEL_PATH)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "train":
+        started = time.perf_counter()
+        model, accuracy = train_from_corpus(holdout=args.holdout)
+        print(f"✓ Trained on leads/ in {time.perf_counter() - started:.2f}s "
+              f"({len(model.featurizer.vocabulary)} features)")
+        if accuracy is not None:
+            print(f"  Holdout accuracy: {accuracy:.1%}")
+
+        # Refit on everything before saving
+        if args.holdout:
+            model, _ = train_from_corpus(holdout=0.0)
+        model.save(args.output)
+
+        texts = [e['text'] for e in load_leads_corpus()]
+        started = time.perf_counter()
+        model.predict(texts)
+        elapsed = time.perf_counter() - started
+        print(f"  Batch inference: {len(texts) / elapsed:,.0f} transcripts/sec")
+        print(f"✓ Saved model to: {args.output}")
+
+    elif args.command == "predict":
+        model = load_or_train(args.model)
+        for text, probs in zip(args.texts, model.predict_proba(args.texts)):
+            best = int(probs.argmax())
+            print(f"{LABELS[best]:<5} ({probs[best]:.0%})  {text}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
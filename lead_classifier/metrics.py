@@ -0,0 +1,471 @@
+"""
+Latency and token metrics for every classification.
+
+Two kinds of events are recorded in a process-wide registry (METRICS):
+
+  - classification: one per transcript - wall time, outcome source
+    (rules / cache / groq / local / ...), label or error
+  - groq call: one per chat-completions request - wall time, time to first
+    token, queue / model / network split and prompt + completion tokens.
+    Streamed calls stop the clock when the label is known (see core.py), so
+    comparing a run with and without streaming shows the saving end to end
+
+Percentiles are computed over a rolling window of recent observations. The
+registry renders Prometheus text (serve it with `serve_metrics` or
+LEAD_METRICS_PORT) and, when LEAD_METRICS_LOG is set, appends every event
+to a JSONL log that `python -m lead_classifier.metrics summarize` reads back
+and `python -m lead_classifier.metrics serve` exports while it grows.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Optional, Sequence, Tuple
+
+DEFAULT_WINDOW = int(os.getenv("LEAD_METRICS_WINDOW", "2048"))
+DEFAULT_LOG_PATH = os.getenv("LEAD_METRICS_LOG")
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+# --- 1. ROLLING HISTOGRAM ---
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an unsorted sequence (None when empty)"""
+    return _nearest_rank(sorted(values), q)
+
+
+def _nearest_rank(ordered: Sequence[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[max(math.ceil(q * len(ordered)), 1) - 1]
+
+
+class RollingHistogram:
+    """Lifetime count/sum plus percentiles over the last `window` observations"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.values: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.values.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantiles(self, qs: Iterable[float] = QUANTILES) -> Dict[float, Optional[float]]:
+        ordered = sorted(self.values)
+        return {q: _nearest_rank(ordered, q) for q in qs}
+
+    def snapshot(self) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {'count': self.count, 'sum': round(self.total, 6)}
+        for q, value in self.quantiles().items():
+            summary[f"p{int(q * 100)}"] = None if value is None else round(value, 6)
+        return summary
+
+
+# --- 2. REGISTRY ---
+
+class Outcome:
+    """Filled in by the caller inside `with METRICS.classification() as outcome:`"""
+
+    __slots__ = ('source', 'label')
+
+    def __init__(self):
+        self.source: Optional[str] = None
+        self.label: Optional[str] = None
+
+
+class _ClassificationTimer:
+    def __init__(self, metrics: "ClassifierMetrics"):
+        self.metrics = metrics
+        self.outcome = Outcome()
+        self.started = 0.0
+
+    def __enter__(self) -> Outcome:
+        self.started = time.perf_counter()
+        return self.outcome
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record_classification(
+            self.outcome.source or "unknown", self.outcome.label,
+            time.perf_counter() - self.started, error=exc,
+        )
+        return False
+
+
+class ClassifierMetrics:
+    """Thread-safe counters and rolling histograms for classifications and Groq calls"""
+
+    HISTOGRAMS = {
+        'classification_seconds': "Wall time per classified transcript, any source",
+        'groq_request_seconds': "Wall time per Groq chat-completions request, retries included",
+        'groq_ttft_seconds': "Time to first token per Groq request",
+        'groq_queue_seconds': "Time the request waited in Groq's queue",
+        'groq_model_seconds': "Prompt + completion time reported by Groq",
+        'groq_network_seconds': "Request time not accounted for by Groq (network, TLS, retries)",
+        'groq_prompt_tokens': "Prompt tokens per Groq request",
+        'groq_completion_tokens': "Completion tokens per Groq request",
+    }
+
+    def __init__(self, window: int = DEFAULT_WINDOW, log_path: Optional[str] = DEFAULT_LOG_PATH):
+        self.window = window
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._log_file = None
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far (the log file is left alone)"""
+        with self._lock:
+            self.started_at = time.time()
+            self.histograms = {name: RollingHistogram(self.window) for name in self.HISTOGRAMS}
+            self.outcomes: Dict[Tuple[str, str], int] = {}
+            self.groq_calls = 0
+            self.groq_errors = 0
+            self.groq_cancelled = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.coalesced = 0
+            self.near_duplicates = 0
+            self.streamed_calls = 0
+            self.stream_early_exits = 0
+
+    # --- recording ---
+
+    def classification(self) -> _ClassificationTimer:
+        """Context manager timing one classification; set outcome.source / outcome.label inside"""
+        return _ClassificationTimer(self)
+
+    def record_classification(self, source: str, label: Optional[str], seconds: float,
+                              error: Optional[BaseException] = None):
+        outcome = "error" if error is not None else (label or "unknown")
+        with self._lock:
+            self.histograms['classification_seconds'].observe(seconds)
+            key = (source, outcome)
+            self.outcomes[key] = self.outcomes.get(key, 0) + 1
+
+        self._log({
+            'event': 'classification',
+            'source': source,
+            'label': label,
+            'error': None if error is None else f"{type(error).__name__}: {error}",
+            'seconds': round(seconds, 6),
+        })
+
+    def record_groq_call(self, model: str, seconds: float, response: Any = None,
+                         error: Optional[BaseException] = None):
+        """Record one chat-completions request from its wall time and response.usage"""
+        usage = getattr(response, 'usage', None)
+        completion_time = getattr(usage, 'completion_time', None)
+        self.record_groq_timings(
+            model, seconds,
+            # Non-streaming calls: the first token was ready once generation started
+            ttft_seconds=seconds - completion_time if completion_time is not None else None,
+            queue_seconds=getattr(usage, 'queue_time', None),
+            model_seconds=getattr(usage, 'total_time', None),
+            prompt_tokens=getattr(usage, 'prompt_tokens', None),
+            completion_tokens=getattr(usage, 'completion_tokens', None),
+            error=None if error is None else f"{type(error).__name__}: {error}",
+        )
+
+    def record_groq_cancelled(self, model: str, seconds: float, messages: Sequence[Dict[str, str]] = ()):
+        """Record a request abandoned before it answered (a hedge loser): it was sent, so it counts as a
+        call, and its prompt tokens are estimated since no usage ever arrives"""
+        from .compaction import estimate_tokens
+        self.record_groq_timings(model, seconds, cancelled=True,
+                                 prompt_tokens=sum(estimate_tokens(m.get('content') or '') for m in messages))
+
+    def record_groq_stream(self, model: str, seconds: float, ttft_seconds: Optional[float],
+                           early_exit: bool, usage: Any = None, messages: Sequence[Dict[str, str]] = (),
+                           completion_chunks: int = 0):
+        """Record a streamed request; `seconds` runs until the label was resolved.
+
+        A stream closed early never receives usage, so tokens are estimated
+        from the prompt and the number of content chunks read.
+        """
+        prompt_tokens = getattr(usage, 'prompt_tokens', None)
+        if prompt_tokens is None:
+            from .compaction import estimate_tokens
+            prompt_tokens = sum(estimate_tokens(m.get('content') or '') for m in messages)
+        completion_tokens = getattr(usage, 'completion_tokens', None)
+        self.record_groq_timings(
+            model, seconds, ttft_seconds=ttft_seconds,
+            queue_seconds=getattr(usage, 'queue_time', None),
+            model_seconds=getattr(usage, 'total_time', None),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_chunks if completion_tokens is None else completion_tokens,
+            streamed=True, early_exit=early_exit,
+        )
+
+    def record_groq_timings(self, model: str, seconds: float, ttft_seconds: Optional[float] = None,
+                            queue_seconds: Optional[float] = None, model_seconds: Optional[float] = None,
+                            prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None,
+                            error: Optional[str] = None, streamed: bool = False, early_exit: bool = False,
+                            cancelled: bool = False, **_):
+        """Record one request from extracted timings (also replays JSONL log events)"""
+        network = None
+        if model_seconds is not None:
+            network = seconds - (queue_seconds or 0.0) - model_seconds
+
+        with self._lock:
+            self.groq_calls += 1
+            if streamed:
+                self.streamed_calls += 1
+                self.stream_early_exits += early_exit
+            if error is not None:
+                self.groq_errors += 1
+            elif cancelled:
+                # No latency or completion to record, but the prompt was sent and is billed
+                self.groq_cancelled += 1
+                self.prompt_tokens += prompt_tokens or 0
+            else:
+                self.histograms['groq_request_seconds'].observe(seconds)
+                for name, value in (('groq_ttft_seconds', ttft_seconds), ('groq_queue_seconds', queue_seconds),
+                                    ('groq_model_seconds', model_seconds), ('groq_network_seconds', network),
+                                    ('groq_prompt_tokens', prompt_tokens),
+                                    ('groq_completion_tokens', completion_tokens)):
+                    if value is not None:
+                        self.histograms[name].observe(max(float(value), 0.0))
+                self.prompt_tokens += prompt_tokens or 0
+                self.completion_tokens += completion_tokens or 0
+
+        self._log({
+            'event': 'groq_call',
+            'model': model,
+            'seconds': round(seconds, 6),
+            'ttft_seconds': None if ttft_seconds is None else round(ttft_seconds, 6),
+            'queue_seconds': queue_seconds,
+            'model_seconds': model_seconds,
+            'network_seconds': None if network is None else round(network, 6),
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'error': error,
+            **({'streamed': True, 'early_exit': early_exit} if streamed else {}),
+            **({'cancelled': True} if cancelled else {}),
+        })
+
+    def record_coalesced(self):
+        """A request that waited on an identical in-flight call instead of calling Groq"""
+        with self._lock:
+            self.coalesced += 1
+
+    def record_near_duplicate(self):
+        """A request answered with the label of a near-identical transcript instead of calling Groq"""
+        with self._lock:
+            self.near_duplicates += 1
+
+    def _log(self, event: Dict[str, Any]):
+        if not self.log_path:
+            return
+        event = {'ts': round(time.time(), 3), **event}
+        line = json.dumps(event, ensure_ascii=False) + '\n'
+        with self._lock:
+            if self._log_file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+                self._log_file = open(self.log_path, 'a', encoding='utf-8')
+            self._log_file.write(line)
+            self._log_file.flush()
+
+    # --- reporting ---
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain-dict view for the admin panel and JSON output"""
+        with self._lock:
+            by_source: Dict[str, Dict[str, int]] = {}
+            for (source, outcome), count in sorted(self.outcomes.items()):
+                by_source.setdefault(source, {})[outcome] = count
+            return {
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'classifications': sum(self.outcomes.values()),
+                'outcomes': by_source,
+                'groq_calls': self.groq_calls,
+                'groq_errors': self.groq_errors,
+                'groq_cancelled': self.groq_cancelled,
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'coalesced': self.coalesced,
+                'near_duplicates': self.near_duplicates,
+                'streamed_calls': self.streamed_calls,
+                'stream_early_exits': self.stream_early_exits,
+                'histograms': {name: h.snapshot() for name, h in self.histograms.items()},
+            }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (rolling-window quantiles as summaries)"""
+        lines = []
+        with self._lock:
+            lines += ["# HELP lead_classifications_total Classified transcripts by source and outcome",
+                      "# TYPE lead_classifications_total counter"]
+            for (source, outcome), count in sorted(self.outcomes.items()):
+                lines.append(f'lead_classifications_total{{source="{source}",outcome="{outcome}"}} {count}')
+
+            for name, help_text, value in (
+                ('lead_groq_requests_total', "Groq chat-completions requests", self.groq_calls),
+                ('lead_groq_request_errors_total', "Groq requests that raised", self.groq_errors),
+                ('lead_groq_request_cancellations_total', "Groq requests cancelled before they answered",
+                 self.groq_cancelled),
+                ('lead_groq_prompt_tokens_total', "Prompt tokens sent to Groq", self.prompt_tokens),
+                ('lead_groq_completion_tokens_total', "Completion tokens returned by Groq", self.completion_tokens),
+                ('lead_coalesced_requests_total', "Requests that shared an identical in-flight call",
+                 self.coalesced),
+                ('lead_near_duplicate_requests_total', "Requests that reused the label of a near-duplicate transcript",
+                 self.near_duplicates),
+                ('lead_groq_streamed_requests_total', "Groq requests read as a stream", self.streamed_calls),
+                ('lead_groq_stream_early_exits_total', "Streams closed as soon as the label was known",
+                 self.stream_early_exits),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {value}"]
+
+            for name, help_text in self.HISTOGRAMS.items():
+                histogram = self.histograms[name]
+                metric = f"lead_{name}"
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} summary"]
+                for q, value in histogram.quantiles().items():
+                    if value is not None:
+                        lines.append(f'{metric}{{quantile="{q}"}} {value:.6g}')
+                lines.append(f"{metric}_sum {histogram.total:.6g}")
+                lines.append(f"{metric}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = ClassifierMetrics()
+
+
+# --- 3. EXPORT ---
+
+_servers: Dict[int, Any] = {}
+
+
+def serve_metrics(port: int, metrics: ClassifierMetrics = METRICS, host: str = "0.0.0.0"):
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread; idempotent per port"""
+    if port in _servers:
+        return _servers[port]
+
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/metrics.json"):
+                body, content_type = json.dumps(metrics.snapshot()).encode(), "application/json"
+            elif self.path.startswith("/metrics"):
+                body, content_type = metrics.render_prometheus().encode(), "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name=f"metrics-{port}", daemon=True).start()
+    _servers[port] = server
+    return server
+
+
+def replay_log(f, metrics: ClassifierMetrics) -> int:
+    """Record the events of an open JSONL metrics log from its current position; returns how many.
+
+    Stops before a line that is still being written, so it can be called
+    again on the same file as the log grows.
+    """
+    count = 0
+    while True:
+        position = f.tell()
+        line = f.readline()
+        if not line.endswith('\n'):
+            f.seek(position)
+            return count
+        if not line.strip():
+            continue
+        event = json.loads(line)
+        kind = event.pop('event', None)
+        if kind == 'classification':
+            error = RuntimeError(event['error']) if event.get('error') else None
+            metrics.record_classification(event['source'], event.get('label'), event['seconds'], error)
+        elif kind == 'groq_call':
+            metrics.record_groq_timings(**event)
+        count += 1
+
+
+def summarize_log(path: str) -> Dict[str, Any]:
+    """Rebuild percentiles from a JSONL metrics log"""
+    metrics = ClassifierMetrics(window=sys.maxsize, log_path=None)
+    with open(path, 'r', encoding='utf-8') as f:
+        replay_log(f, metrics)
+    return metrics.snapshot()
+
+
+def follow_log(path: str, port: int, host: str = "0.0.0.0", interval: float = 5.0):
+    """Serve the metrics of a JSONL log (see serve_metrics), picking up new events every `interval` seconds"""
+    metrics = ClassifierMetrics(log_path=None)
+    with open(path, 'r', encoding='utf-8') as f:
+        events = replay_log(f, metrics)
+        serve_metrics(port, metrics, host)
+        print("=" * 60)
+        print(f"Serving {path} ({events} events so far) on http://{host}:{port}/metrics")
+        print("=" * 60)
+        try:
+            while True:
+                time.sleep(interval)
+                replay_log(f, metrics)
+        except KeyboardInterrupt:
+            print("✓ Stopped")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise or serve lead-classifier metrics")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    summarize_cmd = sub.add_parser("summarize", help="Percentiles from a JSONL metrics log")
+    summarize_cmd.add_argument("log", nargs="?", default=DEFAULT_LOG_PATH)
+    summarize_cmd.add_argument("--json", action="store_true", help="Print the raw summary as JSON")
+
+    serve_cmd = sub.add_parser("serve", help="Serve a JSONL metrics log as /metrics and /metrics.json, "
+                                             "following it as it grows")
+    serve_cmd.add_argument("log", nargs="?", default=DEFAULT_LOG_PATH)
+    serve_cmd.add_argument("--port", type=int, default=int(os.getenv("LEAD_METRICS_PORT", "9100")))
+    serve_cmd.add_argument("--host", default="0.0.0.0")
+    serve_cmd.add_argument("--interval", type=float, default=5.0, help="Seconds between reads of new events")
+
+    args = parser.parse_args(argv)
+    if not args.log:
+        print("Error: no metrics log given and LEAD_METRICS_LOG is not set", file=sys.stderr)
+        return 1
+
+    if args.command == "serve":
+        follow_log(args.log, args.port, args.host, args.interval)
+        return 0
+
+    summary = summarize_log(args.log)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+
+    print("=" * 60)
+    print(f"Metrics log: {args.log}")
+    print("=" * 60)
+    print(f"Classifications: {summary['classifications']}  Groq calls: {summary['groq_calls']} "
+          f"({summary['groq_errors']} errors, {summary['groq_cancelled']} cancelled)")
+    for source, outcomes in summary['outcomes'].items():
+        print(f"  {source:<16} " + "  ".join(f"{k}: {v}" for k, v in outcomes.items()))
+    print(f"Tokens: {summary['prompt_tokens']:,} prompt / {summary['completion_tokens']:,} completion")
+    print(f"\n{'histogram':<26}{'count':>8}{'p50':>12}{'p95':>12}{'p99':>12}")
+    for name, h in summary['histograms'].items():
+        if h['count']:
+            print(f"{name:<26}{h['count']:>8}" + "".join(f"{h[p]:>12.4g}" for p in ('p50', 'p95', 'p99')))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
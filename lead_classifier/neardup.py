@@ -0,0 +1,166 @@
+"""
+Near-duplicate transcript reuse with MinHash + LSH.
+
+Templated inquiries ("Assalam o Alaikum, please send details of Pearl One
+Courtyard...") differ only in names and numbers, so the exact-hash cache
+misses them. Each classified transcript is reduced to a MinHash signature
+over character shingles of its normalised text (digits masked); an LSH
+band index finds earlier transcripts whose estimated Jaccard similarity is
+at least `threshold`, and their label is reused instead of calling Groq.
+
+The index keeps at most `max_entries` signatures and evicts the least
+recently matched one first. Enable it with LEAD_NEAR_DUP_THRESHOLD (e.g. 0.9).
+"""
+
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .core import normalize_transcript
+
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+DEFAULT_SHINGLE_SIZE = 5
+DEFAULT_MAX_ENTRIES = int(os.getenv("LEAD_NEAR_DUP_MAX_ENTRIES", "10000"))
+# Below this many shingles a transcript is too short to match reliably
+MIN_SHINGLES = 16
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_DIGITS_RE = re.compile(r'\d+')
+
+
+def shingle_hashes(conversation: str, size: int = DEFAULT_SHINGLE_SIZE) -> np.ndarray:
+    """32-bit hashes of the distinct character shingles of the normalised, digit-masked transcript"""
+    text = _DIGITS_RE.sub('0', normalize_transcript(conversation))
+    shingles = {text[i:i + size] for i in range(max(len(text) - size + 1, 0))}
+    return np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+class MinHasher:
+    """Fixed family of `num_perm` universal hash functions (seeded, so signatures are stable across processes)"""
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        # a, b < 2**31 keep a * h + b (h < 2**32) inside uint64
+        self.a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % np.uint64(_MERSENNE_PRIME)
+        return permuted.min(axis=1)
+
+
+class NearDuplicateIndex:
+    """Bounded MinHash LSH index from transcript signatures to labels"""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, num_perm: int = DEFAULT_NUM_PERM,
+                 bands: int = DEFAULT_BANDS, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 shingle_size: int = DEFAULT_SHINGLE_SIZE):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm)
+
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, str]]" = OrderedDict()
+        self._buckets: List[Dict[bytes, set]] = [{} for _ in range(bands)]
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.hits = 0
+        self.skipped = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["NearDuplicateIndex"]:
+        """The index configured by LEAD_NEAR_DUP_THRESHOLD, or None when near-duplicate reuse is off"""
+        threshold = os.getenv("LEAD_NEAR_DUP_THRESHOLD")
+        if not threshold or float(threshold) <= 0:
+            return None
+        return cls(threshold=float(threshold))
+
+    def signature(self, conversation: str) -> Optional[np.ndarray]:
+        """MinHash signature, or None for transcripts too short to compare"""
+        hashes = shingle_hashes(conversation, self.shingle_size)
+        if len(hashes) < MIN_SHINGLES:
+            return None
+        return self.hasher.signature(hashes)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def lookup(self, conversation: str, signature: Optional[np.ndarray] = None) -> Optional[Tuple[str, float]]:
+        """(label, estimated similarity) of the most similar indexed transcript above the threshold"""
+        if signature is None:
+            signature = self.signature(conversation)
+        with self._lock:
+            self.lookups += 1
+            if signature is None:
+                self.skipped += 1
+                return None
+            candidates = set()
+            for band, key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(band.get(key, ()))
+            if not candidates:
+                return None
+            ids = list(candidates)
+            similarities = (np.stack([self._entries[i][0] for i in ids]) == signature).mean(axis=1)
+            best = int(similarities.argmax())
+            if similarities[best] < self.threshold:
+                return None
+            self.hits += 1
+            self._entries.move_to_end(ids[best])
+            return self._entries[ids[best]][1], float(similarities[best])
+
+    def add(self, conversation: str, label: str, signature: Optional[np.ndarray] = None):
+        """Index a classified transcript, evicting the least recently matched entries beyond max_entries"""
+        if signature is None:
+            signature = self.signature(conversation)
+        if signature is None:
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (signature, label)
+            for band, key in zip(self._buckets, self._band_keys(signature)):
+                band.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        entry_id, (signature, _) = self._entries.popitem(last=False)
+        for band, key in zip(self._buckets, self._band_keys(signature)):
+            members = band.get(key)
+            if members is not None:
+                members.discard(entry_id)
+                if not members:
+                    del band[key]
+        self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets = [{} for _ in range(self.bands)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'threshold': self.threshold,
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'dedup_rate': round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+                'too_short': self.skipped,
+                'entries': len(self._entries),
+                'evictions': self.evictions,
+            }
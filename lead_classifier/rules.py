@@ -0,0 +1,153 @@
+"""
+Rule-based pre-classifier - answers obvious leads without calling the model.
+
+The SYSTEM_PROMPT already names concrete indicators (job inquiries, rent
+requests, CNIC, booking fee, "I'll think about it"). This module scores those
+indicators in English and Roman Urdu with a single compiled regex pass. When
+one label clearly dominates, the Groq call is skipped.
+"""
+
+import math
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_THRESHOLD = 0.85
+# Only these labels may short-circuit the model. Cold is left to the LLM
+# because hesitation can be "overcome" later in the conversation.
+DEFAULT_ABSORB_LABELS = ("Hot", "Dead")
+
+# Score at which confidence reaches ~63% before the margin penalty
+SATURATION = 2.5
+
+
+# --- 1. RULES (label, weight, pattern) ---
+# Patterns are matched case-insensitively against the whole transcript.
+
+RULES: List[Tuple[str, float, str]] = [
+    # Dead - job / vendor / off-topic (prompt rule 6: instant Dead)
+    ("Dead", 5.0, r"\b(?:job|jobs|naukri|nokri|vacanc(?:y|ies)|internships?|be-?rozgaar|unemployed)\b"),
+    ("Dead", 4.0, r"\b(?:hire me|join (?:your|aapki) team|cv|resume|apply kaise|how to apply)\b"),
+    ("Dead", 4.0, r"\b(?:supplier|vendor|dealer(?:ship)?|sell my products|apne products)\b"),
+    ("Dead", 4.0, r"\b(?:sponsor|donat(?:e|ion)|welfare trust|charity|qarz|lend me|loan de)\b"),
+    ("Dead", 4.0, r"\b(?:on rent|for rent|rent pe|kiraye? (?:pe|par)|kiraya)\b"),
+    ("Dead", 4.0, r"\b(?:no money|paise nahi(?:n)? hain|afford nahi|can'?t afford)\b"),
+    ("Dead", 3.0, r"\b(?:youtuber|collaborat(?:e|ion)|journalist|interview for|university project)\b"),
+    ("Dead", 2.0, r"\b(?:meet (?:the )?ceo|ceo se|huge fan|bara fan|appreciate your ceo)\b"),
+
+    # Hot - commitment / payment / documents / urgent timeline
+    ("Hot", 4.0, r"\b(?:booking (?:fee|money|amount)|booking paise|token (?:money|amount|transfer)|transfer the token)\b"),
+    ("Hot", 4.0, r"\b(?:cnic|id card|allotment letter|bank details|wire transfer|cheque)\b"),
+    ("Hot", 4.0, r"\b(?:i'?ll take it|let'?s proceed|reserve (?:a |the |this )?unit|reserve kar|hold the apartment|hold kar)\b"),
+    ("Hot", 3.5, r"\b(?:book (?:it|a|the|this|now|today|tomorrow)|book karna|book karun|i(?:'ll| will) book|want to book)\b"),
+    ("Hot", 3.0, r"\b(?:pay full|full (?:cash|payment)|full pay|pay \d+%|\d+% (?:de|today|aaj))\b"),
+    ("Hot", 2.5, r"\b(?:site visit|visit (?:the site|tomorrow|today)|office aa|come to your office|aaoon ga|aaunga)\b"),
+    ("Hot", 2.0, r"\b(?:final price|exact payment schedule|payment schedule|availability confirm|confirm availability)\b"),
+    ("Hot", 1.5, r"\b(?:today|tomorrow|right now|aaj|kal tak|foran|immediately)\b"),
+
+    # Cold - hesitation / delay / non-committal
+    ("Cold", 3.0, r"\b(?:think about it|think over it|soch(?:ta|ti|) (?:hoon|raha|rahi)|sochta hoon|main sochta)\b"),
+    ("Cold", 2.5, r"\b(?:maybe (?:later|next)|shayad|baad mein|call me later|next (?:month|year)|agle (?:mahine|saal|hafte))\b"),
+    ("Cold", 2.5, r"\b(?:just looking|looking around|not ready|ready nahi(?:n)?|not sure yet|pakka nahi(?:n)?)\b"),
+    ("Cold", 2.0, r"\b(?:send (?:me )?(?:the )?(?:brochure|details|catalogue|images)|brochure bhej|details bhej|bhej do)\b"),
+    ("Cold", 2.0, r"\b(?:too expensive|very expensive|mehenga|mehnga|discount)\b"),
+    ("Cold", 2.0, r"\b(?:discuss with (?:my )?family|family se discuss|compare|other builders|dusre builders)\b"),
+]
+
+
+def _compile_rules(rules: Sequence[Tuple[str, float, str]]):
+    """Fold every rule into one alternation; the named group identifies the rule"""
+    parts = [f"(?P<r{i}>{pattern})" for i, (_, _, pattern) in enumerate(rules)]
+    return re.compile("|".join(parts), re.IGNORECASE)
+
+
+# --- 2. SCORING ENGINE ---
+
+class RuleResult:
+    """Outcome of scoring one transcript"""
+
+    __slots__ = ('label', 'confidence', 'scores', 'matches')
+
+    def __init__(self, label: Optional[str], confidence: float, scores: Dict[str, float], matches: int):
+        self.label = label
+        self.confidence = confidence
+        self.scores = scores
+        self.matches = matches
+
+    def __repr__(self):
+        return f"RuleResult(label={self.label!r}, confidence={self.confidence:.2f}, scores={self.scores})"
+
+
+class RulePreClassifier:
+    """Compiled keyword/phrase scorer that runs before classify_lead_groq"""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD,
+                 absorb_labels: Sequence[str] = DEFAULT_ABSORB_LABELS,
+                 rules: Sequence[Tuple[str, float, str]] = RULES):
+        self.threshold = threshold
+        self.absorb_labels = tuple(absorb_labels)
+        self._rules = list(rules)
+        self._regex = _compile_rules(self._rules)
+        self._lock = threading.Lock()
+
+        self.total = 0
+        self.absorbed = 0
+        self.absorbed_by_label = {'Hot': 0, 'Cold': 0, 'Dead': 0}
+
+    def score(self, conversation: str) -> RuleResult:
+        """Score a transcript in one regex pass.
+
+        Later matches weigh up to twice as much as early ones, since the
+        final customer sentiment matters most.
+        """
+        scores = {'Hot': 0.0, 'Cold': 0.0, 'Dead': 0.0}
+        length = max(len(conversation), 1)
+        matches = 0
+
+        for match in self._regex.finditer(conversation):
+            label, weight, _ = self._rules[int(match.lastgroup[1:])]
+            scores[label] += weight * (1.0 + match.start() / length)
+            matches += 1
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        (top_label, top), (_, second) = ranked[0], ranked[1]
+        if top <= 0:
+            return RuleResult(None, 0.0, scores, 0)
+
+        strength = 1.0 - math.exp(-top / SATURATION)
+        margin = (top - second) / top
+        return RuleResult(top_label, round(strength * margin, 4), scores, matches)
+
+    def try_classify(self, conversation: str) -> Optional[RuleResult]:
+        """Return a result if the rules are confident enough to skip the model"""
+        result = self.score(conversation)
+        absorbed = result.label in self.absorb_labels and result.confidence >= self.threshold
+
+        with self._lock:
+            self.total += 1
+            if absorbed:
+                self.absorbed += 1
+                self.absorbed_by_label[result.label] += 1
+
+        return result if absorbed else None
+
+    def classify(self, conversation: str, fallback: Callable[[str], str]) -> Tuple[str, str]:
+        """Return (label, source) where source is 'rules' or 'model'"""
+        result = self.try_classify(conversation)
+        if result is not None:
+            return result.label, 'rules'
+        return fallback(conversation), 'model'
+
+    @property
+    def absorbed_fraction(self) -> float:
+        """Share of traffic answered without an LLM call"""
+        return self.absorbed / self.total if self.total else 0.0
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'total': self.total,
+            'absorbed': self.absorbed,
+            'absorbed_fraction': round(self.absorbed_fraction, 4),
+            'absorbed_by_label': dict(self.absorbed_by_label),
+            'threshold': self.threshold,
+        }
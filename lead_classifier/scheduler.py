@@ -0,0 +1,266 @@
+"""
+Rate-limit-aware adaptive concurrency for Groq calls.
+
+A RateLimitScheduler sits in front of every chat-completions request made
+by a ResilientGroq / AsyncResilientGroq client:
+
+  - token buckets for requests- and tokens-per-minute, seeded from config
+    (GROQ_RPM / GROQ_TPM) and corrected from the x-ratelimit-* headers
+  - each request reserves its estimated token cost up front, so requests
+    are packed right up to the TPM limit; the estimate is trued-up from
+    response.usage afterwards
+  - AIMD concurrency: slow-start doubling until the first 429, then +1 per
+    window of successes; a 429 halves the limit and pauses every caller
+    until retry-after, instead of each worker discovering it separately
+"""
+
+import asyncio
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from .compaction import estimate_tokens
+
+PER_MESSAGE_OVERHEAD_TOKENS = 4
+
+_RESET_RE = re.compile(r'^(?:(?P<h>\d+(?:\.\d+)?)h)?(?:(?P<m>\d+(?:\.\d+)?)m(?!s))?'
+                       r'(?:(?P<s>\d+(?:\.\d+)?)s)?(?:(?P<ms>\d+(?:\.\d+)?)ms)?$')
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds from Groq's reset headers ("7.66s", "2m59.56s", "1h2m", "250ms" or a bare number)"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    match = _RESET_RE.match(value)
+    if not match or not any(match.groupdict().values()):
+        return None
+    parts = {k: float(v) for k, v in match.groupdict().items() if v}
+    return parts.get('h', 0) * 3600 + parts.get('m', 0) * 60 + parts.get('s', 0) + parts.get('ms', 0) / 1000
+
+
+def estimate_request_tokens(request: Dict[str, Any]) -> int:
+    """Token cost of a chat-completions request before it is sent: prompt + max completion"""
+    messages = request.get('messages') or []
+    prompt = sum(estimate_tokens(m.get('content') or '') + PER_MESSAGE_OVERHEAD_TOKENS for m in messages)
+    return prompt + int(request.get('max_tokens') or 0)
+
+
+class TokenBucket:
+    """Continuously refilling per-minute budget; per_minute=None means unlimited until headers say otherwise"""
+
+    def __init__(self, per_minute: Optional[float] = None):
+        self.per_minute = per_minute
+        self.tokens = float(per_minute) if per_minute else 0.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        if self.per_minute:
+            self.tokens = min(self.per_minute, self.tokens + (now - self.updated) * self.per_minute / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (0 = now)"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if not self.per_minute:
+            return 0.0
+        self._refill(now)
+        # A request larger than the whole bucket goes through once the bucket is full
+        needed = min(amount, self.per_minute) - self.tokens
+        return max(needed, 0.0) * 60.0 / self.per_minute
+
+    def take(self, amount: float):
+        if self.per_minute:
+            self.tokens -= amount
+
+    def refund(self, amount: float):
+        if self.per_minute:
+            self.tokens = min(self.per_minute, self.tokens + amount)
+
+    def observe(self, limit: Optional[float], remaining: Optional[float], reset: Optional[float], now: float):
+        """Correct the bucket from x-ratelimit-limit/remaining/reset headers"""
+        if limit and not self.per_minute:
+            self.per_minute = limit
+            self.tokens = limit
+        if remaining is None:
+            return
+        if remaining <= 0:
+            if reset:
+                self.blocked_until = max(self.blocked_until, now + reset)
+        elif self.per_minute:
+            self._refill(now)
+            self.tokens = min(self.tokens, remaining)
+
+    def block(self, seconds: float, now: float):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class Permit:
+    """One admitted request; hand it back to release()"""
+
+    __slots__ = ('tokens', 'started')
+
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+        self.started = time.monotonic()
+
+
+class RateLimitScheduler:
+    """RPM/TPM token buckets plus AIMD concurrency control, shared by every caller of one API key"""
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 initial_concurrency: int = 4, min_concurrency: int = 1, max_concurrency: int = 64,
+                 backoff_factor: float = 0.5, poll_interval: float = 0.01):
+        self.requests = TokenBucket(rpm)
+        self.token_bucket = TokenBucket(tpm)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.backoff_factor = backoff_factor
+        self.poll_interval = poll_interval
+
+        self.limit = float(min(max(initial_concurrency, min_concurrency), max_concurrency))
+        self.slow_start = True
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+        self.admitted = 0
+        self.rate_limited = 0
+        # Time callers spent waiting for a free concurrency slot vs. for RPM/TPM quota (429 pauses included)
+        self.concurrency_wait_seconds = 0.0
+        self.quota_wait_seconds = 0.0
+        self.peak_concurrency = 0
+
+    @classmethod
+    def from_env(cls, max_concurrency: int = 64) -> Optional["RateLimitScheduler"]:
+        """A scheduler seeded from GROQ_RPM / GROQ_TPM, or None when neither is set"""
+        rpm, tpm = os.getenv("GROQ_RPM"), os.getenv("GROQ_TPM")
+        if not rpm and not tpm:
+            return None
+        return cls(rpm=float(rpm) if rpm else None, tpm=float(tpm) if tpm else None,
+                   max_concurrency=max_concurrency)
+
+    # --- admission ---
+
+    def _try_acquire(self, tokens: int) -> Tuple[float, bool]:
+        """Admit the request (wait 0) or return (seconds to wait before trying again, waiting on quota?)"""
+        with self._lock:
+            now = time.monotonic()
+            if self.in_flight >= int(self.limit):
+                return self.poll_interval, False
+            wait = max(self.requests.wait_time(1, now), self.token_bucket.wait_time(tokens, now))
+            if wait > 0:
+                return wait, True
+            self.requests.take(1)
+            self.token_bucket.take(tokens)
+            self.in_flight += 1
+            self.admitted += 1
+            self.peak_concurrency = max(self.peak_concurrency, self.in_flight)
+            return 0.0, False
+
+    def _waited(self, seconds: float, for_quota: bool):
+        with self._lock:
+            if for_quota:
+                self.quota_wait_seconds += seconds
+            else:
+                self.concurrency_wait_seconds += seconds
+
+    async def acquire(self, tokens: int) -> Permit:
+        while True:
+            wait, for_quota = self._try_acquire(tokens)
+            if wait <= 0:
+                return Permit(tokens)
+            started = time.monotonic()
+            await asyncio.sleep(min(wait, 1.0))
+            self._waited(time.monotonic() - started, for_quota)
+
+    def acquire_sync(self, tokens: int) -> Permit:
+        while True:
+            wait, for_quota = self._try_acquire(tokens)
+            if wait <= 0:
+                return Permit(tokens)
+            started = time.monotonic()
+            time.sleep(min(wait, 1.0))
+            self._waited(time.monotonic() - started, for_quota)
+
+    def blocked_for(self) -> float:
+        """Seconds until a 429 or an exhausted-quota header stops pausing this key (0 = not paused)"""
+        with self._lock:
+            now = time.monotonic()
+            return max(self.requests.blocked_until - now, self.token_bucket.blocked_until - now, 0.0)
+
+    # --- feedback ---
+
+    def release(self, permit: Permit, headers=None, actual_tokens: Optional[int] = None, ok: bool = True,
+                rate_limited: bool = False, retry_after: Optional[float] = None):
+        """Return the slot and feed back the outcome, response headers and real token usage"""
+        with self._lock:
+            now = time.monotonic()
+            self.in_flight -= 1
+            if actual_tokens is not None and actual_tokens < permit.tokens:
+                self.token_bucket.refund(permit.tokens - actual_tokens)
+            if not ok:
+                # A rejected request did not count against the requests limit either
+                self.requests.refund(1)
+            if headers is not None:
+                self._observe_headers(headers, now)
+
+            if rate_limited:
+                self.rate_limited += 1
+                pause = retry_after if retry_after is not None else 1.0
+                self.requests.block(pause, now)
+                self.token_bucket.block(pause, now)
+                # One multiplicative decrease per burst of 429s, not one per failed request
+                if now - self._last_decrease > max(pause, now - permit.started):
+                    self.limit = max(self.min_concurrency, self.limit * self.backoff_factor)
+                    self.slow_start = False
+                    self._last_decrease = now
+            elif not ok:
+                return
+            elif self.slow_start:
+                self.limit = min(self.max_concurrency, self.limit + 1)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+
+    def cancel(self, permit: Permit):
+        """Return the slot of a request abandoned mid-flight (no feedback either way)"""
+        with self._lock:
+            self.in_flight -= 1
+
+    def _observe_headers(self, headers, now: float):
+        def number(name: str) -> Optional[float]:
+            value = headers.get(name)
+            try:
+                return float(value) if value is not None else None
+            except ValueError:
+                return None
+
+        # Groq reports requests per day and tokens per minute; only the
+        # per-minute token limit is used to seed an unconfigured bucket
+        self.requests.observe(None, number('x-ratelimit-remaining-requests'),
+                              parse_reset(headers.get('x-ratelimit-reset-requests')), now)
+        self.token_bucket.observe(number('x-ratelimit-limit-tokens'), number('x-ratelimit-remaining-tokens'),
+                                  parse_reset(headers.get('x-ratelimit-reset-tokens')), now)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'concurrency_limit': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'peak_concurrency': self.peak_concurrency,
+                'slow_start': self.slow_start,
+                'admitted': self.admitted,
+                'rate_limited': self.rate_limited,
+                'concurrency_wait_seconds': round(self.concurrency_wait_seconds, 2),
+                'quota_wait_seconds': round(self.quota_wait_seconds, 2),
+                'rpm': self.requests.per_minute,
+                'tpm': self.token_bucket.per_minute,
+            }
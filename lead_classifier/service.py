@@ -0,0 +1,472 @@
+"""
+HTTP classification service for the React app and the ragBot server.
+
+JSON in, label out, on the same classifier stack as the Streamlit page
+(rules -> cache -> coalescing -> Groq behind the rate-limit scheduler):
+
+    python -m lead_classifier.service --port 8600
+
+    POST /classify        {"id": "...", "conversation": "..."}
+                          -> {"id": "...", "label": "Hot", "source": "groq", "latency_ms": 412.3}
+    POST /classify/batch  {"conversations": ["...", ...]}  -> {"results": [{...}, ...]}
+    POST /sessions/<id>/messages  {"role": "customer", "text": "..."}
+                          -> {"session_id": "...", "label": "Hot", "pending": false, ...}
+    GET  /sessions/<id>   the session's current label
+    GET  /healthz         liveness - the process is up
+    GET  /readyz          readiness - 503 while starting or draining
+    GET  /metrics         Prometheus text (/metrics.json for the snapshot)
+
+Requests arriving within LEAD_SERVICE_BATCH_MS of each other are
+micro-batched: identical transcripts are answered once, the rule engine
+runs over the batch, the offline model scores it as one matrix and Groq
+calls go out together through the shared scheduler. Live chats post each
+message to /sessions/<id>/messages and are re-classified incrementally by a
+SessionClassifier; a background task classifies debounced sessions every
+`--session-debounce` seconds. SIGTERM/SIGINT stop accepting work, drain
+in-flight requests and then exit.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from .backends import DEFAULT_BACKEND, ClassifierBackend, LocalBackend, create_backend
+from .cache import ClassificationCache
+from .compaction import TranscriptCompactor
+from .core import normalize_transcript
+from .hedging import HedgePolicy
+from .keypool import create_async_groq_pool
+from .metrics import METRICS
+from .rules import DEFAULT_THRESHOLD, RulePreClassifier
+from .scheduler import RateLimitScheduler
+from .sessions import DEFAULT_DEBOUNCE_SECONDS, SessionClassifier
+
+DEFAULT_PORT = int(os.getenv("LEAD_SERVICE_PORT", "8600"))
+DEFAULT_BATCH_WINDOW_MS = float(os.getenv("LEAD_SERVICE_BATCH_MS", "5"))
+DEFAULT_MAX_BATCH = int(os.getenv("LEAD_SERVICE_MAX_BATCH", "32"))
+DEFAULT_DRAIN_SECONDS = float(os.getenv("LEAD_SERVICE_DRAIN_SECONDS", "30"))
+CORS_ORIGIN = os.getenv("LEAD_SERVICE_CORS_ORIGIN", "*")
+MAX_BODY_BYTES = 2 * 1024 * 1024
+KEEPALIVE_SECONDS = 30.0
+
+REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 502: "Bad Gateway", 503: "Service Unavailable"}
+
+Outcome = Union[Tuple[str, str], BaseException]
+
+
+# --- 1. MICRO-BATCHING ---
+
+class MicroBatcher:
+    """Collect submissions for `window` seconds (or until `max_batch`) and hand them over as one batch"""
+
+    def __init__(self, handler: Callable[[List[str]], Awaitable[List[Outcome]]],
+                 window: float = DEFAULT_BATCH_WINDOW_MS / 1000.0, max_batch: int = DEFAULT_MAX_BATCH):
+        self.handler = handler
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, conversation: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((conversation, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            outcomes = await self.handler([conversation for conversation, _ in batch])
+        except Exception as e:
+            outcomes = [e] * len(batch)
+        for (_, future), outcome in zip(batch, outcomes):
+            if future.done():
+                continue
+            if isinstance(outcome, BaseException):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+    async def flush_all(self):
+        """Send whatever is waiting and wait for every running batch (used when draining)"""
+        self._flush()
+        while self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'waiting': len(self._pending),
+        }
+
+
+# --- 2. SERVICE ---
+
+class ClassificationService:
+    """asyncio HTTP/1.1 server (keep-alive, JSON bodies) in front of a MicroBatcher"""
+
+    def __init__(self, backend: ClassifierBackend, pre_classifier: Optional[RulePreClassifier] = None,
+                 host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                 batch_window: float = DEFAULT_BATCH_WINDOW_MS / 1000.0, max_batch: int = DEFAULT_MAX_BATCH,
+                 session_debounce: float = DEFAULT_DEBOUNCE_SECONDS):
+        self.backend = backend
+        self.pre_classifier = pre_classifier
+        self.host = host
+        self.port = port
+        self.batcher = MicroBatcher(self.classify_batch, batch_window, max_batch)
+        self.sessions = SessionClassifier(backend, pre_classifier, debounce_seconds=session_debounce)
+
+        self.ready = False
+        self.draining = False
+        self.in_flight = 0
+        self.requests = 0
+        self.duplicates = 0
+        self._idle = asyncio.Event()
+        self._connections: Set[asyncio.StreamWriter] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._session_flusher: Optional[asyncio.Task] = None
+
+    # --- classification ---
+
+    async def classify_batch(self, conversations: List[str]) -> List[Outcome]:
+        """Rules, de-duplication and one backend pass for a micro-batch; returns (label, source) per item"""
+        groups: Dict[str, List[int]] = {}
+        for index, conversation in enumerate(conversations):
+            groups.setdefault(normalize_transcript(conversation), []).append(index)
+
+        outcomes: List[Optional[Outcome]] = [None] * len(conversations)
+        pending: List[List[int]] = []
+        for indexes in groups.values():
+            conversation = conversations[indexes[0]]
+            result = self.pre_classifier.try_classify(conversation) if self.pre_classifier else None
+            if result is not None:
+                outcomes[indexes[0]] = (result.label, "rules")
+            else:
+                pending.append(indexes)
+
+        texts = [conversations[indexes[0]] for indexes in pending]
+        if isinstance(self.backend, LocalBackend):
+            # One sparse matrix for the whole batch
+            labels = await asyncio.to_thread(self.backend.classify_many, texts)
+            answers: List[Outcome] = [(label, self.backend.name) for label in labels]
+        else:
+            answers = await asyncio.gather(*(self.backend.classify_with_source_async(text) for text in texts),
+                                           return_exceptions=True)
+        for indexes, answer in zip(pending, answers):
+            outcomes[indexes[0]] = answer
+
+        # Identical transcripts in the same batch share the first one's answer
+        for indexes in groups.values():
+            first = outcomes[indexes[0]]
+            for index in indexes[1:]:
+                self.duplicates += 1
+                METRICS.record_coalesced()
+                outcomes[index] = first if isinstance(first, BaseException) else (first[0], "coalesced")
+        return outcomes
+
+    async def classify_one(self, item: Any) -> Tuple[int, Dict[str, Any]]:
+        if isinstance(item, str):
+            item = {'conversation': item}
+        conversation = item.get('conversation') if isinstance(item, dict) else None
+        if not isinstance(conversation, str) or not conversation.strip():
+            return 400, {'id': item.get('id') if isinstance(item, dict) else None,
+                         'error': "'conversation' must be a non-empty string"}
+
+        started = time.perf_counter()
+        try:
+            with METRICS.classification() as outcome:
+                outcome.label, outcome.source = await self.batcher.submit(conversation)
+        except Exception as e:
+            return 502, {'id': item.get('id'), 'error': str(e)}
+        return 200, {'id': item.get('id'), 'label': outcome.label, 'source': outcome.source,
+                     'latency_ms': round((time.perf_counter() - started) * 1000, 1)}
+
+    async def add_session_message(self, session_id: str, payload: Any) -> Tuple[int, Dict[str, Any]]:
+        role = payload.get('role') if isinstance(payload, dict) else None
+        text = payload.get('text') if isinstance(payload, dict) else None
+        if not isinstance(role, str) or not isinstance(text, str) or not text.strip():
+            return 400, {'session_id': session_id, 'error': "'role' and a non-empty 'text' are required"}
+        try:
+            update = await self.sessions.add_message_async(session_id, role, text)
+        except ValueError as e:
+            return 400, {'session_id': session_id, 'error': str(e)}
+        except Exception as e:
+            return 502, {'session_id': session_id, 'error': str(e)}
+        return 200, update.as_dict()
+
+    async def _flush_sessions(self):
+        """Classify sessions whose debounce window has passed; without this a debounced
+        update would wait for the session's next message"""
+        while True:
+            await asyncio.sleep(self.sessions.debounce_seconds or 0.5)
+            try:
+                await self.sessions.flush_due_async()
+            except Exception as e:
+                print(f"✗ Session flush failed: {e}", file=sys.stderr)
+
+    # --- routing ---
+
+    async def route(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        path = path.split('?')[0].rstrip('/') or '/'
+        if method == "GET":
+            if path in ("/healthz", "/health"):
+                return 200, {'status': 'ok'}
+            if path == "/readyz":
+                ready = self.ready and not self.draining
+                return (200 if ready else 503), {'ready': ready, 'draining': self.draining,
+                                                 'in_flight': self.in_flight}
+            if path == "/metrics":
+                return 200, METRICS.render_prometheus()
+            if path == "/metrics.json":
+                return 200, {**METRICS.snapshot(), 'service': self.stats()}
+            if path.startswith("/sessions/") and path.count('/') == 2:
+                session_id = path[len("/sessions/"):]
+                return 200, {'session_id': session_id, 'label': self.sessions.label(session_id)}
+            return 404, {'error': f"unknown path {path}"}
+
+        session_id = None
+        if path.startswith("/sessions/") and path.endswith("/messages") and path.count('/') == 3:
+            session_id = path[len("/sessions/"):-len("/messages")]
+        elif path not in ("/classify", "/classify/batch"):
+            return 404, {'error': f"{method} {path}"}
+        if method != "POST":
+            return 405, {'error': f"{method} {path}"}
+        if self.draining or not self.ready:
+            return 503, {'error': "service is shutting down" if self.draining else "service is starting"}
+
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            return 400, {'error': "body must be JSON"}
+
+        self._enter()
+        try:
+            if session_id is not None:
+                return await self.add_session_message(session_id, payload)
+            if path == "/classify":
+                return await self.classify_one(payload)
+            items = payload.get('conversations') if isinstance(payload, dict) else payload
+            if not isinstance(items, list):
+                return 400, {'error': "'conversations' must be a list"}
+            results = await asyncio.gather(*(self.classify_one(item) for item in items))
+            return 200, {'results': [result for _, result in results]}
+        finally:
+            self._exit()
+
+    def _enter(self):
+        self.in_flight += 1
+        self.requests += 1
+        self._idle.clear()
+
+    def _exit(self):
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self._idle.set()
+
+    # --- HTTP ---
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line.strip():
+                    break
+                method, path, version = request_line.decode('latin-1').split()
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length') or 0)
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': "body too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                if method == "OPTIONS":
+                    status, payload = 204, None
+                else:
+                    status, payload = await self.route(method, path, body)
+                keep_alive = (version == "HTTP/1.1" and headers.get('connection', '').lower() != 'close'
+                              and not self.draining)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool):
+        if payload is None:
+            body, content_type = b'', "application/json"
+        elif isinstance(payload, str):
+            body, content_type = payload.encode('utf-8'), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload, ensure_ascii=False).encode('utf-8'), "application/json"
+        head = [
+            f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+            # The React app calls this from the browser
+            f"Access-Control-Allow-Origin: {CORS_ORIGIN}",
+            "Access-Control-Allow-Methods: GET, POST, OPTIONS",
+            "Access-Control-Allow-Headers: Content-Type",
+        ]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body)
+        await writer.drain()
+
+    # --- lifecycle ---
+
+    async def start(self) -> "ClassificationService":
+        self._idle.set()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._session_flusher = asyncio.ensure_future(self._flush_sessions())
+        self.ready = True
+        return self
+
+    async def drain(self, timeout: float = DEFAULT_DRAIN_SECONDS):
+        """Stop accepting work, finish what is in flight (up to `timeout`), then close"""
+        self.draining = True
+        if self._server is not None:
+            self._server.close()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            print(f"✗ Drain timed out with {self.in_flight} request(s) still in flight", file=sys.stderr)
+        await self.batcher.flush_all()
+        if self._session_flusher is not None:
+            self._session_flusher.cancel()
+        for writer in list(self._connections):
+            writer.close()
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'ready': self.ready,
+            'draining': self.draining,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'duplicates_in_batch': self.duplicates,
+            'connections': len(self._connections),
+            'batching': self.batcher.stats(),
+            'sessions': self.sessions.stats(),
+            'client': getattr(getattr(self.backend, 'async_client', None), 'stats', lambda: None)(),
+        }
+
+
+def build_service(backend_spec: str = DEFAULT_BACKEND, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                  batch_window: float = DEFAULT_BATCH_WINDOW_MS / 1000.0, max_batch: int = DEFAULT_MAX_BATCH,
+                  cache: Optional[ClassificationCache] = None,
+                  pre_classifier: Optional[RulePreClassifier] = None,
+                  session_debounce: float = DEFAULT_DEBOUNCE_SECONDS) -> ClassificationService:
+    """The service with the same backend stack as the Streamlit page; call from inside the event loop"""
+    async_client = None
+    if "groq" in backend_spec:
+        # Every key gets a scheduler even without GROQ_RPM/GROQ_TPM - limits are then learnt from headers
+        async_client = create_async_groq_pool(
+            scheduler_factory=lambda: RateLimitScheduler.from_env() or RateLimitScheduler())
+    near_dup = None
+    if os.getenv("LEAD_NEAR_DUP_THRESHOLD"):
+        # NumPy is only loaded when near-duplicate reuse is on
+        from .neardup import NearDuplicateIndex
+        near_dup = NearDuplicateIndex.from_env()
+    backend = create_backend(backend_spec, async_client=async_client, cache=cache,
+                             compactor=TranscriptCompactor(), hedge=HedgePolicy.from_env(), near_dup=near_dup)
+    return ClassificationService(backend, pre_classifier, host, port, batch_window, max_batch, session_debounce)
+
+
+# --- 3. CLI ---
+
+async def serve(args: argparse.Namespace):
+    cache = None if args.no_cache else ClassificationCache()
+    pre_classifier = None if args.no_rules else RulePreClassifier(threshold=args.rules_threshold)
+    service = await build_service(args.backend, args.host, args.port, args.batch_ms / 1000.0, args.max_batch,
+                                  cache, pre_classifier, args.session_debounce).start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    print("=" * 60)
+    print(f"Lead classifier service on http://{service.host}:{service.port}")
+    print(f"  backend: {args.backend}  batch window: {args.batch_ms:g} ms  max batch: {args.max_batch}")
+    print("  POST /classify  POST /classify/batch  POST /sessions/<id>/messages")
+    print("  GET /sessions/<id>  GET /healthz /readyz /metrics")
+    print("=" * 60)
+
+    await stop.wait()
+    print(f"Draining {service.in_flight} in-flight request(s)...")
+    await service.drain(args.drain_seconds)
+    if cache is not None:
+        cache.close()
+    print(f"✓ Stopped after {service.requests} requests")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve lead classification over HTTP")
+    parser.add_argument("--host", default=os.getenv("LEAD_SERVICE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--backend", default=DEFAULT_BACKEND, help="groq, local, or primary,fallback")
+    parser.add_argument("--batch-ms", type=float, default=DEFAULT_BATCH_WINDOW_MS,
+                        help="Micro-batch window in milliseconds")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--session-debounce", type=float, default=DEFAULT_DEBOUNCE_SECONDS,
+                        help="Seconds between re-classifications of a live session")
+    parser.add_argument("--drain-seconds", type=float, default=DEFAULT_DRAIN_SECONDS,
+                        help="Longest to wait for in-flight requests on shutdown")
+    parser.add_argument("--rules-threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--no-rules", action="store_true", help="Send every transcript to the backend")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the backend")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    if "groq" in args.backend and not (os.getenv("GROQ_API_KEY") or os.getenv("GROQ_API_KEYS")):
+        print("Error: GROQ_API_KEY is missing. Please set it in your .env file.", file=sys.stderr)
+        return 1
+
+    asyncio.run(serve(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
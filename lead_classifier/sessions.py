@@ -0,0 +1,309 @@
+"""
+Incremental classification for live, growing conversations.
+
+Instead of re-sending the whole transcript on every message, a
+SessionClassifier keeps per-session state and only re-classifies when a new
+customer turn changes the picture:
+
+  - agent-only messages reuse the last label
+  - short, indicator-free customer turns ("ok", "thanks") reuse the last label
+  - bursts of messages inside the debounce window are coalesced into one call
+  - only the most recent turns are sent in full, since final sentiment matters
+    most; older turns are folded into a short summary that keeps the customer
+    turns with a rule indicator (all customer turns without a pre-classifier)
+
+The HTTP service (service.py) exposes it as POST /sessions/<id>/messages
+and runs flush_due_async() every `debounce_seconds`, so a debounced update
+is classified without waiting for the next message. The class has no timer
+of its own: other callers must poll flush()/flush_due() themselves.
+Sessions live in process memory only.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple, Union
+
+from .backends import ClassifierBackend
+from .metrics import METRICS
+from .rules import RulePreClassifier
+
+CUSTOMER_ROLES = {"customer", "user", "client", "lead"}
+AGENT_ROLES = {"agent", "assistant", "bot", "sales"}
+
+DEFAULT_DEBOUNCE_SECONDS = 2.0
+DEFAULT_MIN_NEW_CHARS = 40
+DEFAULT_CONTEXT_TURNS = 12
+# Older customer turns kept in the summary of the turns that left the context window
+DEFAULT_SUMMARY_TURNS = 4
+DEFAULT_MAX_SESSIONS = 5000
+DEFAULT_IDLE_TTL_SECONDS = 6 * 3600
+
+
+class SessionUpdate:
+    """What the caller should show after a message arrives"""
+
+    __slots__ = ('session_id', 'label', 'source', 'reclassified', 'pending', 'reason')
+
+    def __init__(self, session_id: str, label: Optional[str], source: Optional[str],
+                 reclassified: bool, pending: bool, reason: str):
+        self.session_id = session_id
+        self.label = label
+        self.source = source
+        self.reclassified = reclassified
+        self.pending = pending
+        self.reason = reason
+
+    def as_dict(self) -> Dict[str, object]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class LiveSession:
+    """Per-conversation state"""
+
+    def __init__(self, session_id: str, context_turns: int, summary_turns: int = DEFAULT_SUMMARY_TURNS):
+        self.session_id = session_id
+        # (role, text, has_indicator) for the recent window that is sent in full
+        self.turns: Deque[Tuple[str, str, bool]] = deque(maxlen=context_turns or None)
+        # Summary of the turns that left the window: how many, and the customer turns worth keeping
+        self.earlier_turns = 0
+        self.earlier_highlights: Deque[str] = deque(maxlen=summary_turns)
+        self.label: Optional[str] = None
+        self.source: Optional[str] = None
+        self.customer_chars_since = 0      # customer text added since then
+        self.indicators_since = 0          # rule indicators seen since then
+        self.last_classified_at = 0.0
+        self.last_seen = time.monotonic()
+        self.in_flight = False
+
+    def add_turn(self, role: str, text: str, has_indicator: bool, keep_all_customer_turns: bool):
+        if self.turns.maxlen is not None and len(self.turns) == self.turns.maxlen:
+            old_role, old_text, old_indicator = self.turns[0]
+            self.earlier_turns += 1
+            if old_role == "customer" and (old_indicator or keep_all_customer_turns) \
+                    and old_text not in self.earlier_highlights:
+                self.earlier_highlights.append(old_text)
+        self.turns.append((role, text, has_indicator))
+
+    def transcript(self) -> str:
+        lines = []
+        if self.earlier_turns:
+            lines.append(f"[Summary of {self.earlier_turns} earlier turns]")
+            lines += [f"Customer: {text}" for text in self.earlier_highlights]
+            lines.append("[Latest turns]")
+        lines += [f"{'Customer' if role == 'customer' else 'Agent'}: {text}" for role, text, _ in self.turns]
+        return "\n".join(lines)
+
+
+class SessionClassifier:
+    """Debounced, delta-driven classification for many concurrent chats"""
+
+    def __init__(self, backend: ClassifierBackend, pre_classifier: Optional[RulePreClassifier] = None,
+                 debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS,
+                 min_new_chars: int = DEFAULT_MIN_NEW_CHARS,
+                 context_turns: int = DEFAULT_CONTEXT_TURNS,
+                 summary_turns: int = DEFAULT_SUMMARY_TURNS,
+                 max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 idle_ttl_seconds: float = DEFAULT_IDLE_TTL_SECONDS):
+        self.backend = backend
+        self.pre_classifier = pre_classifier
+        self.debounce_seconds = debounce_seconds
+        self.min_new_chars = min_new_chars
+        self.context_turns = context_turns
+        self.summary_turns = summary_turns
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+
+        self._sessions: "OrderedDict[str, LiveSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.messages = 0
+        self.classifications = 0
+        self.reused = 0
+        self.debounced = 0
+
+    # --- session store ---
+
+    def _session(self, session_id: str) -> LiveSession:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = LiveSession(session_id, self.context_turns, self.summary_turns)
+        self._sessions.move_to_end(session_id)
+        session.last_seen = time.monotonic()
+        self._evict()
+        return session
+
+    def _evict(self):
+        """Drop idle sessions, then the least recently active beyond max_sessions"""
+        cutoff = time.monotonic() - self.idle_ttl_seconds
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_seen >= cutoff and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+    def end_session(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    # --- message deltas ---
+
+    def add_message(self, session_id: str, role: str, text: str) -> SessionUpdate:
+        """Record one message and re-classify only if it changes the picture"""
+        due = self._record(session_id, role, text)
+        return due if isinstance(due, SessionUpdate) else self._classify(*due)
+
+    async def add_message_async(self, session_id: str, role: str, text: str) -> SessionUpdate:
+        """add_message() for event loops: the backend is called through its async path"""
+        due = self._record(session_id, role, text)
+        return due if isinstance(due, SessionUpdate) else await self._classify_async(*due)
+
+    def _record(self, session_id: str, role: str, text: str) -> Union[SessionUpdate, Tuple[LiveSession, str]]:
+        """Add the message; returns the update to show, or (session, reason) when it must be classified"""
+        role = role.strip().lower()
+        is_customer = role in CUSTOMER_ROLES
+        if not is_customer and role not in AGENT_ROLES:
+            raise ValueError(f"Unknown role '{role}' - expected customer or agent")
+
+        with self._lock:
+            self.messages += 1
+            session = self._session(session_id)
+            has_indicator = is_customer and self.pre_classifier is not None \
+                and bool(self.pre_classifier.score(text).matches)
+            session.add_turn("customer" if is_customer else "agent", text.strip(), has_indicator,
+                             keep_all_customer_turns=self.pre_classifier is None)
+
+            if is_customer:
+                session.customer_chars_since += len(text.strip())
+                if has_indicator:
+                    session.indicators_since += 1
+
+            reason = self._needs_classification(session)
+            if reason is None:
+                self.reused += 1
+                return self._update(session, reclassified=False, pending=False,
+                                    reason="agent message" if not is_customer else "no material change")
+
+            if time.monotonic() - session.last_classified_at < self.debounce_seconds or session.in_flight:
+                self.debounced += 1
+                return self._update(session, reclassified=False, pending=True, reason="debounced")
+
+            session.in_flight = True
+        return session, reason
+
+    def flush(self, session_id: str) -> Optional[SessionUpdate]:
+        """Classify a session whose debounce window has elapsed (call from a timer/poll loop)"""
+        due = self._due(session_id)
+        return due if due is None or isinstance(due, SessionUpdate) else self._classify(*due)
+
+    async def flush_async(self, session_id: str) -> Optional[SessionUpdate]:
+        due = self._due(session_id)
+        return due if due is None or isinstance(due, SessionUpdate) else await self._classify_async(*due)
+
+    def _due(self, session_id: str) -> Union[None, SessionUpdate, Tuple[LiveSession, str]]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            reason = self._needs_classification(session)
+            if reason is None or session.in_flight or \
+                    time.monotonic() - session.last_classified_at < self.debounce_seconds:
+                return self._update(session, reclassified=False, pending=reason is not None,
+                                    reason="up to date" if reason is None else "debounced")
+            session.in_flight = True
+        return session, reason
+
+    def flush_due(self) -> List[SessionUpdate]:
+        """Flush every session with debounced work that is now due"""
+        return [update for update in (self.flush(sid) for sid in self._due_sessions())
+                if update and update.reclassified]
+
+    async def flush_due_async(self) -> List[SessionUpdate]:
+        updates = await asyncio.gather(*(self.flush_async(sid) for sid in self._due_sessions()))
+        return [update for update in updates if update and update.reclassified]
+
+    def _due_sessions(self) -> List[str]:
+        with self._lock:
+            return [sid for sid, s in self._sessions.items()
+                    if not s.in_flight and self._needs_classification(s) is not None
+                    and time.monotonic() - s.last_classified_at >= self.debounce_seconds]
+
+    def label(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session.label if session else None
+
+    # --- internals ---
+
+    def _needs_classification(self, session: LiveSession) -> Optional[str]:
+        """Reason to re-classify, or None when the last label still stands"""
+        if session.label is None:
+            return "first customer turn" if session.customer_chars_since else None
+        if session.indicators_since:
+            return "new indicator"
+        if session.customer_chars_since >= self.min_new_chars:
+            return "new customer content"
+        return None
+
+    def _classify(self, session: LiveSession, reason: str) -> SessionUpdate:
+        """Run one classification; the caller has already set session.in_flight"""
+        transcript, chars_seen, indicators_seen = self._snapshot(session)
+        try:
+            with METRICS.classification() as outcome:
+                label, source = self._rules(transcript)
+                if label is None:
+                    outcome.source = self.backend.name
+                    label, source = self.backend.classify_with_source(transcript)
+                outcome.source, outcome.label = source, label
+        finally:
+            with self._lock:
+                session.in_flight = False
+        return self._finish(session, reason, label, source, chars_seen, indicators_seen)
+
+    async def _classify_async(self, session: LiveSession, reason: str) -> SessionUpdate:
+        transcript, chars_seen, indicators_seen = self._snapshot(session)
+        try:
+            with METRICS.classification() as outcome:
+                label, source = self._rules(transcript)
+                if label is None:
+                    outcome.source = self.backend.name
+                    label, source = await self.backend.classify_with_source_async(transcript)
+                outcome.source, outcome.label = source, label
+        finally:
+            with self._lock:
+                session.in_flight = False
+        return self._finish(session, reason, label, source, chars_seen, indicators_seen)
+
+    def _snapshot(self, session: LiveSession) -> Tuple[str, int, int]:
+        with self._lock:
+            return session.transcript(), session.customer_chars_since, session.indicators_since
+
+    def _rules(self, transcript: str) -> Tuple[Optional[str], Optional[str]]:
+        result = self.pre_classifier.try_classify(transcript) if self.pre_classifier is not None else None
+        return (result.label, "rules") if result is not None else (None, None)
+
+    def _finish(self, session: LiveSession, reason: str, label: str, source: str,
+                chars_seen: int, indicators_seen: int) -> SessionUpdate:
+        with self._lock:
+            self.classifications += 1
+            session.label, session.source = label, source
+            # Keep whatever arrived while the call was in flight
+            session.customer_chars_since -= chars_seen
+            session.indicators_since -= indicators_seen
+            session.last_classified_at = time.monotonic()
+            return self._update(session, reclassified=True,
+                                pending=self._needs_classification(session) is not None, reason=reason)
+
+    def _update(self, session: LiveSession, reclassified: bool, pending: bool, reason: str) -> SessionUpdate:
+        return SessionUpdate(session.session_id, session.label, session.source, reclassified, pending, reason)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'active_sessions': len(self._sessions),
+            'messages': self.messages,
+            'classifications': self.classifications,
+            'reused': self.reused,
+            'debounced': self.debounced,
+            'calls_per_message': round(self.classifications / self.messages, 4) if self.messages else 0.0,
+        }
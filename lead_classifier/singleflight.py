@@ -0,0 +1,82 @@
+"""
+Single-flight request coalescing.
+
+When several callers ask for the same key at once (agents pasting the same
+shared transcript within seconds), only the first - the leader - runs the
+call; the others wait on it and share its result or its exception.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from .metrics import METRICS
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key onto one execution"""
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._tasks: Dict[Tuple[int, str], asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn once per in-flight key; returns (result, shared) where shared means we waited on a leader"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            METRICS.record_coalesced()
+            return future.result(), True
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result(), False
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Async twin of do(); calls are only shared within one event loop"""
+        task_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            leader = task is None
+            if leader:
+                task = self._tasks[task_key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda _: self._forget(task_key))
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            METRICS.record_coalesced()
+        # Shielded so one caller giving up does not cancel the call the others wait on
+        return await asyncio.shield(task), not leader
+
+    def _forget(self, task_key: Tuple[int, str]):
+        with self._lock:
+            self._tasks.pop(task_key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = len(self._calls) + len(self._tasks)
+        total = self.leaders + self.coalesced
+        return {
+            'leaders': self.leaders,
+            'coalesced': self.coalesced,
+            'in_flight': in_flight,
+            'coalesced_fraction': round(self.coalesced / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,198 @@
+"""
+Cold-start benchmark for the Streamlit page.
+
+Every measurement runs in a fresh interpreter, so it reflects what a new
+container pays:
+
+  - import time: `streamlit` itself, then the modules streamlit_app.py
+    imports at top level (read from the file, so the list never drifts),
+    plus which heavy optional modules (groq, numpy, ...) got pulled in
+  - render time: the first script run through streamlit's AppTest harness
+    (cache_resource factories included) and the median warm rerun
+
+    python -m lead_classifier.startup --runs 5
+    python -m lead_classifier.startup --compare .cache/benchmarks/startup-old.json
+
+The page runs with a throwaway queue/cache directory and a dummy key; no
+request leaves the machine because the Groq SDK is only built on first use.
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from .benchmark import _git_commit
+from .corpus import REPO_ROOT
+
+STARTUP_BENCHMARK_VERSION = 1
+DEFAULT_APP_PATH = os.path.join(REPO_ROOT, "streamlit_app.py")
+DEFAULT_RESULTS_DIR = os.path.join(REPO_ROOT, ".cache", "benchmarks")
+# Imports the page should not pay for until it needs them
+HEAVY_MODULES = ("groq", "httpx", "numpy", "pandas")
+
+_IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import streamlit
+streamlit_done = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+done = time.perf_counter()
+print(json.dumps({{
+    'streamlit_seconds': streamlit_done - started,
+    'app_imports_seconds': done - streamlit_done,
+    'heavy_modules': [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+_RENDER_PROBE = """
+import json, statistics, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({path!r}, default_timeout=120)
+started = time.perf_counter()
+app.run()
+first = time.perf_counter() - started
+reruns = []
+for _ in range({reruns}):
+    started = time.perf_counter()
+    app.run()
+    reruns.append(time.perf_counter() - started)
+print(json.dumps({{
+    'first_render_seconds': first,
+    'rerun_seconds': statistics.median(reruns) if reruns else None,
+    'exceptions': [str(e.value) for e in app.exception],
+}}))
+"""
+
+
+def app_imports(path: str = DEFAULT_APP_PATH) -> List[str]:
+    """Modules imported at the top level of the page, in order"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def _probe(code: str, env: Dict[str, str]) -> Dict[str, Any]:
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True, timeout=300)
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup probe failed:\n{result.stderr.strip()}")
+    # Streamlit may log to stdout before the report line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _probe_env(workdir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [REPO_ROOT, env.get('PYTHONPATH')]))
+    # Keep the real job queue and cache out of it; a dummy key gets past the missing-key check
+    env['LEAD_QUEUE_PATH'] = os.path.join(workdir, "jobs.sqlite3")
+    env['LEAD_CACHE_PATH'] = os.path.join(workdir, "cache.sqlite3")
+    env.setdefault('GROQ_API_KEY', "startup-benchmark")
+    env.pop('LEAD_METRICS_PORT', None)
+    return env
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    return {'median': round(statistics.median(values), 4), 'min': round(min(values), 4),
+            'max': round(max(values), 4)}
+
+
+def run_startup_benchmark(path: str = DEFAULT_APP_PATH, runs: int = 5, reruns: int = 5) -> Dict[str, Any]:
+    """Median/min/max of import and render times over `runs` fresh processes"""
+    modules = app_imports(path)
+    imports, renders = [], []
+    with tempfile.TemporaryDirectory(prefix="lead-startup-") as workdir:
+        env = _probe_env(workdir)
+        for _ in range(runs):
+            imports.append(_probe(_IMPORT_PROBE.format(modules=modules, heavy=HEAVY_MODULES), env))
+            renders.append(_probe(_RENDER_PROBE.format(path=path, reruns=reruns), env))
+
+    exceptions = sorted({e for render in renders for e in render['exceptions']})
+    return {
+        'modules': modules,
+        'streamlit_import_seconds': _summary([r['streamlit_seconds'] for r in imports]),
+        'app_import_seconds': _summary([r['app_imports_seconds'] for r in imports]),
+        'first_render_seconds': _summary([r['first_render_seconds'] for r in renders]),
+        'rerun_seconds': _summary([r['rerun_seconds'] for r in renders if r['rerun_seconds'] is not None]
+                                  or [0.0]),
+        'heavy_modules_at_import': sorted({m for r in imports for m in r['heavy_modules']}),
+        'exceptions': exceptions,
+    }
+
+
+# --- REPORTING ---
+
+def print_report(report: Dict[str, Any]):
+    results = report['results']
+    print("=" * 60)
+    print(f"Startup: {report['config']['app']}  ({report['config']['runs']} cold processes)")
+    print("=" * 60)
+    for name, key in (("import streamlit", 'streamlit_import_seconds'), ("import page modules", 'app_import_seconds'),
+                      ("first render", 'first_render_seconds'), ("warm rerun", 'rerun_seconds')):
+        stats = results[key]
+        print(f"  {name:<20} {stats['median'] * 1000:8.1f} ms  (min {stats['min'] * 1000:.1f}, "
+              f"max {stats['max'] * 1000:.1f})")
+    heavy = results['heavy_modules_at_import']
+    print(f"  Heavy modules loaded at import: {', '.join(heavy) if heavy else 'none'}")
+    for error in results['exceptions']:
+        print(f"✗ Page raised: {error}")
+
+
+def compare_reports(old: Dict[str, Any], new: Dict[str, Any]):
+    print(f"{'median':<22}{'old':>10}{'new':>10}{'change':>10}")
+    for key in ('streamlit_import_seconds', 'app_import_seconds', 'first_render_seconds', 'rerun_seconds'):
+        before, after = old['results'][key]['median'], new['results'][key]['median']
+        change = f"{(after - before) / before:+.0%}" if before else "-"
+        print(f"{key.replace('_seconds', ''):<22}{before * 1000:>8.1f}ms{after * 1000:>8.1f}ms{change:>10}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure cold-start import and render time of the Streamlit page")
+    parser.add_argument("--app", default=DEFAULT_APP_PATH, help="Streamlit script to measure")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per measurement")
+    parser.add_argument("--reruns", type=int, default=5, help="Warm reruns timed after the first render")
+    parser.add_argument("--compare", metavar="OLD_REPORT", help="Print the change against an earlier report")
+    parser.add_argument("-o", "--output", help="Report path (default .cache/benchmarks/startup-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    report = {
+        'benchmark_version': STARTUP_BENCHMARK_VERSION,
+        'config': {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'git_commit': _git_commit(),
+            'app': os.path.relpath(os.path.abspath(args.app), REPO_ROOT),
+            'runs': args.runs,
+            'reruns': args.reruns,
+            'python': sys.version.split()[0],
+        },
+        'results': run_startup_benchmark(os.path.abspath(args.app), args.runs, args.reruns),
+    }
+    print_report(report)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print()
+            compare_reports(json.load(f), report)
+
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, "startup-" + time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Report saved to: {output}")
+    return 1 if report['results']['exceptions'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,510 @@
+"""
+Local stand-in for the Groq chat-completions endpoint.
+
+Answers POST /openai/v1/chat/completions (the path the Groq SDK calls) and
+/v1/chat/completions with a deterministic Hot/Cold/Dead label and a
+Groq-shaped `usage` block, so the classifier, the batch engine and the
+benchmark run offline and can be load-tested without spending quota:
+
+    python -m lead_classifier.stub_server --port 8787 --latency lognormal:250,0.5 --rate-limit-rate 0.05
+    GROQ_BASE_URL=http://127.0.0.1:8787 GROQ_API_KEY=stub python -m lead_classifier.batch ...
+
+Labellers:
+    "model" - the offline TF-IDF model (default; realistic labels)
+    "hash"  - a hash of the transcript (no NumPy, stable across runs)
+    "Hot" / "Cold" / "Dead" - always that label
+
+Latency specs (milliseconds):
+    "0", "fixed:80", "uniform:50,400", "normal:200,50",
+    "lognormal:200,0.6" (median, sigma), "exponential:150" (mean)
+
+Faults: random 5xx (--error-rate), random 429 with `retry-after`
+(--rate-limit-rate), real RPM/TPM windows (--rpm / --tpm) that answer
+429 and send Groq's x-ratelimit-* headers on every response, and 401s for
+revoked keys (--revoked-keys). Like Groq, limits apply per API key.
+
+`"stream": true` requests are answered as server-sent events, one chunk per
+token (--token-latency ms apart), ending with x_groq.usage and [DONE].
+--trailing N makes the "model" ramble N tokens past the label, the way
+chatty models ignore the one-word instruction.
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .compaction import estimate_tokens
+from .core import LABELS
+
+COMPLETION_PATHS = ("/openai/v1/chat/completions", "/v1/chat/completions")
+RATE_WINDOW_SECONDS = 60.0
+
+_TRANSCRIPT_PREFIX = "Conversation transcript:\n\n"
+_TRANSCRIPT_SUFFIX = "\n\nReturn only one word: Hot or Cold or Dead."
+_TRAILING_TOKENS = (" -", " the", " customer", " shows", " clear", " buying", " intent", ".")
+
+
+# --- 1. LABELS & LATENCY ---
+
+def extract_transcript(messages: List[Dict[str, Any]]) -> str:
+    """Recover the transcript from the messages built by core.build_messages"""
+    content = next((m.get('content') or '' for m in reversed(messages) if m.get('role') == 'user'), '')
+    if content.startswith(_TRANSCRIPT_PREFIX):
+        content = content[len(_TRANSCRIPT_PREFIX):]
+    if content.endswith(_TRANSCRIPT_SUFFIX):
+        content = content[:-len(_TRANSCRIPT_SUFFIX)]
+    return content
+
+
+def make_labeller(spec: str = "model") -> Callable[[str], str]:
+    """Build a transcript -> label function from a labeller name"""
+    if spec.capitalize() in LABELS:
+        return lambda transcript: spec.capitalize()
+
+    if spec == "hash":
+        return lambda transcript: LABELS[hashlib.sha256(transcript.encode('utf-8')).digest()[0] % len(LABELS)]
+
+    if spec == "model":
+        from .local_model import DEFAULT_MODEL_PATH, load_or_train
+        model = load_or_train(DEFAULT_MODEL_PATH)
+        lock = threading.Lock()
+
+        def label(transcript: str) -> str:
+            with lock:
+                return model.predict([transcript])[0]
+        return label
+
+    raise ValueError(f"Unknown labeller '{spec}' - expected model, hash, Hot, Cold or Dead")
+
+
+class LatencyModel:
+    """Samples simulated model latency (seconds) from a spec like "lognormal:200,0.6" (ms)"""
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+    def __init__(self, spec: str = "0", seed: Optional[int] = None):
+        self.spec = spec
+        kind, _, params = spec.partition(":")
+        if not params:
+            kind, params = "fixed", kind
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution '{kind}' - expected one of {', '.join(self.KINDS)}")
+        try:
+            self.params = [float(p) for p in params.split(",")]
+        except ValueError:
+            raise ValueError(f"Bad latency parameters in '{spec}'") from None
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}[kind]
+        if len(self.params) != expected:
+            raise ValueError(f"'{kind}' latency takes {expected} parameter(s), got '{spec}'")
+
+        self.kind = kind
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.kind == "fixed":
+                ms = self.params[0]
+            elif self.kind == "uniform":
+                ms = self._random.uniform(*self.params)
+            elif self.kind == "normal":
+                ms = self._random.gauss(*self.params)
+            elif self.kind == "lognormal":
+                median, sigma = self.params
+                ms = self._random.lognormvariate(math.log(max(median, 1e-6)), sigma)
+            else:
+                ms = self._random.expovariate(1.0 / max(self.params[0], 1e-6))
+        return max(ms, 0.0) / 1000.0
+
+
+def _format_reset(seconds: float) -> str:
+    """Groq's reset header format: "7.66s" or "2m59.56s" """
+    minutes, seconds = divmod(round(max(seconds, 0.0), 2), 60)
+    return f"{int(minutes)}m{seconds:.2f}s" if minutes else f"{seconds:.2f}s"
+
+
+class RateWindow:
+    """Sliding one-minute request and token windows, like Groq's RPM/TPM limits"""
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._events: Deque[Tuple[float, int]] = deque()
+        self._tokens = 0
+        self._lock = threading.Lock()
+
+    def _purge(self, now: float):
+        while self._events and now - self._events[0][0] >= RATE_WINDOW_SECONDS:
+            self._tokens -= self._events.popleft()[1]
+
+    def _reset_after(self, now: float, tokens_needed: int = 0) -> float:
+        """Seconds until enough of the window has expired to admit the request"""
+        if self.rpm and len(self._events) >= self.rpm:
+            return self._events[len(self._events) - self.rpm][0] + RATE_WINDOW_SECONDS - now
+        if self.tpm and tokens_needed:
+            freed = self._tokens + tokens_needed - self.tpm
+            for ts, tokens in self._events:
+                freed -= tokens
+                if freed <= 0:
+                    return ts + RATE_WINDOW_SECONDS - now
+        return 0.0
+
+    def admit(self, tokens: int) -> Tuple[Optional[float], Dict[str, str]]:
+        """(None or retry-after seconds, x-ratelimit-* headers) for a request of `tokens`"""
+        with self._lock:
+            now = time.monotonic()
+            self._purge(now)
+            retry_after = None
+            if (self.rpm and len(self._events) >= self.rpm) or \
+                    (self.tpm and self._tokens + tokens > self.tpm):
+                retry_after = self._reset_after(now, tokens)
+            else:
+                self._events.append((now, tokens))
+                self._tokens += tokens
+
+            # Both windows start freeing capacity when the oldest request expires
+            reset = _format_reset(self._events[0][0] + RATE_WINDOW_SECONDS - now if self._events else 0.0)
+            headers = {}
+            if self.rpm:
+                headers.update({
+                    'x-ratelimit-limit-requests': str(self.rpm),
+                    'x-ratelimit-remaining-requests': str(max(self.rpm - len(self._events), 0)),
+                    'x-ratelimit-reset-requests': reset,
+                })
+            if self.tpm:
+                headers.update({
+                    'x-ratelimit-limit-tokens': str(self.tpm),
+                    'x-ratelimit-remaining-tokens': str(max(self.tpm - self._tokens, 0)),
+                    'x-ratelimit-reset-tokens': reset,
+                })
+            return retry_after, headers
+
+
+# --- 2. SERVER ---
+
+class StubGroqServer:
+    """Threaded HTTP server speaking just enough of the chat-completions API"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, labeller: str = "model",
+                 latency: str = "0", error_rate: float = 0.0, error_status: int = 503,
+                 rate_limit_rate: float = 0.0, retry_after: float = 1.0,
+                 rpm: Optional[int] = None, tpm: Optional[int] = None, seed: Optional[int] = None,
+                 revoked_keys: Iterable[str] = (), token_latency: float = 0.0, trailing: int = 0):
+        self.label = make_labeller(labeller)
+        self.latency = LatencyModel(latency, seed)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.rpm, self.tpm = rpm, tpm
+        self.windows: Dict[str, RateWindow] = {}
+        self.revoked_keys = set(revoked_keys)
+        self.token_latency = token_latency / 1000.0
+        self.trailing = trailing
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.responses: Counter = Counter()
+        self.disconnects = 0
+
+        self._thread: Optional[threading.Thread] = None
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def output_tokens(self, body: Dict[str, Any]) -> List[str]:
+        """The generated tokens: the label, then --trailing filler, capped at max_tokens"""
+        label = self.label(extract_transcript(body.get('messages') or []))
+        tokens = [label] + [_TRAILING_TOKENS[i % len(_TRAILING_TOKENS)] for i in range(self.trailing)]
+        return tokens[:max(int(body.get('max_tokens') or len(tokens)), 1)]
+
+    def usage(self, body: Dict[str, Any], completion_tokens: int, model_seconds: float) -> Dict[str, Any]:
+        prompt_tokens = sum(estimate_tokens(m.get('content') or '') for m in body.get('messages') or [])
+        decode_seconds = completion_tokens * self.token_latency
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+            'queue_time': 0.0,
+            # Prompt processing dominates a one-token answer
+            'prompt_time': model_seconds * 0.9,
+            'completion_time': model_seconds * 0.1 + decode_seconds,
+            'total_time': model_seconds + decode_seconds,
+        }
+
+    def completion(self, body: Dict[str, Any], model_seconds: float = 0.0) -> Dict[str, Any]:
+        """The chat.completion object returned for one request body"""
+        tokens = self.output_tokens(body)
+        time.sleep(len(tokens) * self.token_latency)
+
+        return {
+            'id': f"chatcmpl-stub-{uuid.uuid4().hex[:12]}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': ''.join(tokens)},
+                'finish_reason': 'stop',
+                'logprobs': None,
+            }],
+            'usage': self.usage(body, len(tokens), model_seconds),
+        }
+
+    def completion_chunks(self, body: Dict[str, Any], model_seconds: float = 0.0) -> Iterator[Dict[str, Any]]:
+        """chat.completion.chunk objects for a streamed request, paced at token_latency"""
+        tokens = self.output_tokens(body)
+        base = {'id': f"chatcmpl-stub-{uuid.uuid4().hex[:12]}", 'object': 'chat.completion.chunk',
+                'created': int(time.time()), 'model': body.get('model', 'stub')}
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, **extra) -> Dict[str, Any]:
+            choice = {'index': 0, 'delta': delta, 'finish_reason': finish_reason, 'logprobs': None}
+            return {**base, 'choices': [choice], **extra}
+
+        yield chunk({'role': 'assistant', 'content': ''})
+        for token in tokens:
+            time.sleep(self.token_latency)
+            yield chunk({'content': token})
+        yield chunk({}, 'stop', x_groq={'id': base['id'], 'usage': self.usage(body, len(tokens), model_seconds)})
+
+    def window_for(self, api_key: str) -> Optional[RateWindow]:
+        """The RPM/TPM window of one API key (None when no limits are set)"""
+        if not (self.rpm or self.tpm):
+            return None
+        with self._lock:
+            if api_key not in self.windows:
+                self.windows[api_key] = RateWindow(self.rpm, self.tpm)
+            return self.windows[api_key]
+
+    def handle(self, body: Dict[str, Any], api_key: str = "") -> Tuple[int, Any, Dict[str, str]]:
+        """(status, payload, headers) for one chat-completions request, faults included.
+
+        A streamed request's payload is an iterator of chunks, generated as it is sent.
+        """
+        with self._lock:
+            roll = self._random.random()
+
+        if api_key in self.revoked_keys:
+            return 401, _error("Invalid API Key", "invalid_api_key"), {}
+
+        headers: Dict[str, str] = {}
+        window = self.window_for(api_key)
+        if window is not None:
+            tokens = sum(estimate_tokens(m.get('content') or '') for m in body.get('messages') or [])
+            tokens += int(body.get('max_tokens') or 0)
+            wait, headers = window.admit(tokens)
+            if wait is not None:
+                headers['retry-after'] = str(max(math.ceil(wait), 1))
+                return 429, _error("Rate limit reached (stub RPM/TPM window)", "rate_limit_exceeded"), headers
+
+        if roll < self.rate_limit_rate:
+            headers['retry-after'] = f"{self.retry_after:g}"
+            return 429, _error("Rate limit reached (injected)", "rate_limit_exceeded"), headers
+
+        model_seconds = self.latency.sample()
+        time.sleep(model_seconds)
+
+        if roll < self.rate_limit_rate + self.error_rate:
+            return self.error_status, _error("Upstream error (injected)", "internal_server_error"), headers
+        if body.get('stream'):
+            return 200, self.completion_chunks(body, model_seconds), headers
+        return 200, self.completion(body, model_seconds), headers
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                'responses': {str(status): count for status, count in sorted(self.responses.items())},
+                'client_disconnects': self.disconnects,
+                'latency': self.latency.spec,
+            }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+            def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                try:
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up on the request (timeouts, cancelled hedges)
+                    self.close_connection = True
+                    with server._lock:
+                        server.disconnects += 1
+
+            def _send_stream(self, chunks: Iterator[Dict[str, Any]], headers: Dict[str, str]):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                try:
+                    self.end_headers()
+                    for event in itertools.chain(map(json.dumps, chunks), ["[DONE]"]):
+                        data = f"data: {event}\n\n".encode('utf-8')
+                        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                        self.wfile.flush()
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client closed the stream early (label already known)
+                    self.close_connection = True
+                    with server._lock:
+                        server.disconnects += 1
+
+            def do_GET(self):
+                if self.path in ("/health", "/healthz"):
+                    self._send_json(200, {'status': 'ok'})
+                elif self.path == "/stats":
+                    self._send_json(200, server.stats())
+                else:
+                    self._send_json(404, _error("not found", "not_found"))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b''
+                if self.path.split('?')[0] not in COMPLETION_PATHS:
+                    self._send_json(404, _error(f"unknown path {self.path}", "not_found"))
+                    return
+                try:
+                    body = json.loads(raw or b'{}')
+                except ValueError:
+                    self._send_json(400, _error("invalid JSON body", "invalid_request_error"))
+                    return
+
+                with server._lock:
+                    server.requests += 1
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    api_key = (self.headers.get("Authorization") or "").removeprefix("Bearer ").strip()
+                    status, payload, headers = server.handle(body, api_key)
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+                with server._lock:
+                    server.responses[status] += 1
+                if isinstance(payload, dict):
+                    self._send_json(status, payload, headers)
+                else:
+                    self._send_stream(payload, headers)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubGroqServer":
+        """Serve from a daemon thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-groq", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve on the calling thread until interrupted"""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubGroqServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _error(message: str, error_type: str) -> Dict[str, Any]:
+    return {'error': {'message': message, 'type': error_type, 'code': error_type}}
+
+
+# --- 3. CLI ---
+
+def add_stub_arguments(parser: argparse.ArgumentParser, prefix: str = ""):
+    """Fault/latency flags shared by this CLI and the benchmark (--stub-* there)"""
+    parser.add_argument(f"--{prefix}labeller", default="model", help="model, hash, Hot, Cold or Dead")
+    parser.add_argument(f"--{prefix}latency", default="0",
+                        help="Model latency in ms: fixed:80, uniform:50,400, normal:200,50, "
+                             "lognormal:200,0.6 or exponential:150")
+    parser.add_argument(f"--{prefix}error-rate", type=float, default=0.0, help="Fraction answered with a 5xx")
+    parser.add_argument(f"--{prefix}error-status", type=int, default=503)
+    parser.add_argument(f"--{prefix}rate-limit-rate", type=float, default=0.0,
+                        help="Fraction answered with 429 + retry-after")
+    parser.add_argument(f"--{prefix}retry-after", type=float, default=1.0, help="retry-after seconds on injected 429s")
+    parser.add_argument(f"--{prefix}rpm", type=int, help="Requests-per-minute limit")
+    parser.add_argument(f"--{prefix}tpm", type=int, help="Tokens-per-minute limit")
+    parser.add_argument(f"--{prefix}seed", type=int, default=7, help="Seed for latency and fault sampling")
+    parser.add_argument(f"--{prefix}token-latency", type=float, default=0.0,
+                        help="Milliseconds per generated token (streamed one by one)")
+    parser.add_argument(f"--{prefix}trailing", type=int, default=0,
+                        help="Filler tokens the model adds after the label")
+    parser.add_argument(f"--{prefix}revoked-keys", default="", help="Comma-separated API keys answered with 401")
+
+
+def stub_from_args(args: argparse.Namespace, prefix: str = "", host: str = "127.0.0.1",
+                   port: int = 0) -> StubGroqServer:
+    """Build a StubGroqServer from flags added by add_stub_arguments"""
+    def get(name):
+        return getattr(args, prefix.replace("-", "_") + name)
+
+    return StubGroqServer(host, port, labeller=get("labeller"), latency=get("latency"),
+                          error_rate=get("error_rate"), error_status=get("error_status"),
+                          rate_limit_rate=get("rate_limit_rate"), retry_after=get("retry_after"),
+                          rpm=get("rpm"), tpm=get("tpm"), seed=get("seed"),
+                          revoked_keys=[key for key in get("revoked_keys").split(",") if key],
+                          token_latency=get("token_latency"), trailing=get("trailing"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Groq chat-completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = stub_from_args(args, host=args.host, port=args.port)
+    print("=" * 60)
+    print(f"Stub Groq API listening on {server.base_url}")
+    print(f"  latency: {args.latency}  errors: {args.error_rate:.0%}  429s: {args.rate_limit_rate:.0%}"
+          + (f"  rpm: {args.rpm}" if args.rpm else "") + (f"  tpm: {args.tpm}" if args.tpm else ""))
+    print(f"  export GROQ_BASE_URL={server.base_url} GROQ_API_KEY=stub")
+    print("=" * 60)
+    server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,14 @@
-import pdfplumber
+import argparse
 import json
 import os
 import re
 from collections import defaultdict
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
+
+from extract_pdf_data import ExtractionManifest, parse_pages
+
+# Bump when the analysis changes; every PDF is re-analyzed on the next run
+ANALYZER_VERSION = 1
 
 class AdvancedPDFAnalyzer:
     """Advanced PDF analyzer with table detection and structured data extraction"""
@@ -15,8 +20,10 @@ class AdvancedPDFAnalyzer:
         self.tables = []
         self.metadata = {}
         
-    def analyze(self) -> Dict[str, Any]:
-        """Perform comprehensive analysis of the PDF"""
+    def analyze(self, workers: int = 1) -> Dict[str, Any]:
+        """Perform comprehensive analysis of the PDF (long ones split over `workers` processes)"""
+        self.text_content = ""
+        self.tables = []
         print(f"\n{'='*60}")
         print(f"Analyzing: {self.filename}")
         print(f"{'='*60}")
@@ -36,40 +43,36 @@ class AdvancedPDFAnalyzer:
         }
         
         try:
-            with pdfplumber.open(self.pdf_path) as pdf:
-                analysis['pages'] = len(pdf.pages)
-                
-                # Process each page
-                for page_num, page in enumerate(pdf.pages, 1):
-                    print(f"Processing page {page_num}/{len(pdf.pages)}...")
-                    
-                    # Extract text
-                    page_text = page.extract_text() or ""
-                    self.text_content += page_text
-                    
-                    # Extract tables
-                    tables = page.extract_tables()
-                    if tables:
-                        for table_num, table in enumerate(tables, 1):
-                            print(f"  Found table {table_num} with {len(table)} rows")
-                            self.tables.append({
-                                'page': page_num,
-                                'data': table,
-                                'rows': len(table),
-                                'cols': len(table[0]) if table else 0
-                            })
-                
-                analysis['text_length'] = len(self.text_content)
-                analysis['tables_found'] = len(self.tables)
+            # Pages come back in page order even when parsed in parallel ranges
+            pages = parse_pages(self.pdf_path, workers)
+            analysis['pages'] = len(pages)
+            page_texts = []
+            
+            for page_num, page_text, tables in pages:
+                print(f"Processing page {page_num}/{len(pages)}...")
+                page_texts.append(page_text)
                 
-                # Analyze content
-                analysis['payment_plans'] = self._extract_payment_plans()
-                analysis['unit_details'] = self._extract_unit_details()
-                analysis['pricing_info'] = self._extract_pricing_info()
-                analysis['project_info'] = self._extract_project_info()
-                analysis['contact_info'] = self._extract_contact_info()
-                analysis['key_features'] = self._extract_key_features()
-                analysis['raw_tables'] = self._format_tables_for_display()
+                for table_num, table in enumerate(tables, 1):
+                    print(f"  Found table {table_num} with {len(table)} rows")
+                    self.tables.append({
+                        'page': page_num,
+                        'data': table,
+                        'rows': len(table),
+                        'cols': len(table[0]) if table else 0
+                    })
+            
+            self.text_content = "".join(page_texts)
+            analysis['text_length'] = len(self.text_content)
+            analysis['tables_found'] = len(self.tables)
+            
+            # Analyze content
+            analysis['payment_plans'] = self._extract_payment_plans()
+            analysis['unit_details'] = self._extract_unit_details()
+            analysis['pricing_info'] = self._extract_pricing_info()
+            analysis['project_info'] = self._extract_project_info()
+            analysis['contact_info'] = self._extract_contact_info()
+            analysis['key_features'] = self._extract_key_features()
+            analysis['raw_tables'] = self._format_tables_for_display()
                 
         except Exception as e:
             print(f"Error analyzing PDF: {str(e)}")
@@ -240,8 +243,9 @@ class AdvancedPDFAnalyzer:
             'BURJ QUAID'
         ]
         
+        upper_text = self.text_content.upper()
         for pattern in name_patterns:
-            if pattern in self.text_content.upper():
+            if pattern in upper_text:
                 info['name'] = pattern.title()
                 break
         
@@ -249,9 +253,9 @@ class AdvancedPDFAnalyzer:
             info['name'] = self.filename.replace('.pdf', '').replace('_', ' ')
         
         # Determine type
-        if 'COMMERCIAL' in self.text_content.upper():
+        if 'COMMERCIAL' in upper_text:
             info['type'] = 'Commercial'
-        elif 'RESIDENTIAL' in self.text_content.upper():
+        elif 'RESIDENTIAL' in upper_text:
             info['type'] = 'Residential'
         else:
             info['type'] = 'Mixed-Use'
@@ -344,11 +348,12 @@ class AdvancedPDFAnalyzer:
         
         return formatted
     
-    def save_analysis(self, output_dir: str):
-        """Save analysis results to JSON"""
+    def save_analysis(self, output_dir: str, analysis: Optional[Dict[str, Any]] = None):
+        """Save analysis results to JSON (analyzing the PDF first unless given the analysis)"""
         os.makedirs(output_dir, exist_ok=True)
         
-        analysis = self.analyze()
+        if analysis is None:
+            analysis = self.analyze()
         
         output_file = os.path.join(
             output_dir,
@@ -362,9 +367,22 @@ class AdvancedPDFAnalyzer:
         return output_file
 
 
-def analyze_all_pdfs(pdf_directory: str, output_directory: str):
-    """Analyze all PDFs in a directory"""
-    pdf_files = [f for f in os.listdir(pdf_directory) if f.endswith('.pdf')]
+def _load_analysis(output_directory: str, output: Optional[str]) -> Optional[Dict[str, Any]]:
+    if output is None:
+        return None
+    try:
+        with open(os.path.join(output_directory, output), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def analyze_all_pdfs(pdf_directory: str, output_directory: str, page_workers: int = 1, force: bool = False):
+    """Analyze all PDFs in a directory, reusing the saved analysis of PDFs unchanged since the last run"""
+    pdf_files = sorted(f for f in os.listdir(pdf_directory) if f.endswith('.pdf'))
+    manifest = ExtractionManifest(output_directory, ANALYZER_VERSION, filename='analysis_manifest.json')
+    if force:
+        manifest.entries.clear()
     
     print(f"\n{'='*60}")
     print(f"Advanced PDF Analysis")
@@ -375,18 +393,37 @@ def analyze_all_pdfs(pdf_directory: str, output_directory: str):
     
     for pdf_file in pdf_files:
         pdf_path = os.path.join(pdf_directory, pdf_file)
+        fingerprint = manifest.fingerprint(pdf_path)
+        analysis = _load_analysis(output_directory, manifest.unchanged_output(pdf_file, fingerprint))
+        if analysis is not None:
+            print(f"✓ {pdf_file} unchanged, reusing its analysis")
+            all_analyses.append(analysis)
+            continue
+        
         analyzer = AdvancedPDFAnalyzer(pdf_path)
-        analysis = analyzer.analyze()
+        analysis = analyzer.analyze(page_workers)
         all_analyses.append(analysis)
         
         # Save individual analysis
-        analyzer.save_analysis(output_directory)
+        output_file = analyzer.save_analysis(output_directory, analysis)
+        if 'error' in analysis:
+            manifest.entries.pop(pdf_file, None)
+        else:
+            manifest.record(pdf_file, fingerprint, os.path.basename(output_file))
+    
+    for entry in manifest.prune(pdf_files):
+        print(f"✓ Dropping {entry['file']} (no longer in {pdf_directory})")
+        output_path = os.path.join(output_directory, entry['output'])
+        if os.path.exists(output_path):
+            os.remove(output_path)
     
     # Save combined summary
     summary_file = os.path.join(output_directory, 'all_analyses_summary.json')
     with open(summary_file, 'w', encoding='utf-8') as f:
         json.dump(all_analyses, f, indent=2, ensure_ascii=False)
     
+    manifest.save()
+    
     print(f"\n✓ All analyses saved to: {output_directory}")
     print(f"✓ Combined summary: {summary_file}")
 
@@ -395,8 +432,15 @@ if __name__ == "__main__":
     PDF_DIRECTORY = "../public/projectFiles"
     OUTPUT_DIRECTORY = "../src/data/extracted/analysis"
     
+    parser = argparse.ArgumentParser(description="Analyze project brochures in depth")
+    parser.add_argument("--page-workers", type=int, default=1,
+                        help="Split long PDFs into page ranges parsed by this many processes")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-analyze every PDF, even those unchanged since the last run")
+    args = parser.parse_args()
+    
     if os.path.exists(PDF_DIRECTORY):
-        analyze_all_pdfs(PDF_DIRECTORY, OUTPUT_DIRECTORY)
+        analyze_all_pdfs(PDF_DIRECTORY, OUTPUT_DIRECTORY, args.page_workers, args.force)
     else:
         print(f"Error: PDF directory not found at {PDF_DIRECTORY}")
 
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the text/table parsers of extract_pdf_data.py.
+
+Builds a large synthetic brochure (prices, percentages, bed counts, areas,
+installment counts, filler prose and schedule/unit tables) and times each
+parser on it, so parser changes can be measured without any PDFs:
+
+    python benchmark_parsers.py --pages 500 -o before.json
+    python benchmark_parsers.py --pages 500 --compare before.json
+    python benchmark_parsers.py --extractor /path/to/old/extract_pdf_data.py
+
+Reading the numbers for the token scanner (500 pages, against the regex
+parsers it replaced): all_parsers went from about 300 to 130 ms, and nearly
+all of that is extract_unit_types (about 140 -> 15 ms), which no longer runs
+text-wide regexes whose results it never used. On its own,
+extract_price_info is about even and extract_payment_plan about 20% slower:
+each pays for a full typed scan of the text, which process_pdf runs once for
+both of them.
+"""
+
+import argparse
+import gc
+import importlib.util
+import inspect
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+_FILLER = ("Located in the heart of Lahore, the project offers modern living with world class "
+           "amenities, 24/7 security and easy access to Main Boulevard. ").split()
+_LINES = [
+    "Price: Rs. {price:,}",
+    "Total PKR {price:,} for a {beds} Bed apartment of {area:,} sq ft",
+    "Book now with {pct}% down payment and {months} monthly installments",
+    "{pct}% advance, balance in {quarters} quarterly installments",
+    "Plot size {marla} Marla, amount {price:,}",
+]
+
+Table = List[List[str]]
+
+
+def synthetic_brochure(pages: int, seed: int = 7) -> Tuple[str, List[Table]]:
+    """Deterministic brochure-like text (~40 lines per page) and two tables per page"""
+    rng = random.Random(seed)
+    lines, tables = [], []
+    for _ in range(pages):
+        for _ in range(40):
+            if rng.random() < 0.3:
+                lines.append(rng.choice(_LINES).format(
+                    price=rng.randrange(2_000_000, 90_000_000, 50_000), beds=rng.randint(1, 5),
+                    area=rng.randrange(450, 4000, 25), pct=rng.choice([10, 15, 20, 25, 30]),
+                    months=rng.choice([24, 36, 48, 60]), quarters=rng.choice([8, 12, 16]),
+                    marla=rng.choice([3, 5, 10])))
+            else:
+                lines.append(" ".join(rng.choice(_FILLER) for _ in range(12)))
+        tables.append([["Installment", "Percentage", "Amount"]]
+                      + [[f"{i}", f"{rng.choice([5, 10])}%", f"Rs. {rng.randrange(100_000, 5_000_000, 1_000):,}"]
+                         for i in range(1, 13)])
+        tables.append([["Unit Type", "Area", "Price"]]
+                      + [[f"{beds} Bed Apartment", f"{rng.randrange(450, 4000, 25):,} sq ft",
+                          f"{rng.randrange(5_000_000, 90_000_000, 50_000):,}"] for beds in range(1, 6)])
+    return "\n".join(lines), tables
+
+
+def load_extractor(path: str):
+    """Import an extract_pdf_data.py (this tree's or another checkout's) as a module"""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(path)))
+    spec = importlib.util.spec_from_file_location("benchmarked_extractor", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _time(fn: Callable[[], Any], runs: int, reset: Callable[[], None]) -> Dict[str, float]:
+    timings = []
+    for _ in range(runs):
+        reset()  # every run starts cold: no scanned strings carried over
+        # As timeit does: keep collector pauses out of the measurement
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        finally:
+            gc.enable()
+    return {'median': round(statistics.median(timings), 5), 'min': round(min(timings), 5)}
+
+
+def _all_parsers(extractor, scanner, text: str, tables: List[Table]):
+    if 'text_tokens' not in inspect.signature(extractor.extract_price_info).parameters:
+        return [extractor.parse_project_name("Sample Project.pdf", text), extractor.extract_price_info(text, tables),
+                extractor.extract_payment_plan(text, tables), extractor.extract_unit_types(text, tables)]
+    text_tokens = scanner.scan(text)
+    return [extractor.parse_project_name("Sample Project.pdf", text),
+            extractor.extract_price_info(text, tables, text_tokens),
+            extractor.extract_payment_plan(text, tables, text_tokens),
+            extractor.extract_unit_types(text, tables)]
+
+
+def run_benchmark(extractor_path: str, pages: int, runs: int) -> Dict[str, Any]:
+    module = load_extractor(extractor_path)
+    with tempfile.TemporaryDirectory(prefix="pdf-parsers-") as output_directory:
+        extractor = module.PDFDataExtractor(HERE, output_directory)
+    text, tables = synthetic_brochure(pages)
+    # Older extractors have no token scanner (or cache the text too) - clear whatever cache there is
+    scanner = sys.modules.get('token_scanner')
+    cached_scan = getattr(scanner, 'scan_cell', None) or getattr(scanner, 'scan', None)
+    reset = getattr(cached_scan, 'cache_clear', lambda: None)
+
+    parsers = {
+        'parse_project_name': lambda: extractor.parse_project_name("Sample Project.pdf", text),
+        'extract_price_info': lambda: extractor.extract_price_info(text, tables),
+        'extract_payment_plan': lambda: extractor.extract_payment_plan(text, tables),
+        'extract_unit_types': lambda: extractor.extract_unit_types(text, tables),
+    }
+    results = {name: _time(fn, runs, reset) for name, fn in parsers.items()}
+    # All parsers on one document, as process_pdf runs them: the text scanned once, cells shared
+    results['all_parsers'] = _time(lambda: _all_parsers(extractor, scanner, text, tables), runs, reset)
+    return {'text_chars': len(text), 'table_cells': sum(len(row) for table in tables for row in table),
+            'timings': results}
+
+
+def print_report(report: Dict[str, Any]):
+    results = report['results']
+    print("=" * 60)
+    print(f"Parsers: {report['config']['extractor']}")
+    print(f"  {report['config']['pages']} pages, {results['text_chars']:,} chars, "
+          f"{results['table_cells']:,} table cells, {report['config']['runs']} runs")
+    print("=" * 60)
+    for name, stats in results['timings'].items():
+        print(f"  {name:<22} {stats['median'] * 1000:9.1f} ms  (min {stats['min'] * 1000:.1f})")
+
+
+def compare_reports(old: Dict[str, Any], new: Dict[str, Any]):
+    print(f"{'median':<24}{'old':>11}{'new':>11}{'speedup':>10}")
+    for name, stats in new['results']['timings'].items():
+        before = old['results']['timings'].get(name, {}).get('median')
+        after = stats['median']
+        if before is None:
+            continue
+        speedup = f"{before / after:.1f}x" if after else "-"
+        print(f"{name:<24}{before * 1000:>9.1f}ms{after * 1000:>9.1f}ms{speedup:>10}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Time the brochure parsers on large synthetic text")
+    parser.add_argument("--pages", type=int, default=500, help="Synthetic brochure size")
+    parser.add_argument("--runs", type=int, default=7, help="Timed runs per parser")
+    parser.add_argument("--extractor", default=os.path.join(HERE, "extract_pdf_data.py"),
+                        help="extract_pdf_data.py to benchmark (e.g. from an older checkout)")
+    parser.add_argument("--compare", metavar="OLD_REPORT", help="Print the change against an earlier report")
+    parser.add_argument("-o", "--output", help="Save the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = {
+        'config': {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'extractor': os.path.abspath(args.extractor),
+            'pages': args.pages,
+            'runs': args.runs,
+            'python': sys.version.split()[0],
+        },
+        'results': run_benchmark(args.extractor, args.pages, args.runs),
+    }
+    print_report(report)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print()
+            compare_reports(json.load(f), report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Report saved to: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
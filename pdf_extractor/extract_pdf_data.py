@@ -1,75 +1,272 @@
 import pdfplumber
+import argparse
+import hashlib
 import json
+import multiprocessing
 import os
 import re
+import time
 from datetime import datetime
-from typing import Dict, List, Any
+from importlib.metadata import version as package_version
+from multiprocessing.connection import wait
+from typing import Dict, Iterator, List, Any, Optional, Sequence, Set, Tuple
+
+from token_scanner import (AREA, BEDROOMS, CURRENCY, INSTALLMENTS, NUMBER, PERCENT, Token,
+                           first, scan, scan_cell, values)
+
+# Parallel extraction: worker processes (default: one per CPU) and the most
+# seconds one PDF may take before its worker is killed
+DEFAULT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "0")) or os.cpu_count() or 1
+DEFAULT_FILE_TIMEOUT = float(os.getenv("PDF_EXTRACT_TIMEOUT", "300"))
+# Page-level parallelism: a document is split into ranges of at least this many pages
+MIN_PAGES_PER_RANGE = int(os.getenv("PDF_MIN_PAGES_PER_RANGE", "8"))
+
+# Bump when a parser changes what it extracts; every PDF is re-extracted on the next run
+EXTRACTOR_VERSION = 2
+MANIFEST_FILENAME = 'extraction_manifest.json'
+
+PageResult = Tuple[int, str, List[List[List[str]]]]
+
+
+def iter_pdf_pages(pdf_path: str, first_page: int = 1, last_page: Optional[int] = None) -> Iterator[PageResult]:
+    """Open a PDF once and yield (page_number, text, tables) for each page.
+
+    Text and tables come from the same parsed page, and the page's layout
+    cache is released before moving on, so memory stays flat on long brochures.
+    first_page/last_page (1-based, inclusive) limit the walk to a page range.
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_number, page in enumerate(pdf.pages[first_page - 1:last_page], first_page):
+            try:
+                yield page_number, page.extract_text() or "", page.extract_tables() or []
+            finally:
+                page.close()
+
+
+def count_pages(pdf_path: str) -> int:
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def count_pages_within(pdf_paths: List[str], workers: int, timeout: float) -> Dict[str, Optional[int]]:
+    """Page count of each PDF, counted in up to `workers` child processes.
+
+    A PDF that cannot be opened, or whose count is not back within `timeout`
+    seconds, maps to None; counts still running then are killed.
+    """
+    if not pdf_paths:
+        return {}
+    counts: Dict[str, Optional[int]] = {}
+    with multiprocessing.Pool(max(1, min(workers, len(pdf_paths)))) as pool:
+        pending = [(pdf_path, pool.apply_async(count_pages, (pdf_path,))) for pdf_path in pdf_paths]
+        deadline = time.monotonic() + timeout
+        for pdf_path, result in pending:
+            try:
+                counts[pdf_path] = result.get(max(deadline - time.monotonic(), 0))
+            except Exception:
+                counts[pdf_path] = None
+    return counts
+
+
+def page_ranges(page_count: int, workers: int, min_pages: int = MIN_PAGES_PER_RANGE) -> List[Tuple[int, int]]:
+    """Split pages 1..page_count into (first, last) ranges - about two per worker, none below min_pages"""
+    size = max(min_pages, -(-page_count // (workers * 2)))
+    return [(first, min(first + size - 1, page_count)) for first in range(1, page_count + 1, size)]
+
+
+def _parse_page_range(args: Tuple[str, int, int]) -> List[PageResult]:
+    pdf_path, first_page, last_page = args
+    return list(iter_pdf_pages(pdf_path, first_page, last_page))
+
+
+def parse_pages(pdf_path: str, workers: int = 1, timeout: Optional[float] = None,
+                page_count: Optional[int] = None) -> List[PageResult]:
+    """Every page of a PDF in page order.
+
+    With workers > 1 a long document is split into page ranges that worker
+    processes parse side by side; the results are stitched back in page order.
+    A split parse still running after `timeout` seconds raises TimeoutError
+    and its workers are killed. Pass `page_count` if it is already known.
+    """
+    if workers > 1 and page_count is None:
+        page_count = count_pages(pdf_path)
+    ranges = page_ranges(page_count, workers) if workers > 1 and page_count else []
+    if len(ranges) < 2:
+        return list(iter_pdf_pages(pdf_path))
+
+    # A Pool rather than a ProcessPoolExecutor: leaving the block terminates its workers mid-page
+    with multiprocessing.Pool(min(workers, len(ranges))) as pool:
+        # map_async() returns the ranges in submission order, so pages come back in order
+        chunks = pool.map_async(_parse_page_range, [(pdf_path, first, last) for first, last in ranges])
+        try:
+            return [page for chunk in chunks.get(timeout) for page in chunk]
+        except multiprocessing.TimeoutError:
+            raise TimeoutError(f"timed out after {timeout:g}s") from None
+
+
+class ParsedDocument:
+    """Text and tables of one PDF, parsed in a single pass (split over `workers` processes if long).
+
+    A PDF that cannot be parsed raises, so the caller records it as failed
+    instead of extracting an empty project from it.
+    """
+
+    def __init__(self, pdf_path: str, workers: int = 1, timeout: Optional[float] = None,
+                 page_count: Optional[int] = None):
+        self.pdf_path = pdf_path
+        self.page_count = 0
+        self.tables: List[List[List[str]]] = []
+        self.page_texts: List[str] = []
+
+        for page_number, page_text, page_tables in parse_pages(pdf_path, workers, timeout, page_count):
+            self.page_count = page_number
+            self.page_texts.append(page_text)
+            self.tables.extend(page_tables)
+
+        # Pages are joined as they always were (no separator)
+        self.text = "".join(self.page_texts)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionManifest:
+    """Size, mtime and content hash of each source PDF behind an output directory.
+
+    A PDF whose content hash matches its entry (and was extracted by the same
+    extractor and pdfplumber version) is unchanged, and its recorded output
+    can be reused instead of parsing it again. The hash is only recomputed
+    when the size or mtime differ from the entry.
+    """
+
+    def __init__(self, output_directory: str, extractor_version: int = EXTRACTOR_VERSION,
+                 filename: str = MANIFEST_FILENAME):
+        self.path = os.path.join(output_directory, filename)
+        self.versions = {'extractor_version': extractor_version, 'pdfplumber': package_version('pdfplumber')}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                stored = json.load(f)
+            # Outputs of another extractor or pdfplumber version are all stale
+            if all(stored.get(key) == value for key, value in self.versions.items()):
+                self.entries = stored.get('files', {})
+        except (OSError, ValueError):
+            pass
+
+    def fingerprint(self, pdf_path: str) -> Dict[str, Any]:
+        stat = os.stat(pdf_path)
+        entry = self.entries.get(os.path.basename(pdf_path))
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            sha256 = entry['sha256']
+        else:
+            sha256 = file_sha256(pdf_path)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': sha256}
+
+    def unchanged_output(self, filename: str, fingerprint: Dict[str, Any]) -> Optional[str]:
+        """The output recorded for an unchanged file, or None if it must be processed again"""
+        entry = self.entries.get(filename)
+        if entry and entry['sha256'] == fingerprint['sha256']:
+            return entry['output']
+        return None
+
+    def record(self, filename: str, fingerprint: Dict[str, Any], output: str):
+        self.entries[filename] = {**fingerprint, 'output': output}
+
+    def prune(self, filenames: List[str]) -> List[Dict[str, Any]]:
+        """Drop (and return) the entries of files that are no longer in `filenames`"""
+        keep = set(filenames)
+        removed = [name for name in self.entries if name not in keep]
+        return [dict(self.entries.pop(name), file=name) for name in removed]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({**self.versions, 'files': self.entries}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def _process_pdf_worker(pdf_directory: str, output_directory: str, pdf_path: str, conn):
+    """Child-process entry point: send back ('ok', project_data) or ('error', message)"""
+    try:
+        extractor = PDFDataExtractor(pdf_directory, output_directory)
+        conn.send(('ok', extractor.process_pdf(pdf_path)))
+    except Exception as e:
+        conn.send(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
 
 class PDFDataExtractor:
-    def __init__(self, pdf_directory: str, output_directory: str):
+    def __init__(self, pdf_directory: str, output_directory: str, page_workers: int = 1):
         self.pdf_directory = pdf_directory
         self.output_directory = output_directory
+        # Processes one long PDF may be split across (see parse_pages)
+        self.page_workers = page_workers
+        # Set by process_all_pdfs: what was parsed last time, and what this run reused or dropped
+        self.manifest: Optional[ExtractionManifest] = None
+        self.reused_files: List[str] = []
+        self.removed_files: List[str] = []
+        self._removed_outputs: List[str] = []
+        # Page counts taken while deciding which documents to split, so parse_pages needn't recount
+        self._page_counts: Dict[str, int] = {}
         self.extracted_data = {
             'properties': [],
             'payment_plans': [],
             'offers': [],
             'projects': []
         }
+        self.failed_files: List[Dict[str, str]] = []
         
         # Create output directory if it doesn't exist
         os.makedirs(output_directory, exist_ok=True)
     
+    def parse_pdf(self, pdf_path: str, timeout: Optional[float] = None) -> ParsedDocument:
+        """Parse a PDF once - text and tables from a single walk over its pages"""
+        return ParsedDocument(pdf_path, self.page_workers, timeout, self._page_counts.get(pdf_path))
+    
     def extract_text_from_pdf(self, pdf_path: str) -> str:
         """Extract all text from a PDF file"""
-        text = ""
-        try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    text += page.extract_text() or ""
-        except Exception as e:
-            print(f"Error extracting text from {pdf_path}: {str(e)}")
-        return text
+        return self.parse_pdf(pdf_path).text
     
     def extract_tables_from_pdf(self, pdf_path: str) -> List[List[List[str]]]:
         """Extract all tables from a PDF file"""
-        all_tables = []
-        try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    tables = page.extract_tables()
-                    if tables:
-                        all_tables.extend(tables)
-        except Exception as e:
-            print(f"Error extracting tables from {pdf_path}: {str(e)}")
-        return all_tables
+        return self.parse_pdf(pdf_path).tables
     
-    def parse_project_name(self, filename: str, text: str) -> str:
-        """Extract project name from filename or text"""
+    def parse_project_name(self, filename: str, text: str, upper_text: Optional[str] = None) -> str:
+        """Extract project name from filename or text (upper_text: text.upper(), if already computed)"""
         # Remove file extension and clean up
         name = filename.replace('.pdf', '').replace('_', ' ').strip()
+        upper_name = name.upper()
         
         # Try to extract project name from common patterns
-        if 'PEARL ONE CAPITAL' in name.upper() or 'PEARL ONE CAPITAL' in text.upper():
-            if 'COMMERCIAL' in name.upper():
+        if 'PEARL ONE CAPITAL' in upper_name or 'PEARL ONE CAPITAL' in (upper_text or text.upper()):
+            if 'COMMERCIAL' in upper_name:
                 return 'Pearl One Capital - Commercial'
-            elif 'RESIDENTIAL' in name.upper():
+            elif 'RESIDENTIAL' in upper_name:
                 return 'Pearl One Capital - Residential'
             return 'Pearl One Capital'
-        elif 'PEARL ONE COURTYARD' in name.upper() or 'POC' in name.upper():
+        elif 'PEARL ONE COURTYARD' in upper_name or 'POC' in upper_name:
             return 'Pearl One Courtyard'
-        elif 'PEARL ONE PREMIUM' in name.upper():
+        elif 'PEARL ONE PREMIUM' in upper_name:
             return 'Pearl One Premium'
-        elif 'ABS MALL' in name.upper():
-            if 'RESIDENCY' in name.upper():
+        elif 'ABS MALL' in upper_name:
+            if 'RESIDENCY' in upper_name:
                 return 'ABS Mall & Residency'
             return 'ABS Mall'
-        elif 'BURJ QUAID' in name.upper():
+        elif 'BURJ QUAID' in upper_name:
             return 'Burj Quaid'
         
         return name
     
-    def extract_price_info(self, text: str, tables: List[List[List[str]]]) -> Dict[str, Any]:
-        """Extract pricing information from text and tables"""
+    def extract_price_info(self, text: str, tables: List[List[List[str]]],
+                           text_tokens: Optional[Sequence[Token]] = None) -> Dict[str, Any]:
+        """Extract pricing information from text and tables (text_tokens: scan(text), if already computed)"""
         prices = {
             'min_price': None,
             'max_price': None,
@@ -77,24 +274,12 @@ class PDFDataExtractor:
             'payment_terms': []
         }
         
-        # Extract prices from text using regex
-        # Look for patterns like "Rs. 1,234,567" or "PKR 1,234,567"
-        price_patterns = [
-            r'Rs\.?\s*([\d,]+)',
-            r'PKR\s*([\d,]+)',
-            r'(?:Price|Total|Amount)[:\s]+([\d,]+)',
-        ]
+        if text_tokens is None:
+            text_tokens = scan(text)
         
-        found_prices = []
-        for pattern in price_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                try:
-                    price = int(match.replace(',', ''))
-                    if price > 100000:  # Filter out small numbers
-                        found_prices.append(price)
-                except ValueError:
-                    continue
+        # Amounts like "Rs. 1,234,567", "PKR 1,234,567" or "Price: 1,234,567"
+        found_prices = [price for price in values(text_tokens, CURRENCY)
+                        if price > 100000]  # Filter out small numbers
         
         if found_prices:
             prices['min_price'] = min(found_prices)
@@ -108,19 +293,14 @@ class PDFDataExtractor:
                         for cell in row:
                             if cell and isinstance(cell, str):
                                 # Look for price-like values
-                                matches = re.findall(r'([\d,]+)', cell)
-                                for match in matches:
-                                    try:
-                                        price = int(match.replace(',', ''))
-                                        if 1000000 <= price <= 100000000:
-                                            prices['unit_prices'].append(price)
-                                    except ValueError:
-                                        continue
+                                prices['unit_prices'].extend(price for price in values(scan_cell(cell), NUMBER)
+                                                             if 1000000 <= price <= 100000000)
         
         return prices
     
-    def extract_payment_plan(self, text: str, tables: List[List[List[str]]]) -> Dict[str, Any]:
-        """Extract payment plan details"""
+    def extract_payment_plan(self, text: str, tables: List[List[List[str]]],
+                             text_tokens: Optional[Sequence[Token]] = None) -> Dict[str, Any]:
+        """Extract payment plan details (text_tokens: scan(text), if already computed)"""
         payment_plan = {
             'down_payment': None,
             'installments': [],
@@ -129,18 +309,18 @@ class PDFDataExtractor:
             'quarterly_amount': None
         }
         
+        if text_tokens is None:
+            text_tokens = scan(text)
+        
         # Look for down payment percentage
-        down_payment_match = re.search(r'(\d+)%\s*(?:down|advance|booking)', text, re.IGNORECASE)
-        if down_payment_match:
-            payment_plan['down_payment'] = int(down_payment_match.group(1))
+        down_payment = first(text_tokens, PERCENT, labels=('down', 'advance', 'booking'))
+        if down_payment:
+            payment_plan['down_payment'] = down_payment.value
         
-        # Look for installment information
-        installment_matches = re.findall(r'(\d+)\s*(?:monthly|quarterly|installments?)', text, re.IGNORECASE)
-        for match in installment_matches:
-            try:
-                payment_plan['duration_months'] = int(match)
-            except ValueError:
-                continue
+        # Look for installment information (the last count mentioned wins)
+        installment_counts = values(text_tokens, INSTALLMENTS)
+        if installment_counts:
+            payment_plan['duration_months'] = installment_counts[-1]
         
         # Extract payment schedule from tables
         for table in tables:
@@ -158,20 +338,17 @@ class PDFDataExtractor:
                             
                             for cell in row:
                                 if cell:
+                                    cell_tokens = scan_cell(str(cell))
+                                    
                                     # Try to extract amount
-                                    amount_match = re.search(r'([\d,]+)', str(cell))
-                                    if amount_match:
-                                        try:
-                                            amount = int(amount_match.group(1).replace(',', ''))
-                                            if amount > 10000:
-                                                installment['amount'] = amount
-                                        except ValueError:
-                                            pass
+                                    amount = first(cell_tokens, NUMBER)
+                                    if amount and amount.value > 10000:
+                                        installment['amount'] = amount.value
                                     
                                     # Try to extract percentage
-                                    percent_match = re.search(r'(\d+)%', str(cell))
-                                    if percent_match:
-                                        installment['percentage'] = int(percent_match.group(1))
+                                    percentage = first(cell_tokens, PERCENT)
+                                    if percentage:
+                                        installment['percentage'] = percentage.value
                             
                             if installment['amount'] or installment['percentage']:
                                 payment_plan['installments'].append(installment)
@@ -182,22 +359,6 @@ class PDFDataExtractor:
         """Extract different unit types and their details"""
         unit_types = []
         
-        # Common unit type patterns
-        unit_patterns = [
-            r'(\d+)\s*(?:BED|BEDROOM|BR)',
-            r'STUDIO',
-            r'APARTMENT',
-            r'SHOP',
-            r'OFFICE',
-            r'COMMERCIAL',
-            r'PENTHOUSE'
-        ]
-        
-        found_units = set()
-        for pattern in unit_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            found_units.update(matches)
-        
         # Extract unit details from tables
         for table in tables:
             if table and len(table) > 1:
@@ -216,26 +377,23 @@ class PDFDataExtractor:
                             
                             for i, cell in enumerate(row):
                                 if cell and isinstance(cell, str):
+                                    cell_tokens = scan_cell(cell)
+                                    
                                     # Check for bedroom count
-                                    bed_match = re.search(r'(\d+)\s*(?:BED|BR)', cell, re.IGNORECASE)
-                                    if bed_match:
-                                        unit['bedrooms'] = int(bed_match.group(1))
+                                    bedrooms = first(cell_tokens, BEDROOMS)
+                                    if bedrooms:
+                                        unit['bedrooms'] = bedrooms.value
                                         unit['type'] = cell.strip()
                                     
                                     # Check for area
-                                    area_match = re.search(r'(\d+(?:,\d+)?)\s*(?:sq\.?\s*ft|sqft|marla)', cell, re.IGNORECASE)
-                                    if area_match:
-                                        unit['area'] = area_match.group(1).replace(',', '')
+                                    area = first(cell_tokens, AREA)
+                                    if area:
+                                        unit['area'] = area.digits
                                     
                                     # Check for price
-                                    price_match = re.search(r'([\d,]+)', cell)
-                                    if price_match:
-                                        try:
-                                            price = int(price_match.group(1).replace(',', ''))
-                                            if price > 1000000:
-                                                unit['price'] = price
-                                        except ValueError:
-                                            pass
+                                    price = first(cell_tokens, NUMBER)
+                                    if price and price.value > 1000000:
+                                        unit['price'] = price.value
                             
                             if any(unit.values()):
                                 unit_types.append(unit)
@@ -282,28 +440,30 @@ class PDFDataExtractor:
         
         return 'Lahore, Pakistan'
     
-    def process_pdf(self, pdf_path: str) -> Dict[str, Any]:
-        """Process a single PDF file and extract all relevant information"""
+    def process_pdf(self, pdf_path: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Process a single PDF file and extract all relevant information (timeout: see parse_pages)"""
         filename = os.path.basename(pdf_path)
         print(f"\nProcessing: {filename}")
         
-        # Extract text and tables
-        text = self.extract_text_from_pdf(pdf_path)
-        tables = self.extract_tables_from_pdf(pdf_path)
+        # Extract text and tables in one pass; every parser below reads this document
+        document = self.parse_pdf(pdf_path, timeout)
+        text, tables = document.text, document.tables
         
         # Parse all information
-        project_name = self.parse_project_name(filename, text)
-        price_info = self.extract_price_info(text, tables)
-        payment_plan = self.extract_payment_plan(text, tables)
+        upper_text = text.upper()
+        text_tokens = scan(text)
+        project_name = self.parse_project_name(filename, text, upper_text)
+        price_info = self.extract_price_info(text, tables, text_tokens)
+        payment_plan = self.extract_payment_plan(text, tables, text_tokens)
         unit_types = self.extract_unit_types(text, tables)
         amenities = self.extract_amenities(text)
         location = self.extract_location(text)
         
         # Determine project type
         project_type = 'residential'
-        if 'COMMERCIAL' in filename.upper() or 'MALL' in filename.upper() or 'SHOP' in text.upper():
+        if 'COMMERCIAL' in filename.upper() or 'MALL' in filename.upper() or 'SHOP' in upper_text:
             project_type = 'commercial'
-        elif 'MIXED' in text.upper():
+        elif 'MIXED' in upper_text:
             project_type = 'mixed-use'
         
         # Create structured data
@@ -330,18 +490,171 @@ class PDFDataExtractor:
         
         return project_data
     
-    def process_all_pdfs(self):
-        """Process all PDF files in the directory"""
-        pdf_files = [f for f in os.listdir(self.pdf_directory) if f.endswith('.pdf')]
-        
-        print(f"Found {len(pdf_files)} PDF files to process")
-        
-        for pdf_file in pdf_files:
-            pdf_path = os.path.join(self.pdf_directory, pdf_file)
-            project_data = self.process_pdf(pdf_path)
-            self.extracted_data['projects'].append(project_data)
-        
-        print(f"\n✓ Processed {len(pdf_files)} PDF files successfully")
+    def process_all_pdfs(self, workers: int = 1, timeout: float = DEFAULT_FILE_TIMEOUT, force: bool = False):
+        """Process all PDF files in the directory.
+
+        PDFs unchanged since the last run (per the manifest in the output
+        directory) reuse their saved project JSON; force=True parses them all.
+        With workers > 1 each file is parsed in its own worker process (at most
+        `workers` at a time) and killed after `timeout` seconds; a file that
+        times out or crashes is recorded in self.failed_files and skipped.
+        With page_workers > 1, documents long enough to split are parsed first,
+        one at a time, each across page_workers processes under the same timeout;
+        the `workers` pool only starts once they are done.
+        Projects are always stored in filename order.
+        """
+        pdf_files = sorted(f for f in os.listdir(self.pdf_directory) if f.endswith('.pdf'))
+        pdf_paths = [os.path.join(self.pdf_directory, f) for f in pdf_files]
+        
+        self.manifest = ExtractionManifest(self.output_directory)
+        if force:
+            self.manifest.entries.clear()
+        results: List[Tuple[Optional[Dict[str, Any]], Optional[str]]] = [(None, "not processed")] * len(pdf_paths)
+        fingerprints: Dict[str, Dict[str, Any]] = {}
+        stale = []
+        for index, (pdf_file, pdf_path) in enumerate(zip(pdf_files, pdf_paths)):
+            try:
+                fingerprints[pdf_file] = self.manifest.fingerprint(pdf_path)
+            except OSError:
+                stale.append(index)
+                continue
+            project_data = self._load_project(self.manifest.unchanged_output(pdf_file, fingerprints[pdf_file]))
+            if project_data is not None:
+                results[index] = (project_data, None)
+                self.reused_files.append(pdf_file)
+            else:
+                stale.append(index)
+        removed = self.manifest.prune(pdf_files)
+        self.removed_files = [entry['file'] for entry in removed]
+        self._removed_outputs = [entry['output'] for entry in removed]
+        
+        workers = max(1, min(workers, len(stale)))
+        print(f"Found {len(pdf_files)} PDF files, {len(stale)} new or changed to process"
+              + (f" ({workers} worker processes)" if workers > 1 else ""))
+        if self.reused_files:
+            print(f"✓ Reusing {len(self.reused_files)} unchanged projects")
+        for pdf_file in self.removed_files:
+            print(f"✓ Dropping {pdf_file} (no longer in {self.pdf_directory})")
+        
+        for index, result in zip(stale, self._process_files([pdf_paths[i] for i in stale], workers, timeout)):
+            results[index] = result
+            pdf_file, (project_data, _) = pdf_files[index], result
+            if project_data is not None and pdf_file in fingerprints:
+                self.manifest.record(pdf_file, fingerprints[pdf_file], f"{project_data['id']}.json")
+            else:
+                # Retry a failed file next run rather than reusing an older extraction
+                self.manifest.entries.pop(pdf_file, None)
+        
+        for pdf_file, (project_data, error) in zip(pdf_files, results):
+            if project_data is not None:
+                self.extracted_data['projects'].append(project_data)
+            else:
+                self.failed_files.append({'file': pdf_file, 'error': error})
+                print(f"✗ {pdf_file}: {error}")
+        
+        print(f"\n✓ Processed {len(self.extracted_data['projects'])} PDF files successfully")
+        if self.failed_files:
+            print(f"✗ {len(self.failed_files)} PDF files failed")
+    
+    def _load_project(self, output: Optional[str]) -> Optional[Dict[str, Any]]:
+        """A project JSON saved by an earlier run, or None if it is missing or unreadable"""
+        if output is None:
+            return None
+        try:
+            with open(os.path.join(self.output_directory, output), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _process_files(self, pdf_paths: List[str], workers: int,
+                       timeout: float) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+        """(project_data, error) for every path, in input order"""
+        pdf_files = [os.path.basename(pdf_path) for pdf_path in pdf_paths]
+        results: List[Tuple[Optional[Dict[str, Any]], Optional[str]]] = [(None, "not processed")] * len(pdf_paths)
+        long_documents = self._long_documents(pdf_paths, timeout)
+        for index in sorted(long_documents):
+            print(f"Splitting {pdf_files[index]} across {self.page_workers} page workers")
+            results[index] = self._process_isolated(pdf_paths[index], timeout)
+        
+        remaining = [i for i in range(len(pdf_paths)) if i not in long_documents]
+        if workers > 1 and remaining:
+            remaining_results = self._process_parallel([pdf_paths[i] for i in remaining], workers, timeout)
+        else:
+            remaining_results = [self._process_isolated(pdf_paths[i]) for i in remaining]
+        for index, result in zip(remaining, remaining_results):
+            results[index] = result
+        return results
+    
+    def _long_documents(self, pdf_paths: List[str], timeout: float) -> Set[int]:
+        """Indexes of the documents parse_pages would split over the page workers.
+
+        Pages are counted in child processes under the file timeout. A PDF
+        whose count fails or runs out of time is not split: it goes through
+        the normal worker path, where the timeout applies as for any file.
+        """
+        if self.page_workers <= 1:
+            return set()
+        counts = count_pages_within(pdf_paths, self.page_workers, timeout)
+        long_documents: Set[int] = set()
+        for index, pdf_path in enumerate(pdf_paths):
+            # 0 (unknown) makes parse_pages read the document whole instead of counting it again
+            self._page_counts[pdf_path] = counts[pdf_path] or 0
+            if counts[pdf_path] and len(page_ranges(counts[pdf_path], self.page_workers)) > 1:
+                long_documents.add(index)
+        return long_documents
+    
+    def _process_isolated(self, pdf_path: str,
+                          timeout: Optional[float] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """process_pdf in this process, with an exception turned into an error message"""
+        try:
+            return self.process_pdf(pdf_path, timeout), None
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}"
+    
+    def _process_parallel(self, pdf_paths: List[str], workers: int,
+                          timeout: float) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+        """Run process_pdf for every path in worker processes; results in input order"""
+        results: List[Tuple[Optional[Dict[str, Any]], Optional[str]]] = [(None, "not processed")] * len(pdf_paths)
+        pending = list(enumerate(pdf_paths))
+        running = {}  # connection -> (index, process, deadline)
+        
+        while pending or running:
+            # Keep `workers` files in flight; the timeout runs from when each one starts
+            while pending and len(running) < workers:
+                index, pdf_path = pending.pop(0)
+                parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(
+                    target=_process_pdf_worker,
+                    args=(self.pdf_directory, self.output_directory, pdf_path, child_conn),
+                    daemon=True,
+                )
+                process.start()
+                child_conn.close()
+                running[parent_conn] = (index, process, time.monotonic() + timeout)
+            
+            next_deadline = min(deadline for _, _, deadline in running.values())
+            for conn in wait(list(running), timeout=max(next_deadline - time.monotonic(), 0)):
+                index, process, _ = running.pop(conn)
+                try:
+                    status, payload = conn.recv()
+                    results[index] = (payload, None) if status == 'ok' else (None, payload)
+                except EOFError:
+                    # The worker died without answering (crash, out of memory, ...)
+                    process.join()
+                    results[index] = (None, f"worker exited with code {process.exitcode}")
+                conn.close()
+                process.join()
+            
+            now = time.monotonic()
+            for conn, (index, process, deadline) in list(running.items()):
+                if now >= deadline:
+                    process.terminate()
+                    process.join()
+                    conn.close()
+                    del running[conn]
+                    results[index] = (None, f"timed out after {timeout:g}s")
+        
+        return results
     
     def save_to_json(self):
         """Save extracted data to JSON files"""
@@ -358,10 +671,20 @@ class PDFDataExtractor:
                 json.dump(project, f, indent=2, ensure_ascii=False)
         print(f"✓ Saved {len(self.extracted_data['projects'])} individual project files")
         
+        # Per-project files of PDFs that were deleted since the last run
+        current_outputs = {f"{p['id']}.json" for p in self.extracted_data['projects']}
+        for output in self._removed_outputs:
+            output_path = os.path.join(self.output_directory, output)
+            if output not in current_outputs and os.path.exists(output_path):
+                os.remove(output_path)
+        
         # Create a summary file
         summary = {
             'total_projects': len(self.extracted_data['projects']),
             'extraction_date': datetime.now().isoformat(),
+            'failed_files': self.failed_files,
+            'reused_files': self.reused_files,
+            'removed_files': self.removed_files,
             'projects': [
                 {
                     'id': p['id'],
@@ -377,6 +700,10 @@ class PDFDataExtractor:
         with open(summary_file, 'w', encoding='utf-8') as f:
             json.dump(summary, f, indent=2, ensure_ascii=False)
         print(f"✓ Saved extraction summary to: {summary_file}")
+        
+        # Written last: a run that dies before this point is simply redone next time
+        if self.manifest is not None:
+            self.manifest.save()
     
     def generate_typescript_data(self):
         """Generate TypeScript data file compatible with the app"""
@@ -451,6 +778,18 @@ class PDFDataExtractor:
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Extract project data from the brochure PDFs")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Worker processes (1 = parse every file in this process)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_FILE_TIMEOUT,
+                        help="Seconds one PDF may take in a worker before it is killed")
+    parser.add_argument("--page-workers", type=int, default=1,
+                        help="Split long PDFs into page ranges parsed by this many processes; split PDFs "
+                             "run one at a time before the --workers pool starts")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-extract every PDF, even those unchanged since the last run")
+    args = parser.parse_args()
+    
     # Configuration
     PDF_DIRECTORY = "../public/projectFiles"
     OUTPUT_DIRECTORY = "../src/data/extracted"
@@ -465,10 +804,10 @@ def main():
         return
     
     # Create extractor instance
-    extractor = PDFDataExtractor(PDF_DIRECTORY, OUTPUT_DIRECTORY)
+    extractor = PDFDataExtractor(PDF_DIRECTORY, OUTPUT_DIRECTORY, page_workers=args.page_workers)
     
     # Process all PDFs
-    extractor.process_all_pdfs()
+    extractor.process_all_pdfs(workers=args.workers, timeout=args.timeout, force=args.force)
     
     # Save results
     extractor.save_to_json()
@@ -8,7 +8,7 @@ import subprocess
 import sys
 import os
 
-def run_command(command, description):
+def run_command(command, description, args=()):
     """Run a command and handle errors"""
     print("\n" + "="*60)
     print(f"→ {description}")
@@ -16,7 +16,7 @@ def run_command(command, description):
     
     try:
         result = subprocess.run(
-            [sys.executable, command],
+            [sys.executable, command, *args],
             capture_output=False,
             text=True,
             check=True
@@ -41,6 +41,12 @@ def main():
     print("  2. Advanced analysis (advanced_analyzer.py)")
     print("  3. Mockup data generation (generate_mockdata.py)")
     
+    # Unchanged PDFs reuse their earlier extraction unless --force is given
+    force = "--force" in sys.argv[1:]
+    refresh_args = ["--force"] if force else []
+    print("\nEvery PDF will be re-extracted (--force)" if force
+          else "\nOnly new or changed PDFs will be re-extracted (use --force for all)")
+    
     # Check if PDF directory exists
     pdf_dir = "../public/projectFiles"
     if not os.path.exists(pdf_dir):
@@ -56,8 +62,8 @@ def main():
     # Run all tools
     success = True
     
-    success = run_command("extract_pdf_data.py", "Basic Data Extraction") and success
-    success = run_command("advanced_analyzer.py", "Advanced Analysis") and success
+    success = run_command("extract_pdf_data.py", "Basic Data Extraction", refresh_args) and success
+    success = run_command("advanced_analyzer.py", "Advanced Analysis", refresh_args) and success
     success = run_command("generate_mockdata.py", "Mockup Data Generation") and success
     
     print("\n" + "="*60)
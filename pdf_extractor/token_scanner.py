@@ -0,0 +1,108 @@
+"""
+Single-pass scanner for the numbers in brochure text and table cells.
+
+One precompiled regex walks the text once and turns every number into a
+token typed by the unit after it and the currency marker before it:
+
+    Rs. 12,500,000 / PKR 9,000,000 / Price: 7,500,000   -> currency
+    20% / 25% down                                       -> percent (label 'down')
+    2 Bed / 3BR                                          -> bedrooms
+    1,250 sq ft / 5 marla                                -> area (label 'sqft' / 'marla')
+    36 monthly / 12 quarterly / 48 installments          -> installments (label 'monthly', ...)
+
+Parsers ask for the kinds they need (`values`, `first`) instead of running
+their own regexes. Table cells go through `scan_cell`, which caches its
+results, since the price, payment-plan and unit parsers all look at the same
+cells. Document text is not cached (it can run to megabytes); process_pdf
+scans it once and hands the tokens to each parser.
+"""
+
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+NUMBER = 'number'  # any number; also the kind of numbers without a unit
+CURRENCY = 'currency'  # any number marked as an amount, whatever its unit
+PERCENT = 'percent'
+BEDROOMS = 'bedrooms'
+AREA = 'area'
+INSTALLMENTS = 'installments'
+
+# Anchored on the digits, so the regex engine can skip straight to the next number.
+# At most one unit matches; match.lastgroup names it (or is 'number').
+_TOKEN_RE = re.compile(r"""
+    (?P<number> \d(?:[\d,]*\d)? )
+    (?:
+        (?P<percent> %(?:\s*(?:down|advance|booking))? )
+      | \s* (?P<bedrooms> bed|br )
+      | \s* (?P<area> sq\.?\s*ft|sqft|marla )
+      | \s* (?P<installments> monthly|quarterly|installments? )
+    )?
+""", re.IGNORECASE | re.VERBOSE)
+# "Rs. ", "PKR " or "Price: " before a number, matched backwards on the reversed text
+_CURRENCY_PREFIX_RE = re.compile(r",*(?:\s*(?:\.?sr|rkp)|[:\s]+(?:ecirp|latot|tnuoma))", re.IGNORECASE)
+
+
+class Token(NamedTuple):
+    kind: str       # NUMBER, PERCENT, BEDROOMS, AREA or INSTALLMENTS
+    digits: str     # the number without thousands separators
+    label: str      # lowercased qualifier ('down', 'sqft', 'monthly', ...) or ''
+    start: int
+    currency: bool  # preceded by Rs. / PKR / Price: / Total / Amount
+
+    @property
+    def value(self) -> int:
+        return int(self.digits)
+
+
+# Token(...) without the Python-level __new__, for the per-number hot path
+_new_token = tuple.__new__
+
+
+def _label(kind: str, unit: str) -> str:
+    unit = unit.lower()
+    if kind == PERCENT:
+        return unit[1:].strip()
+    if kind == AREA:
+        return 'marla' if unit == 'marla' else 'sqft'
+    return unit if kind == INSTALLMENTS else ''
+
+
+def scan(text: str) -> Tuple[Token, ...]:
+    """All number tokens in `text`, in order of appearance"""
+    tokens = []
+    append = tokens.append
+    reversed_text, end = text[::-1], len(text)
+    is_currency = _CURRENCY_PREFIX_RE.match
+    for match in _TOKEN_RE.finditer(text):
+        start = match.start()
+        kind = match.lastgroup
+        label = '' if kind == NUMBER else _label(kind, match.group(kind))
+        append(_new_token(Token, (kind, match.group(NUMBER).replace(',', ''), label, start,
+                                  is_currency(reversed_text, end - start) is not None)))
+    return tuple(tokens)
+
+
+# scan() for table cells: short strings that several parsers read, so the results are kept
+scan_cell = lru_cache(maxsize=8192)(scan)
+
+
+def _is_a(token: Token, kind: str) -> bool:
+    return kind == NUMBER or token.kind == kind or (kind == CURRENCY and token.currency)
+
+
+def values(tokens: Sequence[Token], kind: str) -> List[int]:
+    # One comprehension per kind rather than _is_a() per token: documents have tens of thousands
+    if kind == NUMBER:
+        return [int(token.digits) for token in tokens]
+    if kind == CURRENCY:
+        return [int(token.digits) for token in tokens if token.currency]
+    return [int(token.digits) for token in tokens if token.kind == kind]
+
+
+def first(tokens: Sequence[Token], kind: str, labels: Sequence[str] = ()) -> Optional[Token]:
+    """The first token of `kind` (with one of `labels`, if given)"""
+    for token in tokens:
+        if _is_a(token, kind) and (not labels or token.label in labels):
+            return token
+    return None
@@ -1,8 +1,21 @@
+import io
 import os
+from typing import Union
 import streamlit as st
-from groq import Groq # Groq's official Python SDK
 from dotenv import load_dotenv
 
+from lead_classifier import MODEL_NAME
+from lead_classifier.backends import DEFAULT_BACKEND, ClassifierBackend, create_backend
+from lead_classifier.cache import ClassificationCache
+from lead_classifier.client import ResilientGroq
+from lead_classifier.batch import read_transcripts
+from lead_classifier.compaction import TranscriptCompactor
+from lead_classifier.hedging import HedgePolicy
+from lead_classifier.jobs import DurableJobManager
+from lead_classifier.keypool import KeyPool, get_groq_pool
+from lead_classifier.metrics import METRICS, serve_metrics
+from lead_classifier.rules import DEFAULT_THRESHOLD, RulePreClassifier
+
 # --- 1. CONFIGURATION AND STYLING ---
 
 st.set_page_config(
@@ -11,36 +24,106 @@ st.set_page_config(
     initial_sidebar_state="collapsed",
 )
 
-# Load environment variables
-load_dotenv()
+# Load environment variables (.env is read once per process, not on every rerun)
+@st.cache_resource
+def load_environment() -> bool:
+    return load_dotenv()
+
+load_environment()
 
 # --- API KEY & MODEL SETUP ---
 # Securely load the API key from .env file
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-MODEL_NAME = "llama-3.1-8b-instant" 
-
-if not GROQ_API_KEY:
+# MODEL_NAME, SYSTEM_PROMPT and label normalisation live in lead_classifier/core.py
+# LEAD_CLASSIFIER_BACKEND picks the engine: groq, local, groq,local or local,groq
+# GROQ_API_KEYS (comma-separated) spreads load over several keys instead of one
+GROQ_API_KEY = os.getenv("GROQ_API_KEYS") or os.getenv("GROQ_API_KEY")
+CLASSIFIER_BACKEND = os.getenv("LEAD_CLASSIFIER_BACKEND", DEFAULT_BACKEND)
+USES_GROQ = "groq" in CLASSIFIER_BACKEND
+JOB_PAGE_ROWS = 200  # rows per page of the bulk job table
+
+if USES_GROQ and not GROQ_API_KEY:
     st.error("⚠️ GROQ_API_KEY is missing. Please set it in your .env file.")
     st.stop()
 
-# Initialize the Groq client
-try:
-    groq_client = Groq(api_key=GROQ_API_KEY)
-except Exception as e:
-    st.error(f"Failed to initialize Groq client: {e}")
-    st.stop()
-
+# Initialize the Groq client once per process: pooled keep-alive connections,
+# retries with backoff and a circuit breaker (lead_classifier/client.py),
+# behind a key pool when several keys are configured (lead_classifier/keypool.py)
+@st.cache_resource
+def get_cached_groq_client(api_keys: str) -> Union[ResilientGroq, KeyPool]:
+    return get_groq_pool(api_keys.split(","))
 
-# --- STYLING (The same improved styling as before) ---
+groq_client = None
+if USES_GROQ:
+    try:
+        groq_client = get_cached_groq_client(GROQ_API_KEY)
+    except Exception as e:
+        st.error(f"Failed to initialize Groq client: {e}")
+        st.stop()
+
+
+# One cache per process: the LRU tier survives reruns, the SQLite tier survives restarts
+@st.cache_resource
+def get_classification_cache() -> ClassificationCache:
+    return ClassificationCache()
+
+# Obvious Hot/Dead leads are answered locally; LEAD_RULES_THRESHOLD tunes how obvious
+@st.cache_resource
+def get_pre_classifier() -> RulePreClassifier:
+    return RulePreClassifier(threshold=float(os.getenv("LEAD_RULES_THRESHOLD", DEFAULT_THRESHOLD)))
+
+# Slow Groq calls are hedged when LEAD_HEDGE=1 (second model: LEAD_HEDGE_MODEL)
+@st.cache_resource
+def get_hedge_policy():
+    return HedgePolicy.from_env()
+
+# Templated inquiries reuse the label of a near-identical transcript when LEAD_NEAR_DUP_THRESHOLD is set
+@st.cache_resource
+def get_near_dup_index():
+    if not os.getenv("LEAD_NEAR_DUP_THRESHOLD"):
+        return None
+    from lead_classifier.neardup import NearDuplicateIndex
+    return NearDuplicateIndex.from_env()
+
+# Leading underscores keep Streamlit from hashing the client and cache
+@st.cache_resource
+def get_backend(spec: str, _client, _cache: ClassificationCache, _hedge, _near_dup) -> ClassifierBackend:
+    # Long transcripts are compacted to LEAD_TOKEN_BUDGET tokens before they reach Groq
+    return create_backend(spec, client=_client, cache=_cache, compactor=TranscriptCompactor(), hedge=_hedge,
+                          near_dup=_near_dup)
+
+# LEAD_METRICS_PORT exposes /metrics (Prometheus text) from this process
+@st.cache_resource
+def start_metrics_exporter(port: int):
+    return serve_metrics(port)
+
+if os.getenv("LEAD_METRICS_PORT"):
+    start_metrics_exporter(int(os.getenv("LEAD_METRICS_PORT")))
+
+# Latency/token panel: open the page with ?admin=1 or set LEAD_ADMIN_PANEL=1
+SHOW_ADMIN_PANEL = os.getenv("LEAD_ADMIN_PANEL") == "1" or st.query_params.get("admin") == "1"
+
+classification_cache = get_classification_cache()
+pre_classifier = get_pre_classifier()
+hedge_policy = get_hedge_policy()
+near_dup_index = get_near_dup_index()
+backend = get_backend(CLASSIFIER_BACKEND, groq_client, classification_cache, hedge_policy, near_dup_index)
+
+# Bulk uploads are persisted to a SQLite queue (LEAD_QUEUE_PATH) and classified by a shared
+# worker pool (LEAD_BULK_WORKERS), so they survive both a browser refresh and a restart
+@st.cache_resource
+def get_job_manager(_backend: ClassifierBackend, _pre_classifier: RulePreClassifier) -> DurableJobManager:
+    return DurableJobManager(_backend, _pre_classifier)
+
+job_manager = get_job_manager(backend, pre_classifier)
+
+
+# --- STYLING ---
+# Page colours and font come from the theme in .streamlit/config.toml, which is
+# sent once with the app; only the rules a theme cannot express are injected here
 
 st.markdown(
     """
     <style>
-        .stApp {
-            background: #f0f2f6; /* Light gray background */
-            color: #1a1a1a;
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-        }
         .card {
             background: #ffffff;
             border: 1px solid #dcdcdc;
@@ -49,21 +132,19 @@ st.markdown(
             padding: 25px;
             margin-bottom: 20px;
         }
-        h1, h2, h3 {
-            color: #2c3e50;
-        }
+        h1, h2, h3 { color: #2c3e50; }
         div[data-baseweb="textarea"] textarea {
             min-height: 250px;
             border-radius: 8px;
             border: 1px solid #bdc3c7;
             padding: 15px;
             font-size: 16px !important;
-            color: #1a1a1a !important; 
+            color: #1a1a1a !important;
             background-color: #f9f9f9;
             transition: border-color 0.3s;
         }
         .stButton > button {
-            background: #2980b9; 
+            background: #2980b9;
             color: #ffffff;
             border: none;
             border-radius: 8px;
@@ -73,9 +154,7 @@ st.markdown(
             width: 100%;
             transition: background 0.3s;
         }
-        .stButton > button:hover {
-            background: #3498db;
-        }
+        .stButton > button:hover { background: #3498db; }
         .pill {
             display: inline-flex;
             align-items: center;
@@ -88,159 +167,203 @@ st.markdown(
             text-transform: uppercase;
             box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
         }
-        .pill-hot {
-            background: #e74c3c; 
-            color: white;
-        }
-        .pill-cold {
-            background: #f1c40f; 
-            color: #333;
-        }
-        .pill-dead {
-            background: #34495e; 
-            color: white;
-        }
+        .pill-hot { background: #e74c3c; color: white; }
+        .pill-cold { background: #f1c40f; color: #333; }
+        .pill-dead { background: #34495e; color: white; }
     </style>
     """,
     unsafe_allow_html=True,
 )
 
 
-# --- 2. CLASSIFICATION PROMPT (System Instruction) ---
-
-SYSTEM_PROMPT = """
-You are an expert lead-classification system for ABS Developers, Pakistan's first Shariah-compliant real estate developer specializing in premium residential and commercial properties in Bahria Town, Lahore.
-
-## YOUR TASK
-Analyze the complete customer-agent conversation and classify it into EXACTLY ONE category. Output ONLY the category name as a single word with no punctuation, explanation, or additional text.
-
-## CLASSIFICATION CATEGORIES (Hot, Cold, Dead definitions are the same)
-
-### Hot
-A lead demonstrating HIGH PURCHASE INTENT with immediate action potential. Indicators include:
-✓ Asks about SPECIFIC projects, units, size/floor/facing preferences
-✓ Discusses PAYMENT DETAILS (down payment, installments, booking fee)
-✓ Shows BUDGET CLARITY, requests CONCRETE NEXT STEPS (site visit, booking)
-✓ Mentions bringing CNIC or other commitment documents
-✓ Discusses TIMELINE urgently ("Can I visit tomorrow?", "How soon can I book?")
-✓ Uses COMMITMENT LANGUAGE ("I'll take it", "Reserve a unit", "Let's proceed")
-
-Decision Rule: If 4+ hot indicators present AND customer shows readiness for next steps → Hot
-
----
-
-### Cold
-A lead showing MILD INTEREST but NOT ready to commit. Indicators include:
-⚠ VAGUE INQUIRIES ("What do you have?", "Just looking around")
-⚠ PRICE SENSITIVITY (complains cost is high, asks for discounts)
-⚠ NO BUDGET CLARITY or DELAY TACTICS ("I'll think about it", "Maybe next month", "Call me later")
-⚠ NON-COMMITTAL RESPONSES ("Just send me details", "I'll review the brochure")
-
-Decision Rule: If person shows interest BUT lacks commitment indicators OR expresses uncertainty → Cold
-
----
-
-### Dead
-A lead with ZERO PROPERTY PURCHASE INTENT or completely OFF-TOPIC. Indicators include:
-✗ JOB INQUIRIES or SUPPLIER/VENDOR QUERIES
-✗ WRONG EXPECTATIONS (looking for rent when ABS only sells)
-✗ IMMEDIATE DISQUALIFICATION ("I have no money", refuses all options)
-✗ SPAM/RANDOM or CLEARLY NOT A BUYER (competitor, journalist)
-
-Decision Rule: If person shows ZERO buying intent OR topic is completely unrelated → Dead
-
----
-
-## CRITICAL RULES
-1. Output format: Single word only (Hot, Cold, or Dead) - no punctuation, no explanation, no extra characters
-2. Consider the OVERALL conversation arc, not just individual messages
-3. Final customer sentiment weighs more than initial questions
-4. Action-oriented language (visit, book, pay, reserve) = strong Hot signal
-5. Hesitation language (think, maybe, later, expensive) = Cold signal unless overcome
-6. Irrelevant topics or job inquiries = instant Dead classification
-7. Output ONLY one word: Hot, Cold, or Dead
-"""
-
-
-# --- 3. CLASSIFICATION FUNCTION (Updated for Groq) ---
-
-def classify_lead_groq(conversation: str) -> str:
-    """Send conversation to Groq and normalize the single-word label."""
-    
-    # Groq uses the Chat Completions endpoint, which takes a list of messages.
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": 
-            "Conversation transcript:\n\n" + conversation.strip() + 
-            "\n\nReturn only one word: Hot or Cold or Dead."
-        },
-    ]
-
-    try:
-        # Use groq_client to create the chat completion
-        chat_completion = groq_client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=messages,
-            temperature=0.2,
-            max_tokens=5, # Limit output for single-word response
-        )
-        
-        # Groq response is structured differently: we access choices[0].message.content
-        text = chat_completion.choices[0].message.content.strip()
-        normalized = text.lower()
-        
-        # Check for the expected output
-        if "hot" in normalized:
-            return "Hot"
-        if "cold" in normalized:
-            return "Cold"
-        if "dead" in normalized:
-            return "Dead"
-        
-        # Fallback error for unexpected output
-        raise ValueError(f"Model returned text, but it was not Hot, Cold, or Dead. Response: '{text}'")
-
-    except Exception as e:
-        # Catch and re-raise any Groq API or network errors
-        raise Exception(f"Groq API Call Failed: {e}")
+# --- 2. CLASSIFICATION PROMPT & FUNCTION ---
+# See lead_classifier/core.py (shared with the batch engine: python -m lead_classifier.batch)
 
 
 # --- 4. STREAMLIT APP LAYOUT & EXECUTION ---
 
 st.title("Lead Classification")
 
-conversation = st.text_area(
-    "Conversation Transcript",
-    placeholder="Paste the entire conversation transcript here (Agent and Customer messages)...",
-    height=260,
-    label_visibility="collapsed"
-)
-
-classify_button = st.button("Classify Lead", use_container_width=True)
-st.markdown("</div>", unsafe_allow_html=True)
-
-result_placeholder = st.empty()
-
-if classify_button:
-    if not conversation.strip():
-        st.warning("Please paste a conversation first to begin classification.")
-    else:
-        with st.spinner("Analyzing conversation with model trained on ABS data..."):
-            try:
-                label = classify_lead_groq(conversation)
-                
-                class_name = label.lower()
-                
-                result_placeholder.markdown(
-                    f"""
-                    <div class='card' style='margin-top:25px; text-align:center;'>
-                        <p style='font-size: 1.2em; font-weight: 600; color: #333;'>CLASSIFICATION RESULT:</p>
-                        <div class='pill pill-{class_name}'>{label}</div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True,
-                )
-                
-            except Exception as e:
-                # Catch errors from the classification function
-                result_placeholder.error(f"Classification failed: {e}")
\ No newline at end of file
+single_tab, bulk_tab = st.tabs(["Single conversation", "Bulk upload"])
+
+with single_tab:
+    conversation = st.text_area(
+        "Conversation Transcript",
+        placeholder="Paste the entire conversation transcript here (Agent and Customer messages)...",
+        height=260,
+        label_visibility="collapsed"
+    )
+
+    classify_button = st.button("Classify Lead", use_container_width=True)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    result_placeholder = st.empty()
+
+    if classify_button:
+        if not conversation.strip():
+            st.warning("Please paste a conversation first to begin classification.")
+        else:
+            with st.spinner("Analyzing conversation with model trained on ABS data..."):
+                try:
+                    with METRICS.classification() as outcome:
+                        rule_result = pre_classifier.try_classify(conversation)
+                        if rule_result is not None:
+                            label, served_by = rule_result.label, "rules"
+                            source = f"Rule engine ({rule_result.confidence:.0%} confidence)"
+                        else:
+                            outcome.source = backend.name
+                            label, served_by = backend.classify_with_source(conversation)
+                            source = {
+                                'cache': 'Served from cache',
+                                'coalesced': 'Shared with an identical request already in flight',
+                                'groq': 'Classified by ' + MODEL_NAME,
+                                'local': 'Classified by the offline model',
+                            }.get(served_by, 'Classified by ' + served_by)
+                        outcome.source, outcome.label = served_by, label
+
+                    class_name = label.lower()
+
+                    result_placeholder.markdown(
+                        f"""
+                        <div class='card' style='margin-top:25px; text-align:center;'>
+                            <p style='font-size: 1.2em; font-weight: 600; color: #333;'>CLASSIFICATION RESULT:</p>
+                            <div class='pill pill-{class_name}'>{label}</div>
+                        </div>
+                        """,
+                        unsafe_allow_html=True,
+                    )
+
+                    cache_stats = classification_cache.stats()
+                    st.caption(
+                        f"{source} · "
+                        f"cache hits {cache_stats['memory_hits'] + cache_stats['disk_hits']} / "
+                        f"misses {cache_stats['misses']} · "
+                        f"rules absorbed {pre_classifier.absorbed_fraction:.0%}"
+                    )
+
+                except Exception as e:
+                    # Catch errors from the classification function
+                    result_placeholder.error(f"Classification failed: {e}")
+
+
+# --- BULK UPLOAD (background jobs, survive a browser refresh via ?job=<id>) ---
+
+def render_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        st.info("That job is no longer available - upload the file again.")
+        return
+
+    summary = job.summary()
+    st.progress(job.progress, text=(
+        f"{summary['filename']}: {summary['completed']}/{summary['total']} classified "
+        f"({summary['failed']} failed) · {summary['status']} · {summary['elapsed_seconds']}s"
+    ))
+    if summary['labels']:
+        cols = st.columns(3)
+        for col, label in zip(cols, ("Hot", "Cold", "Dead")):
+            col.metric(label, summary['labels'].get(label, 0))
+
+    # One page of rows per refresh, read by row range rather than loading the whole job
+    pages = max(1, -(-job.total // JOB_PAGE_ROWS))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1,
+                               key=f"page-{job_id}")
+    st.dataframe(job.page((page - 1) * JOB_PAGE_ROWS, JOB_PAGE_ROWS), hide_index=True, height=320)
+
+    if summary['failed']:
+        st.caption("Failed rows")
+        st.dataframe(job.dead_letters(), hide_index=True, column_order=("record_id", "error", "attempts"))
+
+    action_cols = st.columns(2)
+    # The rows are only read from the queue when the button is clicked, not on every refresh
+    action_cols[0].download_button(
+        "Download results (CSV)", job.results_csv,
+        file_name=f"{os.path.splitext(job.filename)[0]}.labels.csv", mime="text/csv",
+        use_container_width=True, key=f"download-{job_id}",
+    )
+    if summary['status'] in ("queued", "running"):
+        if action_cols[1].button("Cancel job", use_container_width=True, key=f"cancel-{job_id}"):
+            job_manager.cancel(job_id)
+            st.rerun()
+
+
+@st.fragment(run_every=1.0)
+def poll_job(job_id: str):
+    render_job(job_id)
+    job = job_manager.get(job_id)
+    if job is None or job.status not in ("queued", "running"):
+        # Stop polling once the job is over
+        st.rerun(scope="app")
+
+
+with bulk_tab:
+    uploaded = st.file_uploader("Upload a CSV or JSONL export of conversations", type=["csv", "jsonl", "json"])
+    text_field = st.text_input("Transcript column (optional)", placeholder="conversation / transcript / text")
+
+    if st.button("Classify file", use_container_width=True, disabled=uploaded is None):
+        stream = io.TextIOWrapper(io.BytesIO(uploaded.getvalue()), encoding="utf-8-sig", newline="")
+        records = list(read_transcripts(stream, uploaded.name.lower().endswith(".csv"),
+                                        text_field=text_field.strip() or None, keep_row=True))
+        if not records:
+            st.warning("No transcripts found - check the transcript column name.")
+        else:
+            job = job_manager.submit(records, filename=uploaded.name)
+            st.query_params["job"] = job.job_id
+
+    current_job_id = st.query_params.get("job")
+    current_job = job_manager.get(current_job_id)
+    if current_job is not None and current_job.status in ("queued", "running"):
+        poll_job(current_job_id)
+    elif current_job_id:
+        render_job(current_job_id)
+
+    recent = [job for job in job_manager.jobs() if job.job_id != current_job_id]
+    if recent:
+        st.caption("Recent jobs")
+        for job in recent[:5]:
+            summary = job.summary()
+            if st.button(f"{summary['filename']} · {summary['completed']}/{summary['total']} · {summary['status']}",
+                         key=f"open-{job.job_id}"):
+                st.query_params["job"] = job.job_id
+                st.rerun()
+
+
+# --- 5. ADMIN PANEL ---
+
+if SHOW_ADMIN_PANEL:
+    with st.expander("Admin · latency and token metrics", expanded=False):
+        snapshot = METRICS.snapshot()
+        histograms = snapshot['histograms']
+
+        def ms(name: str, p: str) -> str:
+            value = histograms[name][p]
+            return "–" if value is None else f"{value * 1000:.0f} ms"
+
+        cols = st.columns(3)
+        for col, p in zip(cols, ("p50", "p95", "p99")):
+            col.metric(f"Classification {p}", ms('classification_seconds', p))
+        cols = st.columns(3)
+        for col, p in zip(cols, ("p50", "p95", "p99")):
+            col.metric(f"Groq TTFT {p}", ms('groq_ttft_seconds', p))
+
+        st.caption(
+            f"{snapshot['classifications']} classifications · {snapshot['groq_calls']} Groq calls "
+            f"({snapshot['groq_errors']} failed) · {snapshot['coalesced']} coalesced · "
+            f"{snapshot['near_duplicates']} near-duplicates · "
+            f"tokens {snapshot['prompt_tokens']:,} prompt / {snapshot['completion_tokens']:,} completion"
+        )
+        st.table([
+            {'histogram': name, 'count': h['count'], 'p50': h['p50'], 'p95': h['p95'], 'p99': h['p99']}
+            for name, h in histograms.items()
+        ])
+        st.json(snapshot['outcomes'])
+        if groq_client is not None:
+            st.json(groq_client.stats())
+        if hedge_policy is not None:
+            st.json(hedge_policy.stats())
+        if near_dup_index is not None:
+            st.json(near_dup_index.stats())
+        st.download_button("Download Prometheus metrics", METRICS.render_prometheus(),
+                           file_name="lead_classifier.prom", mime="text/plain")
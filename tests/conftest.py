@@ -0,0 +1,10 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# lead_classifier is imported as a package from the repo root; the
+# pdf_extractor scripts import each other as top-level modules
+for path in (ROOT, os.path.join(ROOT, "pdf_extractor")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from lead_classifier.client import AsyncResilientGroq, CircuitBreaker, CircuitOpenError, ResilientGroq
+
+
+class _Completions:
+    def __init__(self, create):
+        self.create = create
+
+
+class _Chat:
+    def __init__(self, create):
+        self.completions = _Completions(create)
+
+
+class FakeClient:
+    """Just the .chat.completions.create surface of the SDK clients"""
+
+    def __init__(self, create):
+        self.chat = _Chat(create)
+
+
+def _half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure(unhealthy=True)
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_only_one_probe_goes_through_while_half_open():
+    breaker = _half_open_breaker()
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError, match="waiting on the probe"):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.before_call() is False
+
+
+def test_abandoned_probe_lets_the_next_call_probe():
+    breaker = _half_open_breaker()
+    assert breaker.before_call() is True
+    breaker.abandon_probe()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.before_call() is True
+
+
+def test_cancelled_async_probe_releases_the_breaker():
+    breaker = _half_open_breaker()
+    started = asyncio.Event()
+
+    async def hang(**kwargs):
+        started.set()
+        await asyncio.sleep(3600)
+
+    async def answer(**kwargs):
+        return "ok"
+
+    async def run():
+        client = AsyncResilientGroq(FakeClient(hang), breaker=breaker)
+        probe = asyncio.create_task(client.chat.completions.create(model="m", messages=[]))
+        await started.wait()
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        client = AsyncResilientGroq(FakeClient(answer), breaker=breaker)
+        return await client.chat.completions.create(model="m", messages=[])
+
+    assert asyncio.run(run()) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+class _FailingScheduler:
+    def acquire_sync(self, tokens):
+        raise KeyboardInterrupt
+
+
+def test_interrupted_sync_probe_releases_the_breaker():
+    breaker = _half_open_breaker()
+    client = ResilientGroq(FakeClient(lambda **kwargs: "ok"), breaker=breaker, scheduler=_FailingScheduler())
+    with pytest.raises(KeyboardInterrupt):
+        client.chat.completions.create(model="m", messages=[])
+
+    client = ResilientGroq(FakeClient(lambda **kwargs: "ok"), breaker=breaker)
+    assert client.chat.completions.create(model="m", messages=[]) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,77 @@
+import os
+import time
+
+import pytest
+
+import extract_pdf_data
+from extract_pdf_data import ParsedDocument, PDFDataExtractor
+
+SAMPLE_PDFS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "public", "projectFiles")
+
+
+@pytest.fixture
+def broken_pdf(tmp_path):
+    pdf_directory = tmp_path / "pdfs"
+    pdf_directory.mkdir()
+    (pdf_directory / "broken.pdf").write_bytes(b"not a pdf")
+    return pdf_directory
+
+
+def test_parse_error_raises(broken_pdf):
+    with pytest.raises(Exception):
+        ParsedDocument(str(broken_pdf / "broken.pdf"))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_corrupt_pdf_is_a_failed_file(broken_pdf, tmp_path, workers):
+    extractor = PDFDataExtractor(str(broken_pdf), str(tmp_path / "out"))
+    extractor.process_all_pdfs(workers=workers)
+
+    assert extractor.extracted_data['projects'] == []
+    assert [failure['file'] for failure in extractor.failed_files] == ["broken.pdf"]
+    assert "broken.pdf" not in extractor.manifest.entries
+
+
+@pytest.fixture
+def split_everything(monkeypatch):
+    """Split even short documents into two-page ranges"""
+    page_ranges = extract_pdf_data.page_ranges
+    monkeypatch.setattr(extract_pdf_data, "page_ranges", lambda count, workers: page_ranges(count, workers, 2))
+
+
+def test_split_document_matches_a_sequential_parse(split_everything, tmp_path):
+    sequential = PDFDataExtractor(SAMPLE_PDFS, str(tmp_path / "sequential"))
+    sequential.process_all_pdfs(workers=1)
+    split = PDFDataExtractor(SAMPLE_PDFS, str(tmp_path / "split"), page_workers=2)
+    split.process_all_pdfs(workers=1)
+
+    assert split.extracted_data['projects'] == sequential.extracted_data['projects']
+
+
+def test_split_document_is_killed_at_the_file_timeout(split_everything, tmp_path, monkeypatch):
+    # Count in this process, so the tiny timeout only applies to the split parse
+    monkeypatch.setattr(extract_pdf_data, "count_pages_within",
+                        lambda pdf_paths, workers, timeout: {p: extract_pdf_data.count_pages(p) for p in pdf_paths})
+    extractor = PDFDataExtractor(SAMPLE_PDFS, str(tmp_path / "out"), page_workers=2)
+    extractor.process_all_pdfs(workers=1, timeout=0.01)
+
+    assert extractor.extracted_data['projects'] == []
+    assert all("timed out" in failure['error'] for failure in extractor.failed_files)
+
+
+def _slow_count(pdf_path):
+    time.sleep(30)
+
+
+def test_a_slow_page_count_leaves_the_file_unsplit(split_everything, tmp_path, monkeypatch):
+    sequential = PDFDataExtractor(SAMPLE_PDFS, str(tmp_path / "sequential"))
+    sequential.process_all_pdfs(workers=1)
+
+    monkeypatch.setattr(extract_pdf_data, "count_pages", _slow_count)
+    split = PDFDataExtractor(SAMPLE_PDFS, str(tmp_path / "split"), page_workers=2)
+    started = time.monotonic()
+    split.process_all_pdfs(workers=1, timeout=0.5)
+
+    # The hung counts were killed and every file was parsed whole, without counting it again
+    assert time.monotonic() - started < 10
+    assert split.extracted_data['projects'] == sequential.extracted_data['projects']
@@ -0,0 +1,93 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from extract_pdf_data import MANIFEST_FILENAME, ExtractionManifest, PDFDataExtractor
+
+SAMPLE_PDFS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "public", "projectFiles")
+
+
+@pytest.fixture
+def directories(tmp_path):
+    pdf_directory, output_directory = tmp_path / "pdfs", tmp_path / "out"
+    pdf_directory.mkdir()
+    sample = sorted(f for f in os.listdir(SAMPLE_PDFS) if f.endswith('.pdf'))[0]
+    shutil.copy(os.path.join(SAMPLE_PDFS, sample), pdf_directory / "brochure.pdf")
+    return pdf_directory, output_directory
+
+
+def run(pdf_directory, output_directory, **options) -> PDFDataExtractor:
+    extractor = PDFDataExtractor(str(pdf_directory), str(output_directory))
+    extractor.process_all_pdfs(workers=1, **options)
+    extractor.save_to_json()
+    return extractor
+
+
+def test_unchanged_pdf_is_reused(directories):
+    first = run(*directories)
+    assert first.reused_files == []
+
+    second = run(*directories)
+    assert second.reused_files == ["brochure.pdf"]
+    assert second.extracted_data['projects'] == first.extracted_data['projects']
+
+
+def test_touched_pdf_is_reused_without_parsing(directories, monkeypatch):
+    pdf_directory, _ = directories
+    run(*directories)
+    os.utime(pdf_directory / "brochure.pdf")
+    monkeypatch.setattr(PDFDataExtractor, "process_pdf", lambda *args: pytest.fail("parsed again"))
+    assert run(*directories).reused_files == ["brochure.pdf"]
+
+
+def test_changed_pdf_is_extracted_again(directories):
+    pdf_directory, _ = directories
+    run(*directories)
+    with open(pdf_directory / "brochure.pdf", "ab") as f:
+        f.write(b"\n% edited\n")
+    assert run(*directories).reused_files == []
+
+
+def test_force_and_version_bump_extract_everything(directories):
+    _, output_directory = directories
+    run(*directories)
+    assert run(*directories, force=True).reused_files == []
+
+    manifest_path = output_directory / MANIFEST_FILENAME
+    stored = json.loads(manifest_path.read_text())
+    manifest_path.write_text(json.dumps({**stored, 'extractor_version': stored['extractor_version'] - 1}))
+    assert run(*directories).reused_files == []
+
+
+def test_failed_pdf_is_retried_on_the_next_run(directories, monkeypatch):
+    pdf_directory, output_directory = directories
+    (pdf_directory / "broken.pdf").write_bytes(b"not a pdf")
+    first = run(*directories)
+    assert [failure['file'] for failure in first.failed_files] == ["broken.pdf"]
+    assert "broken.pdf" not in ExtractionManifest(str(output_directory)).entries
+
+    parsed = []
+    process_pdf = PDFDataExtractor.process_pdf
+    monkeypatch.setattr(PDFDataExtractor, "process_pdf",
+                        lambda self, path, *args: parsed.append(os.path.basename(path)) or process_pdf(self, path))
+    second = run(*directories)
+    assert parsed == ["broken.pdf"]
+    assert second.reused_files == ["brochure.pdf"]
+
+
+def test_deleted_pdf_is_pruned(directories):
+    pdf_directory, output_directory = directories
+    first = run(*directories)
+    output = output_directory / f"{first.extracted_data['projects'][0]['id']}.json"
+    assert output.exists()
+
+    os.remove(pdf_directory / "brochure.pdf")
+    second = run(*directories)
+    assert second.removed_files == ["brochure.pdf"]
+    assert second.extracted_data['projects'] == []
+    assert not output.exists()
+    assert ExtractionManifest(str(output_directory)).entries == {}
+    summary = json.loads((output_directory / "extraction_summary.json").read_text())
+    assert summary['removed_files'] == ["brochure.pdf"]
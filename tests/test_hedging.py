@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from lead_classifier.backends import GroqBackend
+from lead_classifier.cache import ClassificationCache, cache_key
+from lead_classifier.hedging import HedgePolicy
+from lead_classifier.metrics import METRICS
+
+
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Choice:
+    def __init__(self, content):
+        self.message = _Message(content)
+
+
+class _Completion:
+    usage = None
+
+    def __init__(self, content):
+        self.choices = [_Choice(content)]
+
+
+class SlowPrimaryClient:
+    """AsyncGroq stand-in: the primary model hangs, every other model answers Hot"""
+
+    def __init__(self, primary_model: str):
+        self.primary_model = primary_model
+        self.chat = self
+        self.completions = self
+        self.models = []
+
+    async def create(self, model, **kwargs):
+        self.models.append(model)
+        if model == self.primary_model:
+            await asyncio.sleep(3600)
+        return _Completion("Hot")
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    METRICS.reset()
+    yield
+    METRICS.reset()
+
+
+def _hedged_backend(cache=None):
+    hedge = HedgePolicy(hedge_model="fallback-model", initial_delay=0.01, max_hedge_rate=1.0)
+    client = SlowPrimaryClient("primary-model")
+    return GroqBackend(async_client=client, cache=cache, model="primary-model", hedge=hedge), hedge, client
+
+
+def test_cancelled_loser_is_observed_and_counted():
+    backend, hedge, client = _hedged_backend()
+    assert asyncio.run(backend.classify_with_source_async("call me tomorrow")) == ("Hot", "groq")
+    assert client.models == ["primary-model", "fallback-model"]
+
+    latency = hedge.stats()['latency']
+    assert latency['primary-model']['count'] == 1 and latency['primary-model']['p50'] >= 0.01
+    snapshot = METRICS.snapshot()
+    assert snapshot['groq_calls'] == 2
+    assert snapshot['groq_cancelled'] == 1
+    assert snapshot['prompt_tokens'] > 0
+
+
+def test_fallback_answer_is_not_cached_as_the_primary_model(tmp_path):
+    cache = ClassificationCache(path=str(tmp_path / "cache.sqlite3"))
+    backend, _, _ = _hedged_backend(cache)
+    asyncio.run(backend.classify_with_source_async("call me tomorrow"))
+    assert cache.get(cache_key("call me tomorrow", model="primary-model")) is None
+    cache.close()
+
+
+def test_hedge_budget_holds_under_concurrency():
+    hedge = HedgePolicy(hedge_model="fallback-model", initial_delay=0.01, max_hedge_rate=0.1)
+
+    async def call(model):
+        await asyncio.sleep(0.05 if model == "primary-model" else 0.001)
+        return "Hot"
+
+    async def burst():
+        for _ in range(4):
+            await asyncio.gather(*(hedge.run_async("primary-model", call) for _ in range(32)))
+
+    asyncio.run(burst())
+    stats = hedge.stats()
+    assert stats['requests'] == 128
+    assert stats['hedges'] <= 0.1 * stats['requests']
+    assert stats['budget_denied'] > 0
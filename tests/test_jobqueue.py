@@ -0,0 +1,117 @@
+import sqlite3
+import time
+
+import pytest
+
+from lead_classifier import jobqueue
+from lead_classifier.jobqueue import DONE, LEASED, QUEUED, JobQueue, QueueWorkerPool
+from lead_classifier.jobs import StoredJob
+
+RECORDS = [{'id': 1, 'conversation': "Interested, call me"}, {'id': 2, 'conversation': "Not now"}]
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), visibility_seconds=60, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def test_resubmitting_a_file_returns_the_same_job(queue):
+    job_id, created = queue.submit(RECORDS, "leads.csv")
+    assert created
+    assert queue.submit(RECORDS, "leads.csv") == (job_id, False)
+    assert queue.counts(job_id)[QUEUED] == 2
+
+
+def test_resubmitting_a_cancelled_file_creates_a_new_job(queue):
+    job_id, _ = queue.submit(RECORDS, "leads.csv")
+    queue.cancel(job_id)
+
+    new_id, created = queue.submit(RECORDS, "leads.csv")
+    assert created and new_id != job_id
+    assert not queue.job(new_id)['cancelled']
+    assert queue.counts(new_id)[QUEUED] == 2
+    # ... and that new job is the one a further upload reopens
+    assert queue.submit(RECORDS, "leads.csv") == (new_id, False)
+
+
+def test_cancelled_jobs_are_not_leased(queue):
+    job_id, _ = queue.submit(RECORDS, "leads.csv")
+    queue.cancel(job_id)
+    assert queue.lease("worker") == []
+
+
+def test_a_lease_hides_tasks_until_it_expires(queue, monkeypatch):
+    queue.submit(RECORDS, "leads.csv")
+    assert len(queue.lease("crashed", limit=8)) == 2
+    assert queue.lease("other") == []
+
+    later = time.time() + queue.visibility_seconds + 1
+    monkeypatch.setattr(jobqueue.time, "time", lambda: later)
+    tasks = queue.lease("other")
+    assert [task.attempts for task in tasks] == [2, 2]
+
+    # The crashed worker's late ack is ignored; the current owner's counts
+    queue.ack("crashed", [(task, "Hot", "groq", None, 1.0) for task in tasks])
+    assert queue.counts()[LEASED] == 2
+    queue.ack("other", [(task, "Cold", "groq", None, 1.0) for task in tasks])
+    assert queue.counts()[DONE] == 2
+
+
+def test_failures_are_retried_then_dead_lettered(queue, monkeypatch):
+    job_id, _ = queue.submit(RECORDS[:1], "leads.csv")
+    task, = queue.lease("worker")
+    queue.ack("worker", [(task, None, None, "HTTP 500", 1.0)])
+    assert queue.counts(job_id)[QUEUED] == 1
+    assert queue.lease("worker") == []  # backing off
+
+    later = time.time() + 60
+    monkeypatch.setattr(jobqueue.time, "time", lambda: later)
+    task, = queue.lease("worker")
+    queue.ack("worker", [(task, None, None, "HTTP 500", 1.0)])
+    assert [(t['record_id'], t['error'], t['attempts']) for t in queue.dead_letters(job_id)] == [("1", "HTTP 500", 2)]
+
+
+def test_job_progress_comes_from_the_aggregate(queue):
+    job_id, _ = queue.submit(RECORDS, "leads.csv")
+    first, second = queue.lease("worker")
+    queue.ack("worker", [(first, "Hot", "rules", None, 1.0), (second, None, None, "boom", 1.0)])
+
+    job = StoredJob(queue.job(job_id), queue)
+    assert (job.total, job.completed, job.failed, job.status) == (2, 1, 0, "running")
+    assert job.summary()['labels'] == {"Hot": 1}
+    assert [row['status'] for row in job.rows] == ["done", "queued"]
+
+
+def test_job_table_is_read_one_page_at_a_time(queue):
+    job_id, _ = queue.submit([{'id': i, 'conversation': f"lead {i}"} for i in range(5)], "leads.csv")
+    first, = queue.lease("worker", limit=1)
+    queue.ack("worker", [(first, "Cold", "groq", None, 2.0)])
+
+    job = StoredJob(queue.job(job_id), queue)
+    assert [row['id'] for row in job.page(0, 2)] == ["0", "1"]
+    assert [row['id'] for row in job.page(4, 2)] == ["4"]
+    assert job.page(0, 1)[0] == {'id': "0", 'status': "done", 'label': "Cold", 'source': "groq", 'error': None,
+                                 'latency_ms': 2.0, 'attempts': 1}
+
+
+def test_a_worker_survives_database_errors(queue):
+    failures = iter([sqlite3.OperationalError("database is locked")])
+
+    def flaky_lease(owner, limit):
+        for error in failures:
+            raise error
+        return JobQueue.lease(queue, owner, limit)
+
+    queue.lease = flaky_lease
+    job_id, _ = queue.submit(RECORDS, "leads.csv")
+    pool = QueueWorkerPool(queue, lambda conversation: ("Hot", "test"), workers=1, poll_interval=0.01).start()
+    try:
+        deadline = time.monotonic() + 5
+        while queue.counts(job_id)[DONE] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        pool.stop(timeout=5)
+    assert queue.counts(job_id)[DONE] == 2
+    assert pool.stats()['worker_errors'] == 1
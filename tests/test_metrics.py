@@ -0,0 +1,19 @@
+from lead_classifier.metrics import ClassifierMetrics, replay_log
+
+
+def test_replaying_a_log_follows_it_as_it_grows(tmp_path):
+    log = tmp_path / "metrics.jsonl"
+    writer = ClassifierMetrics(log_path=str(log))
+    writer.record_classification("rules", "Hot", 0.01)
+    written = log.read_text(encoding="utf-8")
+    # A second event the writer is halfway through
+    log.write_text(written + written[:10], encoding="utf-8")
+
+    metrics = ClassifierMetrics(log_path=None)
+    with open(log, encoding="utf-8") as f:
+        assert replay_log(f, metrics) == 1
+        with open(log, "a", encoding="utf-8") as append:
+            append.write(written[10:])
+        assert replay_log(f, metrics) == 1
+        assert replay_log(f, metrics) == 0
+    assert metrics.snapshot()['classifications'] == 2
@@ -0,0 +1,24 @@
+import threading
+
+from lead_classifier.scheduler import RateLimitScheduler
+
+
+def test_waiting_for_a_slot_is_not_quota_wait():
+    scheduler = RateLimitScheduler(initial_concurrency=1, max_concurrency=1, poll_interval=0.01)
+    permit = scheduler.acquire_sync(10)
+    threading.Timer(0.05, scheduler.release, args=(permit,)).start()
+    scheduler.acquire_sync(10)
+
+    stats = scheduler.stats()
+    assert stats['concurrency_wait_seconds'] > 0
+    assert stats['quota_wait_seconds'] == 0
+
+
+def test_waiting_for_rpm_is_quota_wait():
+    scheduler = RateLimitScheduler(rpm=600)  # one request per 0.1s once the bucket is empty
+    scheduler.requests.tokens = 0
+    scheduler.acquire_sync(10)
+
+    stats = scheduler.stats()
+    assert stats['quota_wait_seconds'] > 0
+    assert stats['concurrency_wait_seconds'] == 0
@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+from lead_classifier.backends import ClassifierBackend
+from lead_classifier.service import ClassificationService, MicroBatcher
+
+
+class SlowBackend(ClassifierBackend):
+    """Answers Hot once `release` is set"""
+
+    name = "slow"
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    async def classify_with_source_async(self, conversation):
+        self.calls += 1
+        await self.release.wait()
+        return "Hot", self.name
+
+
+def _batcher(window=0.05, max_batch=3):
+    batches = []
+
+    async def handler(conversations):
+        batches.append(list(conversations))
+        return [(text.upper(), "test") for text in conversations]
+
+    return MicroBatcher(handler, window=window, max_batch=max_batch), batches
+
+
+def test_a_full_batch_is_sent_without_waiting_for_the_window():
+    async def run():
+        batcher, batches = _batcher(window=60, max_batch=3)
+        answers = await asyncio.wait_for(asyncio.gather(*(batcher.submit(text) for text in "abc")), 1)
+        return answers, batches
+
+    answers, batches = asyncio.run(run())
+    assert batches == [["a", "b", "c"]]
+    assert answers == [("A", "test"), ("B", "test"), ("C", "test")]
+
+
+def test_a_partial_batch_is_flushed_at_the_deadline():
+    async def run():
+        batcher, batches = _batcher(window=0.05, max_batch=32)
+        first, second = batcher.submit("a"), batcher.submit("b")
+        await asyncio.sleep(0.01)
+        assert batches == [] and not first.done()
+        await asyncio.wait_for(asyncio.gather(first, second), 1)
+        return batcher.stats(), batches
+
+    stats, batches = asyncio.run(run())
+    assert batches == [["a", "b"]]
+    assert stats == {'batches': 1, 'items': 2, 'mean_batch_size': 2.0, 'waiting': 0}
+
+
+def test_drain_refuses_new_work_and_finishes_what_is_in_flight():
+    async def run():
+        backend = SlowBackend()
+        service = await ClassificationService(backend, port=0, batch_window=0.001).start()
+        in_flight = asyncio.ensure_future(
+            service.route("POST", "/classify", json.dumps({'id': 1, 'conversation': "call me"}).encode()))
+        while not backend.calls:
+            await asyncio.sleep(0.001)
+
+        drain = asyncio.ensure_future(service.drain(timeout=5))
+        await asyncio.sleep(0.01)
+        refused = await service.route("POST", "/classify", json.dumps({'conversation': "another"}).encode())
+        readiness = await service.route("GET", "/readyz", b"")
+        assert not drain.done()
+
+        backend.release.set()
+        await asyncio.wait_for(drain, 1)
+        return in_flight.result(), refused, readiness
+
+    (status, answer), refused, readiness = asyncio.run(run())
+    assert status == 200 and answer['label'] == "Hot"
+    assert refused == (503, {'error': "service is shutting down"})
+    assert readiness[0] == 503 and readiness[1]['draining']
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+from lead_classifier.backends import ClassifierBackend
+from lead_classifier.service import ClassificationService
+from lead_classifier.sessions import SessionClassifier
+
+
+class RecordingBackend(ClassifierBackend):
+    name = "recording"
+
+    def __init__(self, labels=("Cold",)):
+        self.transcripts = []
+        self.labels = labels
+
+    def classify_with_source(self, conversation):
+        self.transcripts.append(conversation)
+        return self.labels[min(len(self.transcripts), len(self.labels)) - 1], self.name
+
+
+def test_turns_leaving_the_window_are_summarised():
+    backend = RecordingBackend()
+    live = SessionClassifier(backend, debounce_seconds=0, min_new_chars=1, context_turns=2, summary_turns=2)
+    for text in ("I want to book unit 305 today", "what is the price", "send the plan", "thanks"):
+        live.add_message("chat", "customer", text)
+        live.add_message("chat", "agent", "noted")
+
+    transcript = backend.transcripts[-1]
+    # Classified on the last customer turn; the agent's reply after it reuses the label
+    assert transcript.startswith("[Summary of 5 earlier turns]")
+    # The two most recent customer turns that left the window, then the window itself
+    assert "Customer: what is the price\nCustomer: send the plan\n[Latest turns]" in transcript
+    assert "I want to book unit 305 today" not in transcript
+    assert transcript.endswith("[Latest turns]\nAgent: noted\nCustomer: thanks")
+
+
+def test_short_sessions_are_sent_as_they_are():
+    backend = RecordingBackend()
+    live = SessionClassifier(backend, debounce_seconds=0, min_new_chars=1)
+    live.add_message("chat", "agent", "How can I help?")
+    live.add_message("chat", "customer", "Looking for a 2 bed apartment")
+    assert backend.transcripts == ["Agent: How can I help?\nCustomer: Looking for a 2 bed apartment"]
+
+
+def test_the_service_classifies_debounced_messages_on_its_own():
+    backend = RecordingBackend(labels=("Cold", "Hot"))
+
+    async def chat():
+        service = await ClassificationService(backend, port=0, session_debounce=0.05).start()
+        try:
+            post = lambda text: service.route("POST", "/sessions/chat-1/messages",
+                                              json.dumps({'role': "customer", 'text': text}).encode())
+            assert (await post("just browsing for now"))[1]['label'] == "Cold"
+            status, update = await post("actually I want to book a viewing this weekend")
+            assert status == 200 and update['pending'] and not update['reclassified']
+
+            # No further message arrives - the background flush picks the session up
+            await asyncio.sleep(0.2)
+            return await service.route("GET", "/sessions/chat-1", b"")
+        finally:
+            await service.drain(timeout=1)
+
+    assert asyncio.run(chat()) == (200, {'session_id': "chat-1", 'label': "Hot"})
+    assert backend.transcripts[-1].endswith("Customer: actually I want to book a viewing this weekend")